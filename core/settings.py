@@ -2,6 +2,7 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from celery.schedules import crontab
 
 load_dotenv()
 
@@ -195,6 +196,10 @@ EMAIL_USE_SSL = True
 EMAIL_USE_TLS = False
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD =os.getenv('EMAIL_HOST_PASSWORD')
+# Pooled SMTP connection used by mainapps.email_system.dispatcher
+EMAIL_MAX_MESSAGES_PER_CONNECTION = 100
+EMAIL_RATE_LIMIT_PER_SECOND = 10
+EMAIL_CONNECTION_IDLE_TIMEOUT = 60
 
 
 
@@ -324,8 +329,55 @@ CACHES = {
     }
 }
 
+# Notification retention, see mainapps.notification.retention
+NOTIFICATION_ARCHIVE_READ_AFTER_DAYS = 90
+NOTIFICATION_RETENTION_DAYS = 365
+
+# Repeated events about the same object within this window update the
+# recipient's unread notification instead of creating a new one
+NOTIFICATION_COALESCE_WINDOW_MINUTES = 60
+
+# Redis used for the live notification stream pub/sub
+NOTIFICATION_EVENTS_REDIS_URL = 'redis://redis:6379/'
+
+# Upper bound on how long cached project statistics are served, covering
+# writes that bypass the invalidation signals (queryset.update(), raw SQL)
+PROJECT_STATISTICS_CACHE_SECONDS = 900
+
 CELERY_BROKER_URL = 'redis://redis:6379/0'
 CELERY_RESULT_BACKEND = 'redis://redis:6379/0'
+CELERY_BEAT_SCHEDULE = {
+    'notification-digests-hourly': {
+        'task': 'mainapps.notification.tasks.send_notification_digests',
+        'schedule': crontab(minute=0),
+        'args': ('hourly',),
+    },
+    'notification-digests-daily': {
+        'task': 'mainapps.notification.tasks.send_notification_digests',
+        'schedule': crontab(minute=0, hour=7),
+        'args': ('daily',),
+    },
+    'notification-scheduled-dispatch': {
+        'task': 'mainapps.notification.tasks.dispatch_scheduled_notifications',
+        'schedule': 60.0,
+    },
+    'notification-unread-counters-reconcile': {
+        'task': 'mainapps.notification.tasks.reconcile_unread_counters',
+        'schedule': crontab(minute=30),
+    },
+    'notification-retention': {
+        'task': 'mainapps.notification.tasks.archive_old_notifications',
+        'schedule': crontab(minute=0, hour=3),
+    },
+    'notification-batches-resume': {
+        'task': 'mainapps.notification.tasks.resume_stalled_notification_batches',
+        'schedule': crontab(minute='*/10'),
+    },
+    'notification-deliveries-requeue': {
+        'task': 'mainapps.notification.tasks.requeue_stalled_deliveries',
+        'schedule': crontab(minute='*/15'),
+    },
+}
 USE_L10N = True
 USE_THOUSAND_SEPARATOR = True
 
@@ -0,0 +1,122 @@
+import logging
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+class EmailDispatcher:
+    """
+    Send emails over one long-lived SMTP connection per process.
+
+    Opening a connection to the SMTP server means a TCP connect, a TLS
+    handshake and a login, which costs far more than sending a message. The
+    dispatcher keeps the connection open between sends and only reopens it
+    after `max_messages_per_connection` messages, after it has been idle for
+    `idle_timeout` seconds, or when the server drops it. Sends are paced to
+    at most `rate_limit` messages per second.
+    """
+
+    def __init__(self, max_messages_per_connection=None, rate_limit=None, idle_timeout=None):
+        self.max_messages_per_connection = max_messages_per_connection or getattr(
+            settings, 'EMAIL_MAX_MESSAGES_PER_CONNECTION', 100
+        )
+        self.rate_limit = rate_limit or getattr(settings, 'EMAIL_RATE_LIMIT_PER_SECOND', 10)
+        self.idle_timeout = idle_timeout or getattr(settings, 'EMAIL_CONNECTION_IDLE_TIMEOUT', 60)
+
+        self._lock = threading.Lock()
+        self._connection = None
+        self._sent_on_connection = 0
+        self._last_used = 0.0
+        self._next_send_at = 0.0
+
+    def send_messages(self, messages):
+        """
+        Send email messages over the pooled connection
+
+        A message that fails is reported back instead of aborting the rest,
+        so callers can retry only what did not go out.
+
+        Args:
+            messages: Iterable of EmailMessage objects
+
+        Returns:
+            Tuple of (sent messages, list of (message, exception) failures)
+        """
+        sent = []
+        failed = []
+        with self._lock:
+            for message in messages:
+                try:
+                    self._send_one(message)
+                    sent.append(message)
+                except Exception as e:
+                    logger.warning(f"Failed to send email to {message.to}: {e}")
+                    self._close()
+                    failed.append((message, e))
+        return sent, failed
+
+    def send_message(self, message):
+        """Send a single message, raising if it could not be delivered"""
+        _, failed = self.send_messages([message])
+        if failed:
+            raise failed[0][1]
+
+    def close(self):
+        """Close the pooled connection"""
+        with self._lock:
+            self._close()
+
+    def _send_one(self, message):
+        self._throttle()
+        connection = self._get_connection()
+        try:
+            connection.send_messages([message])
+        except smtplib.SMTPServerDisconnected:
+            # Server dropped the pooled connection, reconnect and try once more
+            self._close()
+            connection = self._get_connection()
+            connection.send_messages([message])
+
+        self._sent_on_connection += 1
+        self._last_used = time.monotonic()
+        if self._sent_on_connection >= self.max_messages_per_connection:
+            self._close()
+
+    def _get_connection(self):
+        if self._connection is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self._close()
+
+        if self._connection is None:
+            connection = get_connection(fail_silently=False)
+            connection.open()
+            self._connection = connection
+            self._sent_on_connection = 0
+            self._last_used = time.monotonic()
+        return self._connection
+
+    def _close(self):
+        if self._connection is None:
+            return
+        try:
+            self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+        self._sent_on_connection = 0
+
+    def _throttle(self):
+        interval = 1.0 / self.rate_limit
+        now = time.monotonic()
+        if now < self._next_send_at:
+            time.sleep(self._next_send_at - now)
+            now = self._next_send_at
+        self._next_send_at = now + interval
+
+
+# Shared by every thread and Celery task in this process
+email_dispatcher = EmailDispatcher()
@@ -5,13 +5,16 @@ from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
+from .dispatcher import email_dispatcher
+
 class EmailThread(threading.Thread):
     def __init__(self,email_message):
         self.email_message=email_message
         threading.Thread.__init__(self)
     def run(self):
         print("Sending email...")
-        self.email_message.send()
+        # Reuse the process-wide SMTP connection instead of opening one per email
+        email_dispatcher.send_message(self.email_message)
         if self.email_message:
             print("Email sent successfully")
         
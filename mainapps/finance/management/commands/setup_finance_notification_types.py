@@ -1,6 +1,11 @@
 from django.core.management.base import BaseCommand
 from mainapps.notification.models import NotificationType
 
+# The finance helpers build the title and body themselves and pass them as
+# template variables
+FINANCE_TITLE_TEMPLATE = '$title'
+FINANCE_BODY_TEMPLATE = '$body'
+
 class Command(BaseCommand):
     help = 'Set up notification types for finance app'
 
@@ -48,10 +53,23 @@ class Command(BaseCommand):
                 name=nt_data['name'],
                 defaults={
                     'description': nt_data['description'],
-                    'category': nt_data['category']
+                    'category': nt_data['category'],
+                    'title_template': FINANCE_TITLE_TEMPLATE,
+                    'body_template': FINANCE_BODY_TEMPLATE,
+                    'context_variables': ['title', 'body']
                 }
             )
             
+            # Types created before the finance helpers went through
+            # NotificationService have no templates to render
+            if not created and not (notification_type.title_template and notification_type.body_template):
+                notification_type.title_template = notification_type.title_template or FINANCE_TITLE_TEMPLATE
+                notification_type.body_template = notification_type.body_template or FINANCE_BODY_TEMPLATE
+                notification_type.save(update_fields=['title_template', 'body_template', 'updated_at'])
+                self.stdout.write(
+                    self.style.SUCCESS(f'Added templates to notification type: {notification_type.name}')
+                )
+            
             if created:
                 self.stdout.write(
                     self.style.SUCCESS(f'Created notification type: {notification_type.name}')
@@ -1,7 +1,8 @@
 from django.contrib import admin
 from .models import (
     NotificationType, Notification, NotificationPreference,
-    NotificationBatch, ScheduledNotification
+    NotificationBatch, ScheduledNotification, NotificationDigestEntry,
+    NotificationReadWatermark
 )
 
 @admin.register(NotificationType)
@@ -14,7 +15,7 @@ class NotificationTypeAdmin(admin.ModelAdmin):
             'fields': ('name', 'description', 'category', 'is_active', 'can_disable')
         }),
         ('Templates', {
-            'fields': ('title_template', 'body_template')
+            'fields': ('title_template', 'body_template', 'context_variables')
         }),
         ('Appearance', {
             'fields': ('icon', 'color', 'default_priority')
@@ -36,7 +37,7 @@ class NotificationAdmin(admin.ModelAdmin):
             'fields': ('recipient', 'notification_type', 'title', 'body')
         }),
         ('Status', {
-            'fields': ('is_read', 'read_at')
+            'fields': ('is_read', 'read_at', 'marked_unread')
         }),
         ('Appearance', {
             'fields': ('priority', 'icon', 'color', 'action_url')
@@ -57,11 +58,27 @@ class NotificationAdmin(admin.ModelAdmin):
 
 @admin.register(NotificationPreference)
 class NotificationPreferenceAdmin(admin.ModelAdmin):
-    list_display = ('user', 'notification_type', 'receive_in_app', 'receive_email', 'receive_sms', 'receive_push')
-    list_filter = ('receive_in_app', 'receive_email', 'receive_sms', 'receive_push', 'notification_type__category')
+    list_display = ('user', 'notification_type', 'receive_in_app', 'receive_email', 'receive_sms', 'receive_push', 'digest_frequency')
+    list_filter = ('receive_in_app', 'receive_email', 'receive_sms', 'receive_push', 'digest_frequency', 'notification_type__category')
     search_fields = ('user__username', 'user__email', 'notification_type__name')
     raw_id_fields = ('user', 'notification_type')
 
+@admin.register(NotificationDigestEntry)
+class NotificationDigestEntryAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'notification_type', 'title', 'frequency', 'created_at')
+    list_filter = ('frequency', 'notification_type__category', 'created_at')
+    search_fields = ('recipient__username', 'recipient__email', 'title')
+    raw_id_fields = ('recipient', 'notification_type')
+    readonly_fields = ('created_at',)
+
+@admin.register(NotificationReadWatermark)
+class NotificationReadWatermarkAdmin(admin.ModelAdmin):
+    list_display = ('user', 'category', 'read_up_to_id', 'updated_at')
+    list_filter = ('category',)
+    search_fields = ('user__username', 'user__email')
+    raw_id_fields = ('user',)
+    readonly_fields = ('updated_at',)
+
 @admin.register(NotificationBatch)
 class NotificationBatchAdmin(admin.ModelAdmin):
     list_display = ('name', 'notification_type', 'status', 'notifications_count', 'created_at', 'processed_at')
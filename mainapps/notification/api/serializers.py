@@ -6,18 +6,56 @@ from ..models import (
     Notification, NotificationType, NotificationPreference,
     NotificationBatch, ScheduledNotification
 )
+from ..registry import NotificationTypeRegistry
+from ..rendering import TemplateCache, template_errors
 
 User = get_user_model()
 
 class NotificationTypeSerializer(serializers.ModelSerializer):
+    template_variables = serializers.SerializerMethodField()
+    
     class Meta:
         model = NotificationType
         fields = [
             'id', 'name', 'description', 'category', 
-            'title_template', 'body_template', 'icon', 'color',
+            'title_template', 'body_template', 'context_variables', 'template_variables', 'icon', 'color',
             'default_priority', 'send_email', 'send_sms', 'send_push',
             'is_active', 'can_disable', 'created_at', 'updated_at'
         ]
+    
+    def get_template_variables(self, obj):
+        return sorted(TemplateCache.get(obj).variables)
+    
+    def validate_title_template(self, value):
+        errors = template_errors(value)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
+    
+    def validate_body_template(self, value):
+        errors = template_errors(value)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
+    
+    def validate_context_variables(self, value):
+        if not isinstance(value, list) or not all(isinstance(variable, str) and variable.isidentifier() for variable in value):
+            raise serializers.ValidationError("Must be a list of variable names")
+        return value
+    
+    def validate(self, attrs):
+        # Check the templates against the declared variables as they will be saved
+        notification_type = NotificationType(**{
+            field: attrs.get(field, getattr(self.instance, field, ''))
+            for field in ('name', 'title_template', 'body_template')
+        })
+        notification_type.context_variables = attrs.get(
+            'context_variables', getattr(self.instance, 'context_variables', [])
+        )
+        errors = notification_type.template_problems()
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
 
 class NotificationSerializer(serializers.ModelSerializer):
     notification_type_name = serializers.CharField(source='notification_type.name', read_only=True)
@@ -53,6 +91,26 @@ class NotificationSerializer(serializers.ModelSerializer):
             return obj.object_id
         return None
     
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Querysets annotated with is_unread account for the read watermarks
+        if hasattr(instance, 'is_unread'):
+            data['is_read'] = not instance.is_unread
+        return data
+    
+    def update(self, instance, validated_data):
+        # Read state changes go through the model so the unread counters and
+        # the overrides of the read watermarks stay consistent
+        is_read = validated_data.pop('is_read', None)
+        instance = super().update(instance, validated_data)
+        if is_read is True:
+            instance.mark_as_read()
+        elif is_read is False:
+            instance.mark_as_unread()
+        if is_read is not None and hasattr(instance, 'is_unread'):
+            instance.is_unread = not is_read
+        return instance
+    
     def get_time_ago(self, obj):
         from django.utils import timezone
         from django.utils.timesince import timesince
@@ -67,7 +125,7 @@ class NotificationPreferenceSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'notification_type', 'notification_type_name',
             'notification_type_category', 'receive_in_app', 'receive_email',
-            'receive_sms', 'receive_push', 'created_at', 'updated_at'
+            'receive_sms', 'receive_push', 'digest_frequency', 'created_at', 'updated_at'
         ]
 
 class NotificationBatchSerializer(serializers.ModelSerializer):
@@ -163,7 +221,7 @@ class CreateNotificationSerializer(serializers.Serializer):
         # Validate notification type
         notification_type = data.get('notification_type')
         try:
-            NotificationType.objects.get(name=notification_type)
+            NotificationTypeRegistry.get(notification_type)
         except NotificationType.DoesNotExist:
             raise serializers.ValidationError(f"Notification type '{notification_type}' does not exist")
         
@@ -235,7 +293,7 @@ class ScheduleNotificationSerializer(serializers.Serializer):
         # Validate notification type
         notification_type = data.get('notification_type')
         try:
-            NotificationType.objects.get(name=notification_type)
+            NotificationTypeRegistry.get(notification_type)
         except NotificationType.DoesNotExist:
             raise serializers.ValidationError(f"Notification type '{notification_type}' does not exist")
         
@@ -0,0 +1,74 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+import redis.asyncio as aioredis
+
+from mainapps.accounts.authentication import AccountJWTAuthentication
+from ..counters import UnreadCounters
+from ..realtime import EVENTS_CHANNEL
+
+# Seconds between keep-alive comments, keeps proxies from closing idle streams
+HEARTBEAT_INTERVAL = 25
+
+# Milliseconds the browser waits before reconnecting a dropped stream
+RETRY_INTERVAL = 3000
+
+
+def _sse(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _event_stream(user_id):
+    client = aioredis.from_url(settings.NOTIFICATION_EVENTS_REDIS_URL)
+    pubsub = client.pubsub()
+    await pubsub.subscribe(EVENTS_CHANNEL.format(user_id=user_id))
+    try:
+        yield f"retry: {RETRY_INTERVAL}\n\n"
+
+        # Send the current count first so the client never starts out stale
+        counts = await sync_to_async(UnreadCounters.get)(user_id)
+        yield _sse('unread_count', {'total': counts['total']})
+
+        while True:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=HEARTBEAT_INTERVAL
+            )
+            if message is None:
+                yield ": keep-alive\n\n"
+                continue
+
+            payload = json.loads(message['data'])
+            yield _sse(payload['event'], payload['data'])
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+        await client.aclose()
+
+
+async def notification_stream(request):
+    """
+    Server-sent events stream of the current user's notifications
+
+    Pushes a 'notification' event for every new notification and an
+    'unread_count' event whenever the unread total changes. Must be served
+    through ASGI, each open stream holds one Redis pub/sub subscription
+    instead of a worker thread.
+    """
+    # Checked here rather than with require_GET, which only supports async
+    # views from Django 5.0
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    auth = await sync_to_async(AccountJWTAuthentication().authenticate)(request)
+    if auth is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    user = auth[0]
+
+    response = StreamingHttpResponse(_event_stream(user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
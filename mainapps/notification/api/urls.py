@@ -4,6 +4,7 @@ from .views import (
     NotificationViewSet, NotificationTypeViewSet, 
     NotificationPreferenceViewSet
 )
+from .stream import notification_stream
 
 router = DefaultRouter()
 router.register(r'notifications', NotificationViewSet, basename='notification')
@@ -11,5 +12,7 @@ router.register(r'notification-types', NotificationTypeViewSet, basename='notifi
 router.register(r'notification-preferences', NotificationPreferenceViewSet, basename='notification-preference')
 
 urlpatterns = [
+    # Must come before the router so 'stream' is not taken for a notification ID
+    path('notifications/stream/', notification_stream, name='notification-stream'),
     path('', include(router.urls)),
 ]
@@ -1,15 +1,20 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
 from rest_framework import viewsets, status, filters, pagination
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.utils.urls import replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count
-from django.utils import timezone
+from django.db import transaction
+from django.db.models import Q, Count, BooleanField, ExpressionWrapper
 from django.contrib.contenttypes.models import ContentType
 
 from ..models import (
     Notification, NotificationType, NotificationPreference,
-    NotificationBatch, ScheduledNotification
+    NotificationBatch, ScheduledNotification, DigestFrequency, NotificationCategory
 )
 from .serializers import (
     NotificationSerializer, NotificationTypeSerializer, 
@@ -18,19 +23,111 @@ from .serializers import (
     ScheduleNotificationSerializer
 )
 from ..services import NotificationService
+from ..registry import NotificationTypeRegistry
+from ..preferences import NotificationPreferenceResolver
+from ..watermarks import ReadWatermarks
+from ..search import NotificationSearch
+from ..counters import UnreadCounters
 
 class NotificationPagination(pagination.PageNumberPagination):
-    """Custom pagination for notifications"""
+    """
+    Custom pagination for notifications
+    
+    Passing a `cursor` query parameter (empty for the first page) switches to
+    keyset pagination: pages are ordered by (-created_at, -id) and continue
+    after the last row of the previous page, so every page costs the same
+    index range scan however deep it is and no COUNT query is run. The keyset
+    only follows the default newest-first order, so a cursor combined with a
+    different `ordering` or with a `search` is rejected.
+    """
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    cursor_query_param = 'cursor'
+    keyset_orderings = ('', '-created_at')
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        
+        ordering = request.query_params.get(filters.OrderingFilter.ordering_param, '').strip()
+        if ordering not in self.keyset_orderings:
+            raise ValidationError({self.cursor_query_param: 'Cursor pagination only supports the default ordering, use page numbers instead.'})
+        if request.query_params.get(filters.SearchFilter.search_param, '').strip():
+            raise ValidationError({self.cursor_query_param: 'Cursor pagination is not available for searches, use page numbers instead.'})
+        
+        self.request = request
+        page_size = self.get_page_size(request)
+        
+        raw_cursor = request.query_params[self.cursor_query_param]
+        if raw_cursor:
+            created_at, last_id = self.decode_cursor(raw_cursor)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=last_id)
+            )
+        
+        rows = list(queryset.order_by('-created_at', '-id')[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+    
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        
+        next_link = None
+        if self.next_cursor:
+            next_link = replace_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor
+            )
+        return Response({
+            'next': next_link,
+            'next_cursor': self.next_cursor,
+            'results': data
+        })
+    
+    @staticmethod
+    def encode_cursor(notification):
+        """Opaque cursor pointing after a notification"""
+        value = f"{notification.created_at.isoformat()}|{notification.id}"
+        return urlsafe_b64encode(value.encode()).decode()
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            created_at, last_id = urlsafe_b64decode(cursor.encode()).decode().split('|')
+            created_at = datetime.fromisoformat(created_at)
+            return created_at, int(last_id)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound('Invalid cursor')
+
+class NotificationSearchFilter(filters.SearchFilter):
+    """
+    Full-text search for the `search` query parameter
+    
+    On PostgreSQL results come from the GIN-indexed search vector and are
+    ordered by relevance unless an explicit `ordering` is requested. Other
+    databases keep the plain icontains search over `search_fields`. Must be
+    listed after OrderingFilter so the relevance order is not replaced.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        if not NotificationSearch.is_supported(queryset):
+            return super().filter_queryset(request, queryset, view)
+        
+        queryset = NotificationSearch.search(queryset, request.query_params.get(self.search_param, ''))
+        if not request.query_params.get(filters.OrderingFilter.ordering_param):
+            queryset = NotificationSearch.rank(queryset)
+        return queryset
 
 class NotificationViewSet(viewsets.ModelViewSet):
     """ViewSet for managing notifications"""
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['is_read', 'priority', 'notification_type']
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, NotificationSearchFilter]
+    filterset_fields = ['priority', 'notification_type']
     search_fields = ['title', 'body']
     ordering_fields = ['created_at', 'updated_at', 'priority']
     ordering = ['-created_at']
@@ -39,7 +136,21 @@ class NotificationViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Filter notifications for the current user"""
         user = self.request.user
-        queryset = Notification.objects.filter(recipient=user)
+        # The serializer reads all three relations, keep pages at one query
+        queryset = Notification.objects.filter(recipient=user).select_related(
+            'recipient', 'notification_type', 'content_type'
+        ).defer('search_vector').annotate(
+            # Read state including the user's read watermarks
+            is_unread=ExpressionWrapper(ReadWatermarks.unread_condition(), output_field=BooleanField())
+        )
+        
+        # Filter by read state if provided
+        is_read = self.request.query_params.get('is_read')
+        if is_read is not None:
+            if is_read.lower() in ('true', '1'):
+                queryset = queryset.filter(is_unread=False)
+            elif is_read.lower() in ('false', '0'):
+                queryset = queryset.filter(is_unread=True)
         
         # Filter by category if provided
         category = self.request.query_params.get('category')
@@ -69,10 +180,15 @@ class NotificationViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            UnreadCounters.notifications_removed(Notification.objects.filter(id=instance.id))
+            instance.delete()
+    
     @action(detail=False, methods=['get'])
     def unread(self, request):
         """Get all unread notifications for the current user"""
-        queryset = self.filter_queryset(self.get_queryset().filter(is_read=False))
+        queryset = self.filter_queryset(self.get_queryset().filter(is_unread=True))
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -87,8 +203,10 @@ class NotificationViewSet(viewsets.ModelViewSet):
         queryset = self.get_queryset().order_by('-created_at')[:limit]
         serializer = self.get_serializer(queryset, many=True)
         
-        # Get unread count
-        unread_count = self.get_queryset().filter(is_read=False).count()
+        # Unread count comes from the Redis counters, not the database
+        counts = UnreadCounters.get(request.user.id)
+        category = request.query_params.get('category')
+        unread_count = counts['by_category'].get(category, 0) if category else counts['total']
         
         return Response({
             'notifications': serializer.data,
@@ -103,18 +221,18 @@ class NotificationViewSet(viewsets.ModelViewSet):
         # Get counts by category
         category_counts = queryset.values('notification_type__category').annotate(
             count=Count('id'),
-            unread=Count('id', filter=Q(is_read=False))
+            unread=Count('id', filter=ReadWatermarks.unread_condition())
         ).order_by('notification_type__category')
         
         # Get counts by priority
         priority_counts = queryset.values('priority').annotate(
             count=Count('id'),
-            unread=Count('id', filter=Q(is_read=False))
+            unread=Count('id', filter=ReadWatermarks.unread_condition())
         ).order_by('priority')
         
         # Get total and unread counts
-        total_count = queryset.count()
-        unread_count = queryset.filter(is_read=False).count()
+        total_count = sum(row['count'] for row in category_counts)
+        unread_count = sum(row['unread'] for row in category_counts)
         
         return Response({
             'total': total_count,
@@ -125,18 +243,31 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
-        """Mark all notifications as read for the current user"""
+        """Mark all notifications, or all up to `up_to_id`, as read for the current user"""
         # Allow filtering by category
         category = request.data.get('category')
-        queryset = self.get_queryset().filter(is_read=False)
+        if category and category not in NotificationCategory.values:
+            return Response({
+                'status': 'error',
+                'message': f"Invalid category '{category}'"
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        if category:
-            queryset = queryset.filter(notification_type__category=category)
-            
-        count = queryset.update(
-            is_read=True,
-            read_at=timezone.now()
-        )
+        # Optional ID of the newest notification the client has shown, so
+        # notifications that arrived since stay unread
+        up_to_id = request.data.get('up_to_id')
+        if up_to_id is not None:
+            try:
+                up_to_id = int(up_to_id)
+            except (TypeError, ValueError):
+                up_to_id = -1
+            if up_to_id < 0:
+                return Response({
+                    'status': 'error',
+                    'message': "up_to_id must be a notification ID"
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Moves the user's read watermark instead of updating every unread row
+        count = ReadWatermarks.mark_all_read(request.user, category, up_to_id)
         return Response({'status': 'success', 'count': count})
     
     @action(detail=True, methods=['post'])
@@ -176,7 +307,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
             
             # Create notifications
             try:
-                notifications = NotificationService.create_notification_for_many(
+                notification_ids = NotificationService.create_notification_for_many(
                     recipients=data['recipients'],
                     notification_type_name=data['notification_type'],
                     context_data=data.get('context_data'),
@@ -192,8 +323,8 @@ class NotificationViewSet(viewsets.ModelViewSet):
                 
                 return Response({
                     'status': 'success',
-                    'count': len(notifications),
-                    'notifications': NotificationSerializer(notifications, many=True).data
+                    'count': len(notification_ids),
+                    'notification_ids': notification_ids
                 })
             except Exception as e:
                 return Response({
@@ -248,10 +379,13 @@ class NotificationViewSet(viewsets.ModelViewSet):
                 'message': 'No notification IDs provided'
             }, status=status.HTTP_400_BAD_REQUEST)
             
-        deleted, _ = Notification.objects.filter(
+        queryset = Notification.objects.filter(
             id__in=notification_ids,
             recipient=request.user
-        ).delete()
+        )
+        with transaction.atomic():
+            UnreadCounters.notifications_removed(queryset)
+            deleted, _ = queryset.delete()
         
         return Response({
             'status': 'success',
@@ -308,7 +442,7 @@ class NotificationPreferenceViewSet(viewsets.ModelViewSet):
                 continue
                 
             try:
-                notification_type = NotificationType.objects.get(id=notification_type_id)
+                notification_type = NotificationTypeRegistry.get_by_id(notification_type_id)
                 if not notification_type.can_disable and not request.user.is_staff:
                     errors.append({
                         'message': f'Cannot modify preference for {notification_type.name}',
@@ -316,15 +450,13 @@ class NotificationPreferenceViewSet(viewsets.ModelViewSet):
                     })
                     continue
                     
-                preference, created = NotificationPreference.objects.get_or_create(
+                preference = NotificationPreference.objects.filter(
+                    user=request.user,
+                    notification_type=notification_type
+                ).first() or NotificationPreference(
                     user=request.user,
                     notification_type=notification_type,
-                    defaults={
-                        'receive_in_app': True,
-                        'receive_email': notification_type.send_email,
-                        'receive_sms': notification_type.send_sms,
-                        'receive_push': notification_type.send_push
-                    }
+                    **NotificationPreferenceResolver.preference_defaults(notification_type)
                 )
                 
                 # Update preference fields
@@ -332,7 +464,21 @@ class NotificationPreferenceViewSet(viewsets.ModelViewSet):
                     if field in pref:
                         setattr(preference, field, pref[field])
                 
-                preference.save()
+                if 'digest_frequency' in pref:
+                    if pref['digest_frequency'] not in DigestFrequency.values:
+                        errors.append({
+                            'message': f"Invalid digest_frequency '{pref['digest_frequency']}'",
+                            'data': pref
+                        })
+                        continue
+                    preference.digest_frequency = pref['digest_frequency']
+                
+                # Only overrides are stored, a preference back at the defaults is removed
+                if NotificationPreferenceResolver.is_default(preference, notification_type):
+                    if preference.pk:
+                        preference.delete()
+                else:
+                    preference.save()
                 updated.append(preference)
                 
             except NotificationType.DoesNotExist:
@@ -360,9 +506,7 @@ class NotificationPreferenceViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def get_all(self, request):
         """Get all notification types with user preferences"""
-        # Get all notification types
-        notification_types = NotificationType.objects.filter(is_active=True)
-        
+        # Merge the user's overrides into the type defaults
         user_preferences = {
             pref.notification_type_id: pref 
             for pref in NotificationPreference.objects.filter(user=request.user)
@@ -370,24 +514,11 @@ class NotificationPreferenceViewSet(viewsets.ModelViewSet):
         
         # Build response data
         result = []
-        for nt in notification_types:
+        for nt in NotificationTypeRegistry.all():
+            pref_data = NotificationPreferenceResolver.preference_defaults(nt)
             pref = user_preferences.get(nt.id)
-            
-            # Use default values if no preference exists
-            if not pref:
-                pref_data = {
-                    'receive_in_app': True,
-                    'receive_email': nt.send_email,
-                    'receive_sms': nt.send_sms,
-                    'receive_push': nt.send_push
-                }
-            else:
-                pref_data = {
-                    'receive_in_app': pref.receive_in_app,
-                    'receive_email': pref.receive_email,
-                    'receive_sms': pref.receive_sms,
-                    'receive_push': pref.receive_push
-                }
+            if pref:
+                pref_data = {field: getattr(pref, field) for field in pref_data}
             
             result.append({
                 'id': nt.id,
@@ -413,29 +544,11 @@ class NotificationPreferenceViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def reset_to_default(self, request):
         """Reset all preferences to default values"""
-        user = request.user
-        
-        # Get all notification types
-        notification_types = NotificationType.objects.filter(is_active=True)
-        
-        # Delete existing preferences
-        NotificationPreference.objects.filter(user=user).delete()
-        
-        # Create default preferences
-        preferences = []
-        for nt in notification_types:
-            preference = NotificationPreference.objects.create(
-                user=user,
-                notification_type=nt,
-                receive_in_app=True,
-                receive_email=nt.send_email,
-                receive_sms=nt.send_sms,
-                receive_push=nt.send_push
-            )
-            preferences.append(preference)
+        # Without overrides every type falls back to its defaults
+        count, _ = NotificationPreference.objects.filter(user=request.user).delete()
         
         return Response({
             'status': 'success',
             'message': 'All preferences reset to default values',
-            'count': len(preferences)
+            'count': count
         })
@@ -0,0 +1,255 @@
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from .registry import NotificationTypeRegistry
+from .realtime import redis_client, publish_events
+
+logger = logging.getLogger(__name__)
+
+# Redis hash per user holding the unread counts: field 'total' plus one
+# 'category:<name>' field per notification category
+UNREAD_KEY = 'notification:unread:{user_id}'
+TOTAL_FIELD = 'total'
+CATEGORY_PREFIX = 'category:'
+
+# Counters are dropped after a week without a rebuild, and rebuilt from the
+# database on the next read
+UNREAD_KEY_TIMEOUT = 7 * 24 * 60 * 60
+
+# Apply increments only to counters that exist, so a missing counter is
+# rebuilt from the database rather than started from a partial count.
+# Returns the new total, or -1 if the counter does not exist.
+INCREMENT_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    for i = 1, #ARGV, 2 do
+        redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+    return tonumber(redis.call('HGET', KEYS[1], 'total'))
+end
+return -1
+"""
+
+# Zero the counts of one category (ARGV[1]) or of every category (empty
+# ARGV[1]). Returns the new total, or -1 if the counter does not exist.
+CLEAR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+if ARGV[1] == '' then
+    for _, field in ipairs(redis.call('HKEYS', KEYS[1])) do
+        redis.call('HSET', KEYS[1], field, 0)
+    end
+    return 0
+end
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+redis.call('HINCRBY', KEYS[1], 'total', -current)
+redis.call('HSET', KEYS[1], ARGV[1], 0)
+return tonumber(redis.call('HGET', KEYS[1], 'total'))
+"""
+
+
+class UnreadCounters:
+    """
+    Per-user unread notification counters kept in Redis.
+
+    Counters are adjusted with HINCRBY after the writing transaction commits.
+    Anything that changes notifications without going through these hooks,
+    such as admin edits or cascading deletes, is corrected by the periodic
+    reconciliation job.
+    """
+
+    @classmethod
+    def get(cls, user_id):
+        """
+        Get the unread counts of a user
+
+        Returns:
+            Dict with 'total' and 'by_category' counts
+        """
+        client = redis_client()
+        if client is not None:
+            try:
+                values = client.hgetall(UNREAD_KEY.format(user_id=user_id))
+                if values:
+                    return cls._decode(values)
+            except Exception as e:
+                logger.warning(f"Error reading unread counters: {e}")
+
+        return cls.rebuild([user_id])[user_id]
+
+    @classmethod
+    def rebuild(cls, user_ids):
+        """
+        Recount unread notifications from the database and store the counters
+
+        Returns:
+            Dict mapping user ID to its counts
+        """
+        from .models import Notification
+        from .watermarks import ReadWatermarks
+
+        counts = {user_id: {'total': 0, 'by_category': {}} for user_id in user_ids}
+        rows = Notification.objects.filter(
+            ReadWatermarks.unread_condition(), recipient_id__in=user_ids
+        ).values('recipient_id', 'notification_type__category').annotate(count=Count('id'))
+        for row in rows:
+            user_counts = counts[row['recipient_id']]
+            user_counts['total'] += row['count']
+            user_counts['by_category'][row['notification_type__category']] = row['count']
+
+        client = redis_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                for user_id, user_counts in counts.items():
+                    key = UNREAD_KEY.format(user_id=user_id)
+                    mapping = {TOTAL_FIELD: user_counts['total']}
+                    for category, count in user_counts['by_category'].items():
+                        mapping[f'{CATEGORY_PREFIX}{category}'] = count
+                    pipe.delete(key)
+                    pipe.hset(key, mapping=mapping)
+                    pipe.expire(key, UNREAD_KEY_TIMEOUT)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Error storing unread counters: {e}")
+        return counts
+
+    @classmethod
+    def adjust(cls, deltas):
+        """
+        Apply unread count changes once the transaction commits
+
+        Args:
+            deltas: Dict mapping user ID to a dict of category -> change
+        """
+        deltas = {
+            user_id: {category: delta for category, delta in categories.items() if delta}
+            for user_id, categories in deltas.items()
+        }
+        deltas = {user_id: categories for user_id, categories in deltas.items() if categories}
+        if not deltas:
+            return
+
+        def apply():
+            client = redis_client()
+            if client is None:
+                return
+            try:
+                script = client.register_script(INCREMENT_IF_EXISTS)
+                pipe = client.pipeline()
+                user_ids = list(deltas)
+                for user_id in user_ids:
+                    categories = deltas[user_id]
+                    args = [TOTAL_FIELD, sum(categories.values())]
+                    for category, delta in categories.items():
+                        args += [f'{CATEGORY_PREFIX}{category}', delta]
+                    script(keys=[UNREAD_KEY.format(user_id=user_id)], args=args, client=pipe)
+                totals = pipe.execute()
+            except Exception as e:
+                logger.warning(f"Error updating unread counters: {e}")
+                return
+
+            # Tell live clients about the new totals, a missing counter sends
+            # null so the client refetches
+            publish_events(
+                (user_id, 'unread_count', {'total': total if total >= 0 else None})
+                for user_id, total in zip(user_ids, totals)
+            )
+
+        transaction.on_commit(apply)
+
+    @classmethod
+    def clear(cls, user_id, category=None):
+        """Zero a user's unread count, for one category or all of them, once the transaction commits"""
+        def apply():
+            client = redis_client()
+            if client is None:
+                return
+            try:
+                script = client.register_script(CLEAR_IF_EXISTS)
+                field = f'{CATEGORY_PREFIX}{category}' if category else ''
+                total = script(keys=[UNREAD_KEY.format(user_id=user_id)], args=[field])
+            except Exception as e:
+                logger.warning(f"Error clearing unread counters: {e}")
+                return
+
+            publish_events([(user_id, 'unread_count', {'total': total if total >= 0 else None})])
+
+        transaction.on_commit(apply)
+
+    @classmethod
+    def notifications_created(cls, notifications):
+        """Count newly created unread notifications"""
+        deltas = defaultdict(lambda: defaultdict(int))
+        for notification in notifications:
+            if not notification.is_read:
+                category = NotificationTypeRegistry.get_by_id(notification.notification_type_id).category
+                deltas[notification.recipient_id][category] += 1
+        cls.adjust(deltas)
+
+    @classmethod
+    def notification_changed(cls, notification, delta):
+        """Record a single notification becoming unread (+1) or read/deleted (-1)"""
+        category = NotificationTypeRegistry.get_by_id(notification.notification_type_id).category
+        cls.adjust({notification.recipient_id: {category: delta}})
+
+    @classmethod
+    def notifications_removed(cls, queryset):
+        """
+        Uncount the unread notifications in a queryset that is about to be
+        deleted or marked as read
+        """
+        from .watermarks import ReadWatermarks
+
+        deltas = defaultdict(dict)
+        rows = queryset.filter(ReadWatermarks.unread_condition()).values(
+            'recipient_id', 'notification_type__category'
+        ).annotate(count=Count('id'))
+        for row in rows:
+            deltas[row['recipient_id']][row['notification_type__category']] = -row['count']
+        cls.adjust(deltas)
+
+    @classmethod
+    def reconcile(cls, batch_size=500):
+        """
+        Rebuild every stored counter from the database
+
+        Returns:
+            Number of users reconciled
+        """
+        client = redis_client()
+        if client is None:
+            return 0
+
+        prefix = UNREAD_KEY.format(user_id='')
+        user_ids = []
+        count = 0
+        for key in client.scan_iter(match=f'{prefix}*', count=batch_size):
+            key = key.decode() if isinstance(key, bytes) else key
+            try:
+                user_ids.append(int(key[len(prefix):]))
+            except ValueError:
+                continue
+            if len(user_ids) >= batch_size:
+                cls.rebuild(user_ids)
+                count += len(user_ids)
+                user_ids = []
+        if user_ids:
+            cls.rebuild(user_ids)
+            count += len(user_ids)
+        return count
+
+    @classmethod
+    def _decode(cls, values):
+        counts = {'total': 0, 'by_category': {}}
+        for field, value in values.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            value = max(int(value), 0)
+            if field == TOTAL_FIELD:
+                counts['total'] = value
+            elif field.startswith(CATEGORY_PREFIX):
+                counts['by_category'][field[len(CATEGORY_PREFIX):]] = value
+        return counts
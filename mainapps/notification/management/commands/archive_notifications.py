@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ...retention import NotificationRetention
+
+class Command(BaseCommand):
+    help = 'Archive old notifications to storage and remove them from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Archive notifications older than this many days instead of applying the configured policy'
+        )
+        parser.add_argument(
+            '--include-unread',
+            action='store_true',
+            help='With --days, also archive unread notifications'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days is None:
+            counts = NotificationRetention.run()
+            self.stdout.write(self.style.SUCCESS(
+                f"Archived {counts['read']} read and {counts['expired']} expired notifications."
+            ))
+            return
+
+        count = NotificationRetention.archive(
+            timezone.now() - timezone.timedelta(days=days),
+            read_only=not options['include_unread']
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {count} notifications."))
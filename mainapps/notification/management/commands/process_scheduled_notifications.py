@@ -8,6 +8,10 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Processing scheduled notifications...'))
         
-        NotificationService.process_scheduled_notifications()
+        metrics = NotificationService.process_scheduled_notifications()
         
-        self.stdout.write(self.style.SUCCESS('Scheduled notifications processed successfully.'))
+        self.stdout.write(self.style.SUCCESS(
+            f"Scheduled notifications processed successfully: {metrics['processed']} processed, "
+            f"{metrics['sent']} sent, {metrics['failed']} failed, "
+            f"lag avg {metrics['avg_lag_seconds']:.1f}s max {metrics['max_lag_seconds']:.1f}s."
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0002_alter_notificationtype_category'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificationtype',
+            name='name',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+    ]
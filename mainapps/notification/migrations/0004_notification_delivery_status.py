@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0003_alter_notificationtype_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='email_status',
+            field=models.CharField(choices=[('not_required', 'Not Required'), ('queued', 'Queued'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='not_required', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='last_delivery_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='push_status',
+            field=models.CharField(choices=[('not_required', 'Not Required'), ('queued', 'Queued'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='not_required', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='sms_status',
+            field=models.CharField(choices=[('not_required', 'Not Required'), ('queued', 'Queued'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='not_required', max_length=20),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+from django.db.models import F
+
+
+def prune_default_preferences(apps, schema_editor):
+    """Remove stored preferences that only repeat their notification type defaults"""
+    NotificationPreference = apps.get_model('notification', 'NotificationPreference')
+    NotificationPreference.objects.filter(
+        receive_in_app=True,
+        receive_email=F('notification_type__send_email'),
+        receive_sms=F('notification_type__send_sms'),
+        receive_push=F('notification_type__send_push'),
+        digest_frequency='immediate',
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0006_notificationbatch_last_user_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(prune_default_preferences, migrations.RunPython.noop),
+    ]
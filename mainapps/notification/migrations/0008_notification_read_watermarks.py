@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notification', '0007_prune_default_preferences'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationReadWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(blank=True, choices=[('project', 'Project'), ('milestone', 'Milestone'), ('task', 'Task'), ('expense', 'Expense'), ('team', 'Team'), ('system', 'System'), ('kyc', 'KYC Verification'), ('payment', 'Payment'), ('document', 'Document'), ('other', 'Other'), ('update', 'Update'), ('media', 'Media'), ('comment', 'Comment'), ('feedback', 'Feedback')], max_length=20)),
+                ('read_up_to_id', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='marked_unread',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('marked_unread', True)), fields=['recipient'], name='notification_marked_unread_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificationreadwatermark',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_read_watermarks', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='notificationreadwatermark',
+            unique_together={('user', 'category')},
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:47
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Keeps search_vector in sync with title and body, including bulk inserts
+CREATE_SEARCH_VECTOR_SQL = """
+CREATE OR REPLACE FUNCTION notification_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.body, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER notification_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, body ON notification_notification
+    FOR EACH ROW EXECUTE FUNCTION notification_search_vector_update();
+
+UPDATE notification_notification SET search_vector =
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(body, '')), 'B');
+
+CREATE INDEX notification_search_vector_idx
+    ON notification_notification USING gin (search_vector);
+"""
+
+DROP_SEARCH_VECTOR_SQL = """
+DROP INDEX IF EXISTS notification_search_vector_idx;
+DROP TRIGGER IF EXISTS notification_search_vector_trigger ON notification_notification;
+DROP FUNCTION IF EXISTS notification_search_vector_update();
+"""
+
+
+def create_search_vector(apps, schema_editor):
+    # Full-text search is PostgreSQL only, other databases keep the column empty
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SEARCH_VECTOR_SQL)
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_VECTOR_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0008_notification_read_watermarks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_vector, drop_search_vector),
+    ]
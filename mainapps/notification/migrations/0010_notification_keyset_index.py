@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('notification', '0009_notification_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-created_at', '-id'], name='notificatio_recipie_8ec34f_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notificatio_recipie_a95ed4_idx',
+        ),
+    ]
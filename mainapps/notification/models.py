@@ -2,9 +2,13 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 from django.urls import reverse
 from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from .rendering import template_errors, undeclared_variables
 
 User = get_user_model()
 
@@ -33,9 +37,21 @@ class NotificationPriority(models.TextChoices):
     HIGH = 'high', 'High'
     URGENT = 'urgent', 'Urgent'
 
+class DeliveryStatus(models.TextChoices):
+    NOT_REQUIRED = 'not_required', 'Not Required'
+    QUEUED = 'queued', 'Queued'
+    SENDING = 'sending', 'Sending'
+    SENT = 'sent', 'Sent'
+    FAILED = 'failed', 'Failed'
+
+class DigestFrequency(models.TextChoices):
+    IMMEDIATE = 'immediate', 'Immediate'
+    HOURLY = 'hourly', 'Hourly'
+    DAILY = 'daily', 'Daily'
+
 class NotificationType(models.Model):
     """Defines different types of notifications that can be sent"""
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
     description = models.TextField(blank=True)
     category = models.CharField(
         max_length=20, 
@@ -44,6 +60,10 @@ class NotificationType(models.Model):
     )
     title_template = models.CharField(max_length=255)
     body_template = models.TextField()
+    # Variables the senders of this type pass in their context. When set, the
+    # templates may only use these besides the recipient and related object
+    # variables; when empty only the template syntax is checked.
+    context_variables = models.JSONField(default=list, blank=True)
     icon = models.CharField(max_length=50, default='bell')
     color = models.CharField(max_length=20, default='primary')
     default_priority = models.CharField(
@@ -63,6 +83,30 @@ class NotificationType(models.Model):
     def __str__(self):
         return self.name
     
+    def template_problems(self):
+        """Errors of the title and body templates keyed by field, empty if both render"""
+        errors = {}
+        for field in ('title_template', 'body_template'):
+            template_string = getattr(self, field)
+            field_errors = template_errors(template_string)
+            if not field_errors and self.context_variables:
+                undeclared = undeclared_variables(template_string, self.context_variables)
+                if undeclared:
+                    field_errors = [f"Undeclared variables: {', '.join(undeclared)}"]
+            if field_errors:
+                errors[field] = field_errors
+        return errors
+    
+    def clean(self):
+        errors = self.template_problems()
+        if errors:
+            raise ValidationError(errors)
+    
+    def save(self, *args, **kwargs):
+        # Checked on every save, admin bulk edits and scripts skip clean()
+        self.clean()
+        super().save(*args, **kwargs)
+    
     class Meta:
         ordering = ['category', 'name']
 
@@ -95,12 +139,37 @@ class Notification(models.Model):
     
     data = models.JSONField(default=dict, blank=True)
     
+    # Weighted title and body lexemes, maintained by a PostgreSQL trigger and
+    # GIN-indexed there; always empty on other databases
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     is_read = models.BooleanField(default=False)
     read_at = models.DateTimeField(null=True, blank=True)
+    # Explicitly marked unread, keeps the notification unread even when it
+    # falls under one of the recipient's read watermarks
+    marked_unread = models.BooleanField(default=False)
     is_email_sent = models.BooleanField(default=False)
     is_sms_sent = models.BooleanField(default=False)
     is_push_sent = models.BooleanField(default=False)
     
+    # Delivery state of each external channel, driven by the Celery delivery tasks
+    email_status = models.CharField(
+        max_length=20,
+        choices=DeliveryStatus.choices,
+        default=DeliveryStatus.NOT_REQUIRED
+    )
+    sms_status = models.CharField(
+        max_length=20,
+        choices=DeliveryStatus.choices,
+        default=DeliveryStatus.NOT_REQUIRED
+    )
+    push_status = models.CharField(
+        max_length=20,
+        choices=DeliveryStatus.choices,
+        default=DeliveryStatus.NOT_REQUIRED
+    )
+    last_delivery_error = models.TextField(blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -109,24 +178,74 @@ class Notification(models.Model):
     
     def mark_as_read(self):
         """Mark notification as read"""
+        from .counters import UnreadCounters
+        from .watermarks import ReadWatermarks
+        
         self.is_read = True
         self.read_at = timezone.now()
-        self.save(update_fields=['is_read', 'read_at'])
+        self.marked_unread = False
+        # Conditional update so concurrent calls only uncount the notification once
+        changed = Notification.objects.filter(
+            ReadWatermarks.unread_condition(), id=self.id
+        ).update(is_read=True, read_at=self.read_at, marked_unread=False)
+        if changed:
+            UnreadCounters.notification_changed(self, -1)
     
     def mark_as_unread(self):
         """Mark notification as unread"""
+        from .counters import UnreadCounters
+        from .watermarks import ReadWatermarks
+        
         self.is_read = False
         self.read_at = None
-        self.save(update_fields=['is_read', 'read_at'])
+        self.marked_unread = True
+        changed = Notification.objects.filter(id=self.id).exclude(
+            ReadWatermarks.unread_condition()
+        ).update(is_read=False, read_at=None, marked_unread=True)
+        if changed:
+            UnreadCounters.notification_changed(self, 1)
     
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['recipient', '-created_at']),
+            models.Index(fields=['recipient', '-created_at', '-id']),
             models.Index(fields=['recipient', 'is_read']),
             models.Index(fields=['content_type', 'object_id']),
+            models.Index(
+                fields=['recipient'],
+                condition=models.Q(marked_unread=True),
+                name='notification_marked_unread_idx'
+            ),
         ]
 
+class NotificationReadWatermark(models.Model):
+    """
+    Per-user "read up to" marker
+
+    Every notification of the user with an ID up to read_up_to_id counts as
+    read, unless it was explicitly marked unread. An empty category covers
+    all categories.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_read_watermarks'
+    )
+    category = models.CharField(
+        max_length=20,
+        choices=NotificationCategory.choices,
+        blank=True
+    )
+    read_up_to_id = models.PositiveBigIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.category or 'all'} <= {self.read_up_to_id}"
+    
+    class Meta:
+        unique_together = ['user', 'category']
+
 class NotificationPreference(models.Model):
     """User preferences for receiving notifications"""
     user = models.ForeignKey(
@@ -144,6 +263,12 @@ class NotificationPreference(models.Model):
     receive_email = models.BooleanField(default=True)
     receive_sms = models.BooleanField(default=True)
     receive_push = models.BooleanField(default=True)
+    # Hold notifications of this type and deliver them as one periodic digest
+    digest_frequency = models.CharField(
+        max_length=10,
+        choices=DigestFrequency.choices,
+        default=DigestFrequency.IMMEDIATE
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -155,6 +280,46 @@ class NotificationPreference(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.notification_type.name}"
 
+class NotificationDigestEntry(models.Model):
+    """A notification held back until the recipient's next digest is rolled up"""
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='pending_digest_entries'
+    )
+    notification_type = models.ForeignKey(
+        NotificationType,
+        on_delete=models.CASCADE,
+        related_name='digest_entries'
+    )
+    frequency = models.CharField(max_length=10, choices=DigestFrequency.choices)
+    
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    action_url = models.CharField(max_length=255, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+    # Whether the recipient wanted this notification by email
+    send_email = models.BooleanField(default=False)
+    
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True
+    )
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.recipient.username} - {self.title} ({self.frequency})"
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['frequency', 'created_at']),
+        ]
+
 class NotificationBatch(models.Model):
     """Batch of notifications for bulk processing"""
     name = models.CharField(max_length=255)
@@ -177,6 +342,8 @@ class NotificationBatch(models.Model):
     error_message = models.TextField(blank=True)
     # Number of notifications created
     notifications_count = models.PositiveIntegerField(default=0)
+    # ID of the last user processed, processing resumes after it
+    last_user_id = models.PositiveIntegerField(default=0)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,143 @@
+from .models import NotificationType, NotificationPreference, DigestFrequency
+from .registry import NotificationTypeRegistry
+
+# Delivery channels a notification can go out on
+CHANNELS = ('in_app', 'email', 'sms', 'push')
+
+# NotificationPreference field backing each channel
+CHANNEL_FIELDS = {
+    'in_app': 'receive_in_app',
+    'email': 'receive_email',
+    'sms': 'receive_sms',
+    'push': 'receive_push',
+}
+
+
+class NotificationPreferenceResolver:
+    """
+    Resolve per-channel delivery decisions for a set of users in one query.
+
+    Preferences are stored sparsely: a NotificationPreference row only exists
+    where a user overrides the defaults of a notification type, everyone else
+    gets the type defaults.
+    """
+
+    @classmethod
+    def preference_defaults(cls, notification_type):
+        """NotificationPreference field values matching the type defaults"""
+        return {
+            'receive_in_app': True,
+            'receive_email': notification_type.send_email,
+            'receive_sms': notification_type.send_sms,
+            'receive_push': notification_type.send_push,
+            'digest_frequency': DigestFrequency.IMMEDIATE,
+        }
+
+    @classmethod
+    def is_default(cls, preference, notification_type):
+        """Check whether a preference only repeats the type defaults"""
+        return all(
+            getattr(preference, field) == value
+            for field, value in cls.preference_defaults(notification_type).items()
+        )
+
+    @classmethod
+    def type_defaults(cls, notification_type, overrides=None):
+        """
+        Channel defaults for users without a stored preference
+
+        Args:
+            notification_type: NotificationType instance
+            overrides: Optional dict of channel -> bool replacing the type defaults
+        """
+        defaults = {
+            'in_app': True,
+            'email': notification_type.send_email,
+            'sms': notification_type.send_sms,
+            'push': notification_type.send_push,
+        }
+        for channel, value in (overrides or {}).items():
+            if value is not None and channel != 'in_app':
+                defaults[channel] = value
+        return defaults
+
+    @classmethod
+    def resolve(cls, users, notification_type, channels=CHANNELS, overrides=None):
+        """
+        Resolve delivery decisions for many users at once
+
+        Args:
+            users: Iterable of User objects and/or user IDs
+            notification_type: NotificationType instance or type name
+            channels: Channels to resolve
+            overrides: Optional dict of channel -> bool. True replaces the type
+                default, False turns the channel off for everyone.
+
+        Returns:
+            Dict mapping user ID to a dict of channel -> bool, plus a 'digest'
+            key holding the user's DigestFrequency for this type. Every user
+            is denied every channel if the notification type does not exist.
+        """
+        user_ids = {user if isinstance(user, int) else user.id for user in users}
+
+        if isinstance(notification_type, str):
+            try:
+                notification_type = NotificationTypeRegistry.get(notification_type)
+            except NotificationType.DoesNotExist:
+                return {
+                    user_id: {**{channel: False for channel in channels}, 'digest': DigestFrequency.IMMEDIATE}
+                    for user_id in user_ids
+                }
+
+        overrides = overrides or {}
+        defaults = cls.type_defaults(notification_type, overrides)
+
+        preferences = {}
+        # Mandatory notification types ignore stored preferences
+        if notification_type.can_disable and user_ids:
+            fields = [CHANNEL_FIELDS[channel] for channel in channels]
+            preferences = {
+                pref['user_id']: pref
+                for pref in NotificationPreference.objects.filter(
+                    notification_type=notification_type,
+                    user_id__in=user_ids
+                ).values('user_id', 'digest_frequency', *fields)
+            }
+
+        decisions = {}
+        for user_id in user_ids:
+            preference = preferences.get(user_id)
+            decision = {}
+            for channel in channels:
+                if overrides.get(channel) is False:
+                    decision[channel] = False
+                elif preference is not None:
+                    decision[channel] = preference[CHANNEL_FIELDS[channel]]
+                else:
+                    decision[channel] = defaults[channel]
+            decision['digest'] = (
+                preference['digest_frequency'] if preference is not None
+                else DigestFrequency.IMMEDIATE
+            )
+            decisions[user_id] = decision
+        return decisions
+
+    @classmethod
+    def filter_users(cls, users, notification_type, channel='in_app'):
+        """Return the subset of users who should receive the notification on a channel"""
+        users = list(users)
+        decisions = cls.resolve(users, notification_type, channels=(channel,))
+        return [
+            user for user in users
+            if decisions[user if isinstance(user, int) else user.id][channel]
+        ]
+
+
+def should_notify_user(user, notification_type_name, channel='in_app'):
+    """
+    Check if a user should receive a notification based on their preferences.
+
+    Prefer NotificationPreferenceResolver.resolve when checking several users.
+    """
+    decisions = NotificationPreferenceResolver.resolve([user], notification_type_name, channels=(channel,))
+    return decisions[user if isinstance(user, int) else user.id][channel]
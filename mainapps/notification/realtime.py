@@ -0,0 +1,67 @@
+import json
+import logging
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Redis pub/sub channel carrying the live events of one user
+EVENTS_CHANNEL = 'notification:events:{user_id}'
+
+
+def redis_client():
+    """Raw client of the default cache, or None if it is not backed by Redis"""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception:
+        return None
+
+
+def notification_payload(notification):
+    """Compact representation of a notification pushed to live clients"""
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'body': notification.body,
+        'priority': notification.priority,
+        'icon': notification.icon,
+        'color': notification.color,
+        'action_url': notification.action_url,
+        'notification_type': notification.notification_type_id,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+    }
+
+
+def publish_events(events):
+    """
+    Publish events to the users' live streams
+
+    Args:
+        events: Iterable of (user_id, event name, JSON serialisable data)
+    """
+    events = list(events)
+    client = redis_client()
+    if client is None or not events:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for user_id, event, data in events:
+            pipe.publish(
+                EVENTS_CHANNEL.format(user_id=user_id),
+                json.dumps({'event': event, 'data': data})
+            )
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Error publishing notification events: {e}")
+
+
+def publish_notifications(notifications):
+    """Push new notifications to their recipients once the transaction commits"""
+    events = [
+        (notification.recipient_id, 'notification', notification_payload(notification))
+        for notification in notifications
+    ]
+    if events:
+        transaction.on_commit(lambda: publish_events(events))
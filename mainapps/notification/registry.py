@@ -0,0 +1,115 @@
+import logging
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import NotificationType
+
+logger = logging.getLogger(__name__)
+
+# Cache key holding the registry version shared by all worker processes
+REGISTRY_VERSION_KEY = 'notification:type_registry:version'
+
+
+class NotificationTypeRegistry:
+    """
+    Process-local cache of NotificationType rows.
+
+    All types are loaded in a single query and kept in memory. Every worker
+    compares its local copy against a version stamp stored in Redis, so an
+    edit saved through any worker reloads the registry everywhere.
+    """
+
+    _lock = threading.Lock()
+    _version = None
+    _by_name = {}
+    _by_id = {}
+
+    @classmethod
+    def get(cls, name):
+        """
+        Get a notification type by name
+
+        Raises:
+            NotificationType.DoesNotExist: if no type has that name
+        """
+        cls._ensure_fresh()
+        try:
+            return cls._by_name[name]
+        except KeyError:
+            raise NotificationType.DoesNotExist(f"Notification type '{name}' does not exist")
+
+    @classmethod
+    def get_by_id(cls, notification_type_id):
+        """
+        Get a notification type by primary key
+
+        Raises:
+            NotificationType.DoesNotExist: if no type has that ID
+        """
+        cls._ensure_fresh()
+        try:
+            return cls._by_id[int(notification_type_id)]
+        except (KeyError, TypeError, ValueError):
+            raise NotificationType.DoesNotExist(f"Notification type with ID {notification_type_id} does not exist")
+
+    @classmethod
+    def all(cls, active_only=True):
+        """List the notification types in category and name order"""
+        cls._ensure_fresh()
+        notification_types = sorted(cls._by_id.values(), key=lambda nt: (nt.category, nt.name))
+        if active_only:
+            notification_types = [nt for nt in notification_types if nt.is_active]
+        return notification_types
+
+    @classmethod
+    def exists(cls, name):
+        """Check whether a notification type with this name exists"""
+        cls._ensure_fresh()
+        return name in cls._by_name
+
+    @classmethod
+    def invalidate(cls):
+        """Drop the local copy and bump the shared version once the transaction commits"""
+        with cls._lock:
+            cls._version = None
+        transaction.on_commit(cls._bump_version)
+
+    @classmethod
+    def _bump_version(cls):
+        try:
+            cache.incr(REGISTRY_VERSION_KEY)
+        except ValueError:
+            # Key does not exist yet
+            cache.set(REGISTRY_VERSION_KEY, 1, timeout=None)
+        except Exception as e:
+            logger.warning(f"Error bumping notification type registry version: {e}")
+
+    @classmethod
+    def _current_version(cls):
+        try:
+            version = cache.get(REGISTRY_VERSION_KEY)
+            if version is None:
+                cache.add(REGISTRY_VERSION_KEY, 1, timeout=None)
+                version = cache.get(REGISTRY_VERSION_KEY, 1)
+            return version
+        except Exception as e:
+            # Cache unavailable, reload from the database every time
+            logger.warning(f"Error reading notification type registry version: {e}")
+            return None
+
+    @classmethod
+    def _ensure_fresh(cls):
+        version = cls._current_version()
+        if version is not None and version == cls._version:
+            return
+
+        with cls._lock:
+            if version is not None and version == cls._version:
+                return
+
+            notification_types = list(NotificationType.objects.all())
+            cls._by_name = {nt.name: nt for nt in notification_types}
+            cls._by_id = {nt.id: nt for nt in notification_types}
+            cls._version = version
@@ -0,0 +1,147 @@
+import logging
+import threading
+from string import Template
+
+logger = logging.getLogger(__name__)
+
+# Variables derived from the recipient
+USER_VARIABLES = {
+    'user_first_name': lambda user: user.first_name,
+    'user_last_name': lambda user: user.last_name,
+    'user_full_name': lambda user: f"{user.first_name} {user.last_name}".strip() or user.username,
+    'user_email': lambda user: user.email,
+}
+
+# Fields of the related object exposed as '<model>_<field>' variables
+RELATED_OBJECT_FIELDS = ('id', 'name', 'title', 'subject', 'description')
+
+# Body shown instead of a body template whose variables were not all provided
+FALLBACK_BODY = 'You have a new notification.'
+
+
+class CompiledTemplate:
+    """Title and body templates of a notification type, parsed once"""
+
+    def __init__(self, notification_type):
+        self.notification_type_name = notification_type.name
+        self.title = Template(notification_type.title_template)
+        self.body = Template(notification_type.body_template)
+        self.title_variables = frozenset(self.title.get_identifiers())
+        self.body_variables = frozenset(self.body.get_identifiers())
+        # Manifest of every variable the templates use
+        self.variables = self.title_variables | self.body_variables
+        self.user_variables = self.variables & USER_VARIABLES.keys()
+        # Shown in place of a template that cannot be fully rendered
+        self.fallback_title = notification_type.name.replace('_', ' ').capitalize()
+        self.fallback_body = notification_type.description or FALLBACK_BODY
+
+    def build_context(self, context_data=None, related_object=None):
+        """
+        Build the part of the context shared by every recipient
+
+        The related object's id and common fields are added as
+        '<model>_<field>' variables, without replacing caller values.
+        """
+        context = dict(context_data or {})
+        if related_object is not None:
+            prefix = f"{related_object.__class__.__name__.lower()}_"
+            for field in RELATED_OBJECT_FIELDS:
+                variable = f"{prefix}{field}"
+                if variable not in context and hasattr(related_object, field):
+                    context[variable] = getattr(related_object, field)
+        return context
+
+    def user_context(self, shared_context, user):
+        """Add the recipient variables to a shared context"""
+        context = dict(shared_context)
+        for variable, value in USER_VARIABLES.items():
+            if variable not in context:
+                context[variable] = value(user)
+        return context
+
+    def check_context(self, shared_context):
+        """
+        Report the variables a context cannot provide
+
+        Recipient variables are always available, so a shared context only
+        has to be checked once per fan-out rather than once per recipient.
+        Templates missing a variable are rendered as their fallback text.
+        """
+        missing = self.variables - self.user_variables - shared_context.keys()
+        if missing:
+            logger.warning(
+                f"Missing template variables for notification type "
+                f"'{self.notification_type_name}': {', '.join(sorted(missing))}, "
+                f"using the fallback text"
+            )
+        return missing
+
+    def render(self, context):
+        """Render the title and body, each falling back to a default text when a variable is missing"""
+        title = self.title.substitute(context) if self.title_variables <= context.keys() else self.fallback_title
+        body = self.body.substitute(context) if self.body_variables <= context.keys() else self.fallback_body
+        return title, body
+
+
+class TemplateCache:
+    """Process-local cache of compiled templates keyed by notification type version"""
+
+    _lock = threading.Lock()
+    _compiled = {}
+
+    @classmethod
+    def get(cls, notification_type):
+        version = (
+            notification_type.title_template, notification_type.body_template,
+            notification_type.name, notification_type.description
+        )
+        compiled = cls._compiled.get(notification_type.id)
+        if compiled is not None and compiled[0] == version:
+            return compiled[1]
+
+        template = CompiledTemplate(notification_type)
+        with cls._lock:
+            cls._compiled[notification_type.id] = (version, template)
+        return template
+
+
+def template_errors(template_string):
+    """
+    List the problems of a notification template string
+
+    Returns:
+        List of error messages, empty if the template is valid
+    """
+    template = Template(template_string)
+    if template.is_valid():
+        return []
+    # Find the offending placeholder the same way string.Template does
+    for match in template.pattern.finditer(template_string):
+        if match.group('invalid') is not None:
+            position = match.start('invalid')
+            return [f"Invalid placeholder at position {position}: use $name or ${{name}}, and $$ for a literal $"]
+    return ["Invalid placeholder"]
+
+
+def is_related_object_variable(variable):
+    """Whether a variable can come from a related object as '<model>_<field>'"""
+    prefix, _, field = variable.rpartition('_')
+    return bool(prefix) and field in RELATED_OBJECT_FIELDS
+
+
+def undeclared_variables(template_string, declared):
+    """
+    List the variables of a template that no sender provides
+
+    Recipient and related object variables are always allowed on top of
+    the declared context variables.
+    """
+    template = Template(template_string)
+    if not template.is_valid():
+        return []
+    return sorted(
+        variable for variable in set(template.get_identifiers())
+        if variable not in declared
+        and variable not in USER_VARIABLES
+        and not is_related_object_variable(variable)
+    )
@@ -0,0 +1,115 @@
+import gzip
+import json
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification
+from .counters import UnreadCounters
+from .watermarks import ReadWatermarks
+
+# Storage folder receiving the archived notifications
+ARCHIVE_PREFIX = 'notification-archive'
+
+# Rows written to one archive file and removed in one transaction
+ARCHIVE_CHUNK_SIZE = 5000
+
+# Columns copied to the archive, the search vector is derived from title and body
+ARCHIVE_FIELDS = [
+    field.attname for field in Notification._meta.concrete_fields
+    if field.name != 'search_vector'
+]
+
+
+class NotificationRetention:
+    """
+    Rolling retention for the Notification table.
+
+    Old rows are copied to gzip-compressed JSONL files on the default storage
+    and removed in primary key ranges. Notification IDs grow with creation
+    time, so the oldest rows form a contiguous ID range at the start of the
+    table and every chunk is a bounded range scan on the primary key index,
+    instead of one huge DELETE.
+    """
+
+    @classmethod
+    def run(cls):
+        """
+        Apply the configured retention policy
+
+        Read notifications older than NOTIFICATION_ARCHIVE_READ_AFTER_DAYS are
+        archived, and every notification older than NOTIFICATION_RETENTION_DAYS
+        is archived regardless of its read state.
+
+        Returns:
+            Dict with the number of read and expired notifications archived
+        """
+        now = timezone.now()
+        read_cutoff = now - timezone.timedelta(days=settings.NOTIFICATION_ARCHIVE_READ_AFTER_DAYS)
+        expiry_cutoff = now - timezone.timedelta(days=settings.NOTIFICATION_RETENTION_DAYS)
+        return {
+            'read': cls.archive(read_cutoff, read_only=True),
+            'expired': cls.archive(expiry_cutoff, read_only=False),
+        }
+
+    @classmethod
+    def archive(cls, older_than, read_only=True, chunk_size=ARCHIVE_CHUNK_SIZE):
+        """
+        Archive and remove notifications created before a cutoff
+
+        Args:
+            older_than: Datetime cutoff
+            read_only: Only archive notifications that have been read
+            chunk_size: Rows per archive file and delete
+
+        Returns:
+            Number of notifications archived
+        """
+        boundary_id = cls._first_id_after(older_than)
+        last_id = 0
+        total = 0
+
+        while True:
+            queryset = Notification.objects.filter(id__gt=last_id, created_at__lt=older_than)
+            if boundary_id is not None:
+                queryset = queryset.filter(id__lt=boundary_id)
+            if read_only:
+                queryset = queryset.exclude(ReadWatermarks.unread_condition())
+
+            rows = list(queryset.order_by('id').values(*ARCHIVE_FIELDS)[:chunk_size])
+            if not rows:
+                break
+
+            cls._write_archive(rows)
+            ids = [row['id'] for row in rows]
+            with transaction.atomic():
+                chunk = Notification.objects.filter(id__in=ids)
+                if not read_only:
+                    UnreadCounters.notifications_removed(chunk)
+                chunk.delete()
+
+            last_id = ids[-1]
+            total += len(rows)
+
+        return total
+
+    @classmethod
+    def _first_id_after(cls, cutoff):
+        """ID of the oldest notification created at or after the cutoff"""
+        return Notification.objects.filter(
+            created_at__gte=cutoff
+        ).order_by('id').values_list('id', flat=True).first()
+
+    @classmethod
+    def _write_archive(cls, rows):
+        """Store rows as one gzip-compressed JSONL file"""
+        lines = "".join(json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in rows)
+        path = (
+            f"{ARCHIVE_PREFIX}/{timezone.now():%Y/%m/%d}/"
+            f"notifications-{rows[0]['id']}-{rows[-1]['id']}.jsonl.gz"
+        )
+        return default_storage.save(path, ContentFile(gzip.compress(lines.encode())))
@@ -0,0 +1,62 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, Q
+from django.utils.text import smart_split
+
+# Text search configuration used by the search_vector trigger and the queries
+SEARCH_CONFIG = 'english'
+
+
+class NotificationSearch:
+    """
+    Full-text search over notification titles and bodies.
+
+    On PostgreSQL every notification carries a search_vector column, kept up
+    to date by a trigger (title weighted above body) and covered by a GIN
+    index, so searches are index lookups ranked with ts_rank. Other databases,
+    such as SQLite in tests, fall back to icontains matching.
+    """
+
+    @classmethod
+    def is_supported(cls, queryset):
+        """Check whether the queryset's database has the search vector column"""
+        return connections[queryset.db].vendor == 'postgresql'
+
+    @classmethod
+    def search(cls, queryset, text):
+        """
+        Filter a notification queryset by search text
+
+        Args:
+            queryset: Notification queryset
+            text: Search text, in web search syntax on PostgreSQL ("quoted
+                phrases", or, -excluded)
+
+        Returns:
+            Filtered queryset, annotated with search_rank on PostgreSQL
+        """
+        text = (text or '').strip()
+        if not text:
+            return queryset
+
+        if not cls.is_supported(queryset):
+            for term in smart_split(text):
+                exclude = term.startswith('-')
+                term = term.lstrip('-').strip('"')
+                if not term:
+                    continue
+                match = Q(title__icontains=term) | Q(body__icontains=term)
+                queryset = queryset.exclude(match) if exclude else queryset.filter(match)
+            return queryset
+
+        query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+
+    @classmethod
+    def rank(cls, queryset):
+        """Order searched notifications by relevance, newest first among equals"""
+        if 'search_rank' not in queryset.query.annotations:
+            return queryset
+        return queryset.order_by('-search_rank', '-created_at', '-id')
@@ -1,21 +1,57 @@
 import json
-from string import Template
+import logging
+from itertools import groupby
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
-from django.db.models import Q
+from django.db import transaction
 from django.conf import settings
+from django.core.cache import cache
 from django.urls import reverse
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 
 from .models import (
-    Notification, NotificationType, NotificationPreference,
-    NotificationBatch, ScheduledNotification
+    Notification, NotificationType,
+    NotificationBatch, ScheduledNotification, NotificationDigestEntry,
+    DeliveryStatus, DigestFrequency
 )
+from .registry import NotificationTypeRegistry
+from .preferences import NotificationPreferenceResolver
+from .counters import UnreadCounters
+from .realtime import publish_notifications
+from .rendering import TemplateCache
+from .watermarks import ReadWatermarks
+from mainapps.email_system.dispatcher import email_dispatcher
+
+logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
+# Rows written per bulk_create call when fanning out to many recipients
+BULK_CREATE_BATCH_SIZE = 500
+
+# External channels delivered asynchronously by the Celery tasks
+DELIVERY_CHANNELS = ('email', 'sms', 'push')
+
+# Emails handed to a single batched delivery task on fan-out
+EMAIL_BATCH_SIZE = 100
+
+# Users handled per committed chunk when streaming a notification batch
+BATCH_CHUNK_SIZE = 1000
+
+# Due scheduled notifications claimed per transaction
+SCHEDULED_CLAIM_BATCH_SIZE = 200
+
+# Cache key holding the metrics of the last scheduled notification run
+SCHEDULED_METRICS_KEY = 'notification:scheduled_dispatcher:metrics'
+
+# Recipients whose digests are rolled up per transaction
+DIGEST_RECIPIENT_BATCH_SIZE = 200
+
+# Fields refreshed when a duplicate event is folded into an existing notification
+COALESCE_FIELDS = ('title', 'body', 'priority', 'icon', 'color', 'action_url', 'data', 'updated_at')
+
 class NotificationService:
     """Service for creating and managing notifications"""
     
@@ -31,7 +67,9 @@ class NotificationService:
                            color=None,
                            send_email=None,
                            send_sms=None,
-                           send_push=None):
+                           send_push=None,
+                           allow_digest=True,
+                           coalesce=False):
         """
         Create a notification for a user
         
@@ -47,9 +85,15 @@ class NotificationService:
             send_email: Override whether to send email
             send_sms: Override whether to send SMS
             send_push: Override whether to send push notification
+            allow_digest: Hold the notification for the recipient's digest if
+                they chose one for this type
+            coalesce: Update the recipient's unread notification of the same
+                type about the same related object instead of creating a new
+                one, if it was created within NOTIFICATION_COALESCE_WINDOW_MINUTES
             
         Returns:
-            Notification object
+            Notification object, or None if it was not created or was held
+            for a digest
         """
         # Get user if ID was passed
         if isinstance(recipient, int):
@@ -60,55 +104,23 @@ class NotificationService:
         
         # Get notification type
         try:
-            notification_type = NotificationType.objects.get(name=notification_type_name)
+            notification_type = NotificationTypeRegistry.get(notification_type_name)
         except NotificationType.DoesNotExist:
             return None
         
-        # Check if user has disabled this notification type
-        try:
-            preference = NotificationPreference.objects.get(
-                user=recipient,
-                notification_type=notification_type
-            )
-            if not preference.receive_in_app:
-                return None
-        except NotificationPreference.DoesNotExist:
-            # No preference set, use defaults
-            pass
-        
-        # Prepare context data
-        if context_data is None:
-            context_data = {}
-            
-        # Add user data to context
-        context_data['user_first_name'] = recipient.first_name
-        context_data['user_last_name'] = recipient.last_name
-        context_data['user_full_name'] = f"{recipient.first_name} {recipient.last_name}".strip() or recipient.username
-        context_data['user_email'] = recipient.email
-        
-        # Add related object data if available
-        if related_object:
-            # Get object type name
-            model_name = related_object.__class__.__name__.lower()
-            context_data[f'{model_name}_id'] = related_object.id
-            
-            # Add common fields if they exist
-            for field in ['name', 'title', 'subject', 'description']:
-                if hasattr(related_object, field):
-                    context_data[f'{model_name}_{field}'] = getattr(related_object, field)
-        
-        # Process templates
-        title_template = Template(notification_type.title_template)
-        body_template = Template(notification_type.body_template)
+        # Resolve channel decisions from the user's preferences and the type defaults
+        decision = NotificationPreferenceResolver.resolve(
+            [recipient], notification_type,
+            overrides={'email': send_email, 'sms': send_sms, 'push': send_push}
+        )[recipient.id]
+        if not decision['in_app']:
+            return None
         
-        try:
-            title = title_template.substitute(**context_data)
-            body = body_template.substitute(**context_data)
-        except KeyError as e:
-            # Log the error and use fallback
-            print(f"Missing template variable: {e}")
-            title = notification_type.title_template
-            body = notification_type.body_template
+        template = TemplateCache.get(notification_type)
+        context_data = template.build_context(context_data, related_object)
+        template.check_context(context_data)
+        context_data = template.user_context(context_data, recipient)
+        title, body = template.render(context_data)
         
         # Create notification
         notification = Notification(
@@ -129,22 +141,19 @@ class NotificationService:
             notification.content_type = content_type
             notification.object_id = related_object.id
         
+        if allow_digest and decision['digest'] != DigestFrequency.IMMEDIATE:
+            cls._digest_entry(notification, decision).save()
+            return None
+        
+        if coalesce and related_object:
+            coalesced, _ = cls._coalesce([notification])
+            if coalesced:
+                return coalesced[0]
+        
+        cls._plan_channels(notification, decision)
         notification.save()
         
-        # Handle email notification
-        should_send_email = send_email if send_email is not None else notification_type.send_email
-        if should_send_email and recipient.email:
-            cls._send_email_notification(notification)
-            
-        # Handle SMS notification
-        should_send_sms = send_sms if send_sms is not None else notification_type.send_sms
-        if should_send_sms and hasattr(recipient, 'phone_number') and recipient.phone_number:
-            cls._send_sms_notification(notification)
-            
-        # Handle push notification
-        should_send_push = send_push if send_push is not None else notification_type.send_push
-        if should_send_push:
-            cls._send_push_notification(notification)
+        cls._after_save([notification])
             
         return notification
     
@@ -160,32 +169,246 @@ class NotificationService:
                                     color=None,
                                     send_email=None,
                                     send_sms=None,
-                                    send_push=None):
-        """Create notifications for multiple users"""
-        notifications = []
+                                    send_push=None,
+                                    batch_size=BULK_CREATE_BATCH_SIZE,
+                                    coalesce=False):
+        """
+        Create notifications for multiple users in bulk
+        
+        The notification type and related object are resolved once, all
+        recipients' preferences are loaded in a single query and the rows
+        are written with chunked bulk_create.
+        
+        Args:
+            recipients: Iterable of User objects and/or user IDs
+            batch_size: Number of rows written per bulk_create call
+            (remaining arguments as for create_notification)
+            
+        Returns:
+            List of created or coalesced notification IDs. Notifications held
+            for a recipient's digest are not included.
+        """
+        try:
+            notification_type = NotificationTypeRegistry.get(notification_type_name)
+        except NotificationType.DoesNotExist:
+            return []
+        
+        # Use User instances as given and load only the ones passed by ID
+        users = []
+        missing_ids = set()
         for recipient in recipients:
-            notification = cls.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type_name,
-                context_data=context_data,
-                related_object=related_object,
-                action_url=action_url,
-                priority=priority,
-                icon=icon,
-                color=color,
-                send_email=send_email,
-                send_sms=send_sms,
-                send_push=send_push
+            if isinstance(recipient, int):
+                missing_ids.add(recipient)
+            else:
+                users.append(recipient)
+        if missing_ids:
+            users.extend(User.objects.filter(id__in=missing_ids).only(
+                'id', 'username', 'first_name', 'last_name', 'email'
+            ))
+        users = list({user.id: user for user in users}.values())
+        if not users:
+            return []
+        
+        # Resolve every recipient's channels in one query
+        decisions = NotificationPreferenceResolver.resolve(
+            users, notification_type,
+            overrides={'email': send_email, 'sms': send_sms, 'push': send_push}
+        )
+        
+        content_type = None
+        if related_object:
+            content_type = ContentType.objects.get_for_model(related_object)
+        coalesce = coalesce and related_object is not None
+        
+        # Templates are parsed once and the shared context built once. When the
+        # templates use no recipient variables every row gets the same text.
+        template = TemplateCache.get(notification_type)
+        shared_context = template.build_context(context_data, related_object)
+        template.check_context(shared_context)
+        shared_render = None if template.user_variables else template.render(shared_context)
+        
+        created_ids = []
+        pending = []
+        digest_entries = []
+        for user in users:
+            decision = decisions[user.id]
+            if not decision['in_app']:
+                continue
+            
+            context = template.user_context(shared_context, user)
+            title, body = shared_render or template.render(context)
+            
+            notification = Notification(
+                recipient=user,
+                notification_type=notification_type,
+                title=title,
+                body=body,
+                priority=priority or notification_type.default_priority,
+                icon=icon or notification_type.icon,
+                color=color or notification_type.color,
+                action_url=action_url or '',
+                data=context,
+                content_type=content_type,
+                object_id=related_object.id if related_object else None
             )
-            if notification:
-                notifications.append(notification)
-        return notifications
+            if decision['digest'] != DigestFrequency.IMMEDIATE:
+                digest_entries.append(cls._digest_entry(notification, decision))
+                continue
+            
+            cls._plan_channels(notification, decision)
+            pending.append(notification)
+            
+            if len(pending) >= batch_size:
+                created_ids.extend(cls._flush_bulk(pending, coalesce))
+                pending = []
+        
+        if pending:
+            created_ids.extend(cls._flush_bulk(pending, coalesce))
+        if digest_entries:
+            NotificationDigestEntry.objects.bulk_create(digest_entries, batch_size=batch_size)
+        
+        return created_ids
+    
+    @classmethod
+    def _flush_bulk(cls, pending, coalesce=False):
+        """Write a chunk of notifications and dispatch their channels"""
+        coalesced = []
+        if coalesce:
+            coalesced, pending = cls._coalesce(pending)
+        
+        notifications = Notification.objects.bulk_create(pending) if pending else []
+        if notifications:
+            cls._after_save(notifications)
+        return [notification.id for notification in coalesced + notifications]
+    
+    @classmethod
+    def _coalesce(cls, pending):
+        """
+        Fold unsaved notifications into their recipients' recent duplicates
+        
+        A duplicate is an unread notification of the same type about the same
+        related object, created within the coalescing window. It is updated in
+        place with the new content; it stays unread and is not delivered again.
+        All notifications passed must share the type and related object.
+        
+        Returns:
+            Tuple of the updated existing notifications and the notifications
+            that still have to be created
+        """
+        first = pending[0]
+        since = timezone.now() - timezone.timedelta(minutes=settings.NOTIFICATION_COALESCE_WINDOW_MINUTES)
+        
+        # Latest duplicate per recipient, one query for the whole chunk
+        duplicates = {}
+        for notification in Notification.objects.filter(
+            ReadWatermarks.unread_condition(),
+            recipient_id__in=[n.recipient_id for n in pending],
+            notification_type_id=first.notification_type_id,
+            content_type_id=first.content_type_id,
+            object_id=first.object_id,
+            created_at__gte=since
+        ).order_by('created_at'):
+            duplicates[notification.recipient_id] = notification
+        
+        coalesced = []
+        remaining = []
+        now = timezone.now()
+        for notification in pending:
+            duplicate = duplicates.get(notification.recipient_id)
+            if duplicate is None:
+                remaining.append(notification)
+                continue
+            for field in COALESCE_FIELDS:
+                setattr(duplicate, field, getattr(notification, field))
+            duplicate.updated_at = now
+            coalesced.append(duplicate)
+        
+        if coalesced:
+            Notification.objects.bulk_update(coalesced, COALESCE_FIELDS)
+        return coalesced, remaining
+    
+    @classmethod
+    def _after_save(cls, notifications):
+        """Count, push to live clients and queue the deliveries of new notifications"""
+        UnreadCounters.notifications_created(notifications)
+        publish_notifications(notifications)
+        cls._dispatch_channels(notifications)
     
     @classmethod
-    def create_batch(cls, notification_type_name, template_data, name=None):
-        """Create a notification batch for processing"""
+    def _digest_entry(cls, notification, decision):
+        """Turn an unsaved notification into an entry for the recipient's next digest"""
+        return NotificationDigestEntry(
+            recipient=notification.recipient,
+            notification_type=notification.notification_type,
+            frequency=decision['digest'],
+            title=notification.title,
+            body=notification.body,
+            action_url=notification.action_url,
+            data=notification.data,
+            send_email=decision['email'] and bool(notification.recipient.email),
+            content_type=notification.content_type,
+            object_id=notification.object_id
+        )
+    
+    @classmethod
+    def _plan_channels(cls, notification, decision):
+        """Mark the external channels a not yet saved notification should go out on"""
+        recipient = notification.recipient
+        wanted = {
+            'email': decision['email'] and bool(recipient.email),
+            'sms': decision['sms'] and bool(getattr(recipient, 'phone_number', None)),
+            'push': decision['push'],
+        }
+        for channel in DELIVERY_CHANNELS:
+            status = DeliveryStatus.QUEUED if wanted[channel] else DeliveryStatus.NOT_REQUIRED
+            setattr(notification, f'{channel}_status', status)
+    
+    @classmethod
+    def _dispatch_channels(cls, notifications):
+        """
+        Queue a delivery task for every channel marked as queued.
+        
+        Tasks are only sent once the surrounding transaction commits so the
+        workers always find the notification rows.
+        """
+        from .tasks import DELIVERY_TASKS, deliver_email_notifications
+        
+        queued = {
+            channel: [
+                notification.id for notification in notifications
+                if getattr(notification, f'{channel}_status') == DeliveryStatus.QUEUED
+            ]
+            for channel in DELIVERY_CHANNELS
+        }
+        if not any(queued.values()):
+            return
+        
+        def enqueue():
+            # Fan-out emails go in batches so one task sends them over one connection
+            email_ids = queued.pop('email')
+            if len(email_ids) > 1:
+                for start in range(0, len(email_ids), EMAIL_BATCH_SIZE):
+                    deliver_email_notifications.delay(email_ids[start:start + EMAIL_BATCH_SIZE])
+            elif email_ids:
+                DELIVERY_TASKS['email'].delay(email_ids[0])
+            
+            for channel, notification_ids in queued.items():
+                for notification_id in notification_ids:
+                    DELIVERY_TASKS[channel].delay(notification_id)
+        
+        transaction.on_commit(enqueue)
+    
+    @classmethod
+    def create_batch(cls, notification_type_name, template_data, name=None, process_async=False):
+        """
+        Create a notification batch for processing
+        
+        Args:
+            process_async: Process the batch on a Celery worker once the
+                transaction commits
+        """
         try:
-            notification_type = NotificationType.objects.get(name=notification_type_name)
+            notification_type = NotificationTypeRegistry.get(notification_type_name)
         except NotificationType.DoesNotExist:
             return None
             
@@ -196,51 +419,97 @@ class NotificationService:
             status='pending'
         )
         batch.save()
+        
+        if process_async:
+            from .tasks import process_notification_batch
+            transaction.on_commit(lambda: process_notification_batch.delay(batch.id))
         return batch
     
     @classmethod
-    def process_batch(cls, batch_id):
-        """Process a notification batch"""
+    def process_batch(cls, batch_id, max_chunks=None):
+        """
+        Process a notification batch as a stream of user chunks
+        
+        Users are walked in primary key order. Every chunk is written with
+        bulk inserts in the same transaction that advances the batch cursor
+        and notifications_count, so a batch interrupted by a crash resumes
+        after the last committed chunk when processed again.
+        
+        Args:
+            batch_id: ID of the NotificationBatch
+            max_chunks: Stop after this many chunks, leaving the batch in
+                processing for a later call to continue
+            
+        Returns:
+            True if the batch is completed, False otherwise
+        """
         try:
             batch = NotificationBatch.objects.get(id=batch_id)
         except NotificationBatch.DoesNotExist:
             return False
-            
-        if batch.status != 'pending':
+        
+        # A batch left in processing is resumed from its cursor
+        if batch.status not in ('pending', 'processing'):
             return False
-            
-        batch.status = 'processing'
-        batch.save(update_fields=['status', 'updated_at'])
         
+        if batch.status == 'pending':
+            NotificationBatch.objects.filter(id=batch_id, status='pending').update(
+                status='processing', updated_at=timezone.now()
+            )
+        
+        chunks = 0
         try:
-            # Get all users who haven't disabled this notification type
-            users = User.objects.filter(
-                Q(notification_preferences__notification_type=batch.notification_type, 
-                  notification_preferences__receive_in_app=True) |
-                ~Q(notification_preferences__notification_type=batch.notification_type)
-            ).distinct()
-            
-            count = 0
-            for user in users:
-                notification = cls.create_notification(
-                    recipient=user,
-                    notification_type_name=batch.notification_type.name,
-                    context_data=batch.template_data
-                )
-                if notification:
-                    count += 1
-            
-            batch.notifications_count = count
+            while max_chunks is None or chunks < max_chunks:
+                if not cls._process_batch_chunk(batch_id):
+                    break
+                chunks += 1
+        except Exception as e:
+            NotificationBatch.objects.filter(id=batch_id).update(
+                status='failed', error_message=str(e), updated_at=timezone.now()
+            )
+            return False
+        
+        return NotificationBatch.objects.filter(id=batch_id, status='completed').exists()
+    
+    @classmethod
+    @transaction.atomic
+    def _process_batch_chunk(cls, batch_id):
+        """
+        Write the notifications for the next chunk of users and advance the cursor
+        
+        The batch row stays locked until the chunk commits, so concurrent
+        workers on the same batch never process the same users.
+        
+        Returns:
+            False once there is nothing left to process
+        """
+        batch = NotificationBatch.objects.select_for_update().get(id=batch_id)
+        if batch.status != 'processing':
+            return False
+        
+        users = list(
+            User.objects.filter(id__gt=batch.last_user_id)
+            .order_by('id')
+            .only('id', 'username', 'first_name', 'last_name', 'email')[:BATCH_CHUNK_SIZE]
+        )
+        if not users:
             batch.status = 'completed'
             batch.processed_at = timezone.now()
-            batch.save(update_fields=['notifications_count', 'status', 'processed_at', 'updated_at'])
-            return True
-            
-        except Exception as e:
-            batch.status = 'failed'
-            batch.error_message = str(e)
-            batch.save(update_fields=['status', 'error_message', 'updated_at'])
+            batch.save(update_fields=['status', 'processed_at', 'updated_at'])
             return False
+        
+        # Preferences are resolved per chunk, users who disabled the type are skipped
+        notification_type = NotificationTypeRegistry.get_by_id(batch.notification_type_id)
+        created_ids = cls.create_notification_for_many(
+            recipients=users,
+            notification_type_name=notification_type.name,
+            context_data=batch.template_data
+        )
+        
+        batch.last_user_id = users[-1].id
+        batch.notifications_count += len(created_ids)
+        batch.save(update_fields=['last_user_id', 'notifications_count', 'updated_at'])
+        return True
     
     @classmethod
     def schedule_notification(cls, 
@@ -260,7 +529,7 @@ class NotificationService:
         
         # Get notification type
         try:
-            notification_type = NotificationType.objects.get(name=notification_type_name)
+            notification_type = NotificationTypeRegistry.get(notification_type_name)
         except NotificationType.DoesNotExist:
             return None
             
@@ -277,52 +546,216 @@ class NotificationService:
         return scheduled
     
     @classmethod
-    def process_scheduled_notifications(cls):
-        """Process all scheduled notifications that are due"""
+    def process_scheduled_notifications(cls, batch_size=SCHEDULED_CLAIM_BATCH_SIZE, max_batches=None):
+        """
+        Process the scheduled notifications that are due
+        
+        Due rows are claimed in batches with SELECT ... FOR UPDATE SKIP LOCKED,
+        so any number of dispatchers can run at once without sending the same
+        notification twice.
+        
+        Args:
+            batch_size: Number of rows claimed per transaction
+            max_batches: Stop after this many batches, None to drain the queue
+            
+        Returns:
+            Dict of dispatcher metrics: processed, sent and failed counts and
+            the average and maximum lag in seconds between scheduled_time and
+            the moment each notification was dispatched
+        """
+        metrics = {'processed': 0, 'sent': 0, 'failed': 0, 'avg_lag_seconds': 0.0, 'max_lag_seconds': 0.0}
+        total_lag = 0.0
+        batches = 0
+        
+        while max_batches is None or batches < max_batches:
+            lags, sent, failed = cls._dispatch_scheduled_batch(batch_size)
+            if not lags:
+                break
+            batches += 1
+            metrics['processed'] += len(lags)
+            metrics['sent'] += sent
+            metrics['failed'] += failed
+            metrics['max_lag_seconds'] = max(metrics['max_lag_seconds'], max(lags))
+            total_lag += sum(lags)
+        
+        if metrics['processed']:
+            metrics['avg_lag_seconds'] = total_lag / metrics['processed']
+        
+        try:
+            cache.set(SCHEDULED_METRICS_KEY, {**metrics, 'finished_at': timezone.now().isoformat()}, timeout=None)
+        except Exception as e:
+            logger.warning(f"Error storing scheduled notification metrics: {e}")
+        return metrics
+    
+    @classmethod
+    @transaction.atomic
+    def _dispatch_scheduled_batch(cls, batch_size):
+        """
+        Claim and send one batch of due scheduled notifications
+        
+        Returns:
+            Tuple of (lag in seconds of every claimed row, sent count, failed count)
+        """
         now = timezone.now()
-        due_notifications = ScheduledNotification.objects.filter(
-            scheduled_time__lte=now,
-            status='pending'
+        due = list(
+            ScheduledNotification.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('recipient', 'notification_type')
+            .filter(scheduled_time__lte=now, status='pending')
+            .order_by('scheduled_time')[:batch_size]
         )
         
-        for scheduled in due_notifications:
+        next_occurrences = []
+        lags = []
+        sent = failed = 0
+        for scheduled in due:
+            lags.append((now - scheduled.scheduled_time).total_seconds())
             try:
-                # Create the notification
-                notification = cls.create_notification(
-                    recipient=scheduled.recipient,
-                    notification_type_name=scheduled.notification_type.name,
-                    context_data=scheduled.template_data
-                )
+                # Savepoint so one failing row does not roll back the whole batch
+                with transaction.atomic():
+                    notification = cls.create_notification(
+                        recipient=scheduled.recipient,
+                        notification_type_name=scheduled.notification_type.name,
+                        context_data=scheduled.template_data,
+                        allow_digest=False
+                    )
                 
                 if notification:
                     scheduled.notification = notification
                     scheduled.status = 'sent'
+                    sent += 1
                 else:
                     scheduled.status = 'failed'
-                    
+                    failed += 1
+                
                 # Handle recurring notifications
                 if scheduled.is_recurring and scheduled.recurrence_pattern:
-                    # Create the next occurrence
                     next_time = cls._calculate_next_occurrence(
                         scheduled.scheduled_time, 
                         scheduled.recurrence_pattern
                     )
                     if next_time:
-                        cls.schedule_notification(
+                        next_occurrences.append(ScheduledNotification(
+                            notification_type=scheduled.notification_type,
                             recipient=scheduled.recipient,
-                            notification_type_name=scheduled.notification_type.name,
+                            template_data=scheduled.template_data,
                             scheduled_time=next_time,
-                            context_data=scheduled.template_data,
                             is_recurring=True,
-                            recurrence_pattern=scheduled.recurrence_pattern
-                        )
-                
-                scheduled.save()
+                            recurrence_pattern=scheduled.recurrence_pattern,
+                            status='pending'
+                        ))
                 
             except Exception as e:
                 scheduled.status = 'failed'
-                scheduled.save()
-                print(f"Error processing scheduled notification {scheduled.id}: {e}")
+                failed += 1
+                logger.warning(f"Error processing scheduled notification {scheduled.id}: {e}")
+            
+            scheduled.updated_at = now
+        
+        if due:
+            ScheduledNotification.objects.bulk_update(due, ['status', 'notification', 'updated_at'])
+        if next_occurrences:
+            ScheduledNotification.objects.bulk_create(next_occurrences)
+        return lags, sent, failed
+    
+    @classmethod
+    def process_digests(cls, frequency):
+        """
+        Roll up the pending digest entries for a frequency
+        
+        Entries are grouped per recipient and notification type into a single
+        notification, which gets one email if any of its entries asked for one.
+        
+        Args:
+            frequency: DigestFrequency value to roll up (hourly or daily)
+            
+        Returns:
+            Number of digest notifications created
+        """
+        cutoff = timezone.now()
+        recipient_ids = list(
+            NotificationDigestEntry.objects.filter(
+                frequency=frequency, created_at__lte=cutoff
+            ).values_list('recipient_id', flat=True).distinct()
+        )
+        
+        count = 0
+        for start in range(0, len(recipient_ids), DIGEST_RECIPIENT_BATCH_SIZE):
+            count += cls._roll_up_digests(
+                recipient_ids[start:start + DIGEST_RECIPIENT_BATCH_SIZE], frequency, cutoff
+            )
+        return count
+    
+    @classmethod
+    @transaction.atomic
+    def _roll_up_digests(cls, recipient_ids, frequency, cutoff):
+        """Turn the digest entries of some recipients into notifications"""
+        # Skip rows another worker is already rolling up
+        entries = list(
+            NotificationDigestEntry.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('recipient', 'notification_type')
+            .filter(recipient_id__in=recipient_ids, frequency=frequency, created_at__lte=cutoff)
+            .order_by('recipient_id', 'notification_type_id', 'created_at')
+        )
+        if not entries:
+            return 0
+        
+        notifications = [
+            cls._build_digest_notification(list(group), frequency)
+            for _, group in groupby(entries, key=lambda e: (e.recipient_id, e.notification_type_id))
+        ]
+        notifications = Notification.objects.bulk_create(notifications, batch_size=BULK_CREATE_BATCH_SIZE)
+        NotificationDigestEntry.objects.filter(id__in=[entry.id for entry in entries]).delete()
+        
+        cls._after_save(notifications)
+        return len(notifications)
+    
+    @classmethod
+    def _build_digest_notification(cls, entries, frequency):
+        """Build the unsaved notification summarising one recipient's entries of one type"""
+        first = entries[0]
+        notification_type = first.notification_type
+        
+        if len(entries) == 1:
+            title, body = first.title, first.body
+        else:
+            title = f"{len(entries)} {notification_type.name.replace('_', ' ')} updates"
+            body = "\n".join(f"- {entry.title}" for entry in entries)
+        
+        # Keep the link and related object only if every entry shares them
+        action_urls = {entry.action_url for entry in entries}
+        related = {(entry.content_type_id, entry.object_id) for entry in entries}
+        content_type_id, object_id = related.pop() if len(related) == 1 else (None, None)
+        
+        notification = Notification(
+            recipient=first.recipient,
+            notification_type=notification_type,
+            title=title[:255],
+            body=body,
+            priority=notification_type.default_priority,
+            icon=notification_type.icon,
+            color=notification_type.color,
+            action_url=action_urls.pop() if len(action_urls) == 1 else '',
+            content_type_id=content_type_id,
+            object_id=object_id,
+            data={
+                'digest_frequency': frequency,
+                'digest_items': [
+                    {
+                        'title': entry.title,
+                        'body': entry.body,
+                        'action_url': entry.action_url,
+                        'created_at': entry.created_at.isoformat(),
+                    }
+                    for entry in entries
+                ],
+            }
+        )
+        cls._plan_channels(notification, {
+            'email': any(entry.send_email for entry in entries),
+            'sms': False,
+            'push': False,
+        })
+        return notification
     
     @classmethod
     def _calculate_next_occurrence(cls, current_time, pattern):
@@ -357,129 +790,91 @@ class NotificationService:
     
     @classmethod
     def _send_email_notification(cls, notification):
-        """Send an email notification"""
-        try:
-            # Get user's email preference
-            try:
-                preference = NotificationPreference.objects.get(
-                    user=notification.recipient,
-                    notification_type=notification.notification_type
-                )
-                if not preference.receive_email:
-                    return False
-            except NotificationPreference.DoesNotExist:
-                # No preference set, use defaults
-                pass
-                
-            # Prepare email content
-            context = {
-                'notification': notification,
-                'recipient': notification.recipient,
-                'site_name': settings.SITE_NAME,
-                'site_url': settings.SITE_URL,
-            }
-            
-            # Add notification data to context
-            context.update(notification.data)
-            
-            # Render email templates
-            subject = notification.title
-            html_message = render_to_string('notifications/email_notification.html', context)
-            plain_message = render_to_string('notifications/email_notification_plain.txt', context)
-            
-            # Send email
-            send_mail(
-                subject=subject,
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[notification.recipient.email],
-                html_message=html_message,
-                fail_silently=False
-            )
-            
-            # Mark as sent
-            notification.is_email_sent = True
-            notification.save(update_fields=['is_email_sent', 'updated_at'])
-            return True
-            
-        except Exception as e:
-            print(f"Error sending email notification: {e}")
+        """
+        Send an email notification
+        
+        Raises on delivery errors so the calling task can retry.
+        """
+        message = cls._build_email_message(notification)
+        if message is None:
             return False
+        
+        email_dispatcher.send_message(message)
+        return True
+    
+    @classmethod
+    def _build_email_message(cls, notification):
+        """Render the email for a notification, or None if the recipient has no address"""
+        if not notification.recipient.email:
+            return None
+            
+        # Prepare email content
+        context = {
+            'notification': notification,
+            'recipient': notification.recipient,
+            'site_name': settings.SITE_NAME,
+            'site_url': settings.SITE_URL,
+        }
+        
+        # Add notification data to context
+        context.update(notification.data)
+        
+        # Render email templates
+        subject = notification.title
+        html_message = render_to_string('notifications/email_notification.html', context)
+        plain_message = render_to_string('notifications/email_notification_plain.txt', context)
+        
+        message = EmailMultiAlternatives(
+            subject,
+            plain_message,
+            settings.DEFAULT_FROM_EMAIL,
+            [notification.recipient.email]
+        )
+        message.attach_alternative(html_message, "text/html")
+        return message
     
     @classmethod
     def _send_sms_notification(cls, notification):
-        """Send an SMS notification"""
+        """
+        Send an SMS notification
+        
+        Raises on delivery errors so the calling task can retry.
+        """
         # This is a placeholder - implement with your SMS provider
-        try:
-            # Get user's SMS preference
-            try:
-                preference = NotificationPreference.objects.get(
-                    user=notification.recipient,
-                    notification_type=notification.notification_type
-                )
-                if not preference.receive_sms:
-                    return False
-            except NotificationPreference.DoesNotExist:
-                # No preference set, use defaults
-                pass
-                
-            # Get user's phone number
-            if not hasattr(notification.recipient, 'phone_number') or not notification.recipient.phone_number:
-                return False
-                
-            # Implement SMS sending logic here
-            # For example, using Twilio:
-            # from twilio.rest import Client
-            # client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            # message = client.messages.create(
-            #     body=notification.body,
-            #     from_=settings.TWILIO_PHONE_NUMBER,
-            #     to=notification.recipient.phone_number
-            # )
-            
-            # For now, just mark as sent
-            notification.is_sms_sent = True
-            notification.save(update_fields=['is_sms_sent', 'updated_at'])
-            return True
-            
-        except Exception as e:
-            print(f"Error sending SMS notification: {e}")
+        
+        # Get user's phone number
+        if not hasattr(notification.recipient, 'phone_number') or not notification.recipient.phone_number:
             return False
+            
+        # Implement SMS sending logic here
+        # For example, using Twilio:
+        # from twilio.rest import Client
+        # client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        # message = client.messages.create(
+        #     body=notification.body,
+        #     from_=settings.TWILIO_PHONE_NUMBER,
+        #     to=notification.recipient.phone_number
+        # )
+        return True
     
     @classmethod
     def _send_push_notification(cls, notification):
-        """Send a push notification"""
+        """
+        Send a push notification
+        
+        Raises on delivery errors so the calling task can retry.
+        """
         # This is a placeholder - implement with your push notification provider
-        try:
-            # Get user's push preference
-            try:
-                preference = NotificationPreference.objects.get(
-                    user=notification.recipient,
-                    notification_type=notification.notification_type
-                )
-                if not preference.receive_push:
-                    return False
-            except NotificationPreference.DoesNotExist:
-                # No preference set, use defaults
-                pass
-                
-            # Implement push notification logic here
-            # For example, using Firebase Cloud Messaging:
-            # from firebase_admin import messaging
-            # message = messaging.Message(
-            #     notification=messaging.Notification(
-            #         title=notification.title,
-            #         body=notification.body,
-            #     ),
-            #     token=notification.recipient.fcm_token,
-            # )
-            # response = messaging.send(message)
-            
-            # For now, just mark as sent
-            notification.is_push_sent = True
-            notification.save(update_fields=['is_push_sent', 'updated_at'])
-            return True
-            
-        except Exception as e:
-            print(f"Error sending push notification: {e}")
-            return False
+        
+        # Implement push notification logic here
+        # For example, using Firebase Cloud Messaging:
+        # from firebase_admin import messaging
+        # message = messaging.Message(
+        #     notification=messaging.Notification(
+        #         title=notification.title,
+        #         body=notification.body,
+        #     ),
+        #     token=notification.recipient.fcm_token,
+        # )
+        # response = messaging.send(message)
+        return True
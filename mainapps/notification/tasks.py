@@ -0,0 +1,281 @@
+from celery import shared_task
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+import logging
+
+from .models import Notification, NotificationBatch, DeliveryStatus
+from .services import NotificationService
+from .counters import UnreadCounters
+from .retention import NotificationRetention
+from mainapps.email_system.dispatcher import email_dispatcher
+
+logger = logging.getLogger(__name__)
+
+# Retry policy shared by the delivery tasks: exponential backoff starting at
+# 30 seconds, capped at one hour, with jitter to spread retries out
+DELIVERY_RETRY_OPTIONS = {
+    'autoretry_for': (Exception,),
+    'retry_backoff': 30,
+    'retry_backoff_max': 3600,
+    'retry_jitter': True,
+    'max_retries': 5,
+}
+
+# Chunks processed by one batch task before it hands over to a fresh task
+BATCH_CHUNKS_PER_TASK = 10
+
+# Batches in processing without progress for this long are considered stalled
+BATCH_STALL_TIMEOUT = timezone.timedelta(minutes=10)
+
+# Deliveries left in sending for this long belong to a worker that died
+# mid-send; they become claimable again and are swept back into the queue
+DELIVERY_STALL_TIMEOUT = timezone.timedelta(minutes=15)
+
+CHANNEL_SENDERS = {
+    'email': NotificationService._send_email_notification,
+    'sms': NotificationService._send_sms_notification,
+    'push': NotificationService._send_push_notification,
+}
+
+
+def _claimable(channel):
+    """Condition matching the notifications whose channel may be claimed for delivery"""
+    status_field = f'{channel}_status'
+    return Q(**{f'{status_field}__in': [DeliveryStatus.QUEUED, DeliveryStatus.FAILED]}) | Q(**{
+        status_field: DeliveryStatus.SENDING,
+        'updated_at__lt': timezone.now() - DELIVERY_STALL_TIMEOUT,
+    })
+
+
+def _mark_failed(notification_ids, channel, error):
+    """Release claimed deliveries that were not sent so a retry can claim them again"""
+    status_field = f'{channel}_status'
+    Notification.objects.filter(
+        id__in=notification_ids, **{status_field: DeliveryStatus.SENDING}
+    ).update(**{
+        status_field: DeliveryStatus.FAILED,
+        'last_delivery_error': f"{channel}: {error}",
+        'updated_at': timezone.now(),
+    })
+
+
+def _deliver(notification_id, channel):
+    """
+    Deliver one notification on one channel.
+
+    The (notification, channel) pair is the idempotency key: the channel is
+    claimed by moving its status from queued/failed to sending in a single
+    conditional UPDATE, so a duplicated or retried task that loses the race,
+    or runs after a successful send, does nothing. A claim left in sending
+    past DELIVERY_STALL_TIMEOUT can be taken over.
+    """
+    status_field = f'{channel}_status'
+    rows = Notification.objects.filter(id=notification_id)
+
+    claimed = rows.filter(_claimable(channel)).update(
+        **{status_field: DeliveryStatus.SENDING, 'updated_at': timezone.now()}
+    )
+    if not claimed:
+        return False
+
+    try:
+        notification = Notification.objects.select_related(
+            'recipient', 'notification_type'
+        ).get(id=notification_id)
+        sent = CHANNEL_SENDERS[channel](notification)
+    except Exception as e:
+        _mark_failed([notification_id], channel, e)
+        logger.warning(f"Failed to deliver {channel} for notification {notification_id}: {e}")
+        raise
+
+    if not sent:
+        rows.update(**{status_field: DeliveryStatus.NOT_REQUIRED, 'updated_at': timezone.now()})
+        return False
+
+    rows.update(**{
+        status_field: DeliveryStatus.SENT,
+        f'is_{channel}_sent': True,
+        'updated_at': timezone.now(),
+    })
+    return True
+
+
+@shared_task(**DELIVERY_RETRY_OPTIONS)
+def deliver_email_notification(notification_id):
+    """Send the email for a notification"""
+    return _deliver(notification_id, 'email')
+
+
+@shared_task(**DELIVERY_RETRY_OPTIONS)
+def deliver_email_notifications(notification_ids):
+    """
+    Send the emails for many notifications over the pooled SMTP connection
+
+    Rows are claimed with SKIP LOCKED so overlapping batches never send the
+    same email twice. Only the emails that failed are retried: the whole
+    task is retried, but the rows already sent are no longer claimable.
+    """
+    with transaction.atomic():
+        claimed_ids = list(
+            Notification.objects.select_for_update(skip_locked=True).filter(
+                _claimable('email'), id__in=notification_ids
+            ).values_list('id', flat=True)
+        )
+        Notification.objects.filter(id__in=claimed_ids).update(
+            email_status=DeliveryStatus.SENDING, updated_at=timezone.now()
+        )
+    if not claimed_ids:
+        return 0
+
+    try:
+        notifications = Notification.objects.select_related(
+            'recipient', 'notification_type'
+        ).filter(id__in=claimed_ids)
+
+        messages = {}
+        skipped_ids = []
+        for notification in notifications:
+            message = NotificationService._build_email_message(notification)
+            if message is None:
+                skipped_ids.append(notification.id)
+            else:
+                messages[notification.id] = message
+
+        sent, failed = email_dispatcher.send_messages(messages.values())
+        message_ids = {id(message): notification_id for notification_id, message in messages.items()}
+        sent_ids = [message_ids[id(message)] for message in sent]
+
+        now = timezone.now()
+        Notification.objects.filter(id__in=sent_ids).update(
+            email_status=DeliveryStatus.SENT, is_email_sent=True, updated_at=now
+        )
+        Notification.objects.filter(id__in=skipped_ids).update(
+            email_status=DeliveryStatus.NOT_REQUIRED, updated_at=now
+        )
+        for message, error in failed:
+            Notification.objects.filter(id=message_ids[id(message)]).update(
+                email_status=DeliveryStatus.FAILED,
+                last_delivery_error=f"email: {error}",
+                updated_at=now
+            )
+    except Exception as e:
+        # Rows still in sending were never handed off, release them for the retry
+        _mark_failed(claimed_ids, 'email', e)
+        logger.warning(f"Failed to deliver notification email batch: {e}")
+        raise
+
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(messages)} notification emails failed")
+    return len(sent_ids)
+
+
+@shared_task(**DELIVERY_RETRY_OPTIONS)
+def deliver_sms_notification(notification_id):
+    """Send the SMS for a notification"""
+    return _deliver(notification_id, 'sms')
+
+
+@shared_task(**DELIVERY_RETRY_OPTIONS)
+def deliver_push_notification(notification_id):
+    """Send the push notification for a notification"""
+    return _deliver(notification_id, 'push')
+
+
+DELIVERY_TASKS = {
+    'email': deliver_email_notification,
+    'sms': deliver_sms_notification,
+    'push': deliver_push_notification,
+}
+
+
+@shared_task
+def requeue_stalled_deliveries():
+    """Periodic job re-enqueueing deliveries whose worker died after claiming them"""
+    stalled_before = timezone.now() - DELIVERY_STALL_TIMEOUT
+    count = 0
+    for channel, task in DELIVERY_TASKS.items():
+        stalled_ids = list(
+            Notification.objects.filter(**{
+                f'{channel}_status': DeliveryStatus.SENDING,
+                'updated_at__lt': stalled_before,
+            }).values_list('id', flat=True)
+        )
+        for notification_id in stalled_ids:
+            task.delay(notification_id)
+        if stalled_ids:
+            logger.warning(f"Requeued {len(stalled_ids)} stalled {channel} notification deliveries")
+        count += len(stalled_ids)
+    return count
+
+
+@shared_task
+def send_notification_digests(frequency):
+    """Periodic job rolling up pending digest entries, scheduled by Celery beat"""
+    count = NotificationService.process_digests(frequency)
+    logger.info(f"Created {count} {frequency} notification digests")
+    return count
+
+
+@shared_task
+def process_notification_batch(batch_id):
+    """
+    Stream a notification batch a few chunks at a time
+
+    The task re-enqueues itself until the batch is completed, so a long
+    batch does not hold one worker for its whole run.
+    """
+    completed = NotificationService.process_batch(batch_id, max_chunks=BATCH_CHUNKS_PER_TASK)
+    if not completed and NotificationBatch.objects.filter(id=batch_id, status='processing').exists():
+        process_notification_batch.delay(batch_id)
+    return completed
+
+
+@shared_task
+def resume_stalled_notification_batches():
+    """Periodic job re-enqueueing batches whose worker died mid-run"""
+    stalled_ids = list(
+        NotificationBatch.objects.filter(
+            status='processing',
+            updated_at__lt=timezone.now() - BATCH_STALL_TIMEOUT
+        ).values_list('id', flat=True)
+    )
+    for batch_id in stalled_ids:
+        logger.warning(f"Resuming stalled notification batch {batch_id}")
+        process_notification_batch.delay(batch_id)
+    return len(stalled_ids)
+
+
+@shared_task
+def dispatch_scheduled_notifications():
+    """
+    Periodic job sending the scheduled notifications that are due
+
+    Safe to run on several workers at once, every worker claims its own rows.
+    """
+    metrics = NotificationService.process_scheduled_notifications()
+    if metrics['processed']:
+        logger.info(
+            f"Dispatched {metrics['processed']} scheduled notifications "
+            f"({metrics['sent']} sent, {metrics['failed']} failed), "
+            f"lag avg {metrics['avg_lag_seconds']:.1f}s max {metrics['max_lag_seconds']:.1f}s"
+        )
+    return metrics
+
+
+@shared_task
+def reconcile_unread_counters():
+    """Periodic job rebuilding the Redis unread counters from the database"""
+    count = UnreadCounters.reconcile()
+    logger.info(f"Reconciled unread notification counters for {count} users")
+    return count
+
+
+@shared_task
+def archive_old_notifications():
+    """Periodic job archiving notifications past their retention to storage"""
+    counts = NotificationRetention.run()
+    logger.info(
+        f"Archived {counts['read']} read and {counts['expired']} expired notifications"
+    )
+    return counts
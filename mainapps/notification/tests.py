@@ -1,3 +1,589 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from mainapps.notification import counters, tasks
+from mainapps.notification.models import (
+    DeliveryStatus, DigestFrequency, Notification, NotificationDigestEntry,
+    NotificationPreference, NotificationReadWatermark, NotificationType
+)
+from mainapps.notification.preferences import NotificationPreferenceResolver
+from mainapps.notification.registry import NotificationTypeRegistry
+from mainapps.notification.rendering import FALLBACK_BODY
+from mainapps.notification.services import NotificationService
+from mainapps.notification.watermarks import ReadWatermarks
+
+User = get_user_model()
+
+
+class NotificationTestCase(TestCase):
+    """Starts every test with an empty cache and a registry reloaded from the database"""
+
+    def setUp(self):
+        cache.clear()
+        NotificationTypeRegistry.invalidate()
+
+
+class DeliveryClaimTest(NotificationTestCase):
+    """A delivery is claimed once, and released for a retry whenever it was not sent"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='deliveryuser', email='deliveryuser@example.com')
+        cls.notification_type = NotificationType.objects.create(
+            name='delivery_test', title_template='Title', body_template='Body'
+        )
+
+    def create_notification(self, **fields):
+        return Notification.objects.create(
+            recipient=self.user,
+            notification_type=self.notification_type,
+            title='Title',
+            body='Body',
+            email_status=DeliveryStatus.QUEUED,
+            **fields
+        )
+
+    def set_claimed_at(self, notification, moment):
+        Notification.objects.filter(id=notification.id).update(email_status=DeliveryStatus.SENDING, updated_at=moment)
+
+    def sent_all(self, messages):
+        return list(messages), []
+
+    def test_batch_marks_sent(self):
+        notifications = [self.create_notification() for _ in range(2)]
+        with mock.patch.object(tasks.email_dispatcher, 'send_messages', side_effect=self.sent_all):
+            self.assertEqual(tasks.deliver_email_notifications([n.id for n in notifications]), 2)
+
+        for notification in notifications:
+            notification.refresh_from_db()
+            self.assertEqual(notification.email_status, DeliveryStatus.SENT)
+            self.assertTrue(notification.is_email_sent)
+
+    def test_batch_releases_claim_when_building_fails(self):
+        notification = self.create_notification()
+        with mock.patch.object(NotificationService, '_build_email_message', side_effect=RuntimeError('template broke')):
+            with self.assertRaises(RuntimeError), self.assertLogs(tasks.logger, level='WARNING'):
+                tasks.deliver_email_notifications([notification.id])
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.email_status, DeliveryStatus.FAILED)
+        self.assertIn('template broke', notification.last_delivery_error)
+
+        # The retry claims the failed row again
+        with mock.patch.object(tasks.email_dispatcher, 'send_messages', side_effect=self.sent_all):
+            self.assertEqual(tasks.deliver_email_notifications([notification.id]), 1)
+
+    def test_batch_releases_claim_when_dispatcher_fails(self):
+        notification = self.create_notification()
+        with mock.patch.object(tasks.email_dispatcher, 'send_messages', side_effect=ConnectionError('smtp down')):
+            with self.assertRaises(ConnectionError), self.assertLogs(tasks.logger, level='WARNING'):
+                tasks.deliver_email_notifications([notification.id])
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.email_status, DeliveryStatus.FAILED)
+        self.assertIn('smtp down', notification.last_delivery_error)
+
+    def test_single_delivery_releases_claim_on_error(self):
+        notification = self.create_notification()
+        with mock.patch.dict(tasks.CHANNEL_SENDERS, email=mock.Mock(side_effect=RuntimeError('boom'))):
+            with self.assertRaises(RuntimeError), self.assertLogs(tasks.logger, level='WARNING'):
+                tasks._deliver(notification.id, 'email')
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.email_status, DeliveryStatus.FAILED)
+        self.assertEqual(notification.last_delivery_error, 'email: boom')
+
+    def test_sent_delivery_is_not_claimed_again(self):
+        notification = self.create_notification()
+        sender = mock.Mock(return_value=True)
+        with mock.patch.dict(tasks.CHANNEL_SENDERS, email=sender):
+            self.assertTrue(tasks._deliver(notification.id, 'email'))
+            self.assertFalse(tasks._deliver(notification.id, 'email'))
+        self.assertEqual(sender.call_count, 1)
+
+    def test_fresh_claim_is_left_alone(self):
+        notification = self.create_notification()
+        self.set_claimed_at(notification, timezone.now())
+
+        sender = mock.Mock(return_value=True)
+        with mock.patch.dict(tasks.CHANNEL_SENDERS, email=sender):
+            self.assertFalse(tasks._deliver(notification.id, 'email'))
+        sender.assert_not_called()
+
+    def test_stalled_claim_is_taken_over(self):
+        notification = self.create_notification()
+        self.set_claimed_at(notification, timezone.now() - tasks.DELIVERY_STALL_TIMEOUT * 2)
+
+        with mock.patch.object(tasks.email_dispatcher, 'send_messages', side_effect=self.sent_all):
+            self.assertEqual(tasks.deliver_email_notifications([notification.id]), 1)
+        notification.refresh_from_db()
+        self.assertEqual(notification.email_status, DeliveryStatus.SENT)
+
+    def test_sweep_requeues_stalled_deliveries(self):
+        stalled = self.create_notification()
+        fresh = self.create_notification()
+        self.set_claimed_at(stalled, timezone.now() - tasks.DELIVERY_STALL_TIMEOUT * 2)
+        self.set_claimed_at(fresh, timezone.now())
+
+        with mock.patch.object(tasks.deliver_email_notification, 'delay') as delay, self.assertLogs(tasks.logger, level='WARNING'):
+            self.assertEqual(tasks.requeue_stalled_deliveries(), 1)
+        delay.assert_called_once_with(stalled.id)
+
+
+class KeysetPaginationTest(NotificationTestCase):
+    """Cursor pages walk the newest-first order without gaps or repeats"""
+
+    URL = '/notification_api/notifications/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='pageuser', email='pageuser@example.com')
+        notification_type = NotificationType.objects.create(
+            name='page_test', title_template='Title', body_template='Body'
+        )
+        now = timezone.now()
+        cls.notifications = [
+            Notification.objects.create(
+                recipient=cls.user, notification_type=notification_type, title=f'Title {i}', body='Body'
+            )
+            for i in range(5)
+        ]
+        # Two notifications share a timestamp, the id breaks the tie
+        moments = [now - timezone.timedelta(minutes=m) for m in (4, 3, 3, 2, 1)]
+        for notification, moment in zip(cls.notifications, moments):
+            Notification.objects.filter(id=notification.id).update(created_at=moment)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_walks_every_notification_once(self):
+        seen = []
+        response = self.client.get(self.URL, {'cursor': '', 'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['next_cursor']:
+                break
+            response = self.client.get(self.URL, {'cursor': response.data['next_cursor'], 'page_size': 2})
+
+        expected = [n.id for n in reversed(self.notifications)]
+        expected[2], expected[3] = max(expected[2:4]), min(expected[2:4])
+        self.assertEqual(seen, expected)
+
+    def test_default_ordering_accepts_cursor(self):
+        response = self.client.get(self.URL, {'cursor': '', 'ordering': '-created_at'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_other_ordering_rejects_cursor(self):
+        response = self.client.get(self.URL, {'cursor': '', 'ordering': 'priority'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+
+    def test_search_rejects_cursor(self):
+        response = self.client.get(self.URL, {'cursor': '', 'search': 'Title'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_numbers_keep_ordering_and_search(self):
+        response = self.client.get(self.URL, {'ordering': 'created_at', 'search': 'Title'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(response.data['results'][0]['id'], self.notifications[0].id)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.URL, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class TemplateRenderingTest(NotificationTestCase):
+    """Templates render from the context, and never ship unfilled placeholders"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='renderuser', email='renderuser@example.com', first_name='Ada', last_name='Lovelace'
+        )
+        cls.notification_type = NotificationType.objects.create(
+            name='render_test',
+            description='Something happened',
+            title_template='Hello $user_first_name',
+            body_template='$project_title costs $$$amount'
+        )
+
+    def test_renders_context_and_recipient_variables(self):
+        notification = NotificationService.create_notification(
+            self.user, 'render_test', context_data={'project_title': 'Bridge', 'amount': '10'}
+        )
+        self.assertEqual(notification.title, 'Hello Ada')
+        self.assertEqual(notification.body, 'Bridge costs $10')
+
+    def test_missing_variable_falls_back(self):
+        with self.assertLogs('mainapps.notification.rendering', level='WARNING'):
+            notification = NotificationService.create_notification(
+                self.user, 'render_test', context_data={'project_title': 'Bridge'}
+            )
+        self.assertEqual(notification.title, 'Hello Ada')
+        self.assertEqual(notification.body, 'Something happened')
+        self.assertNotIn('$', notification.body)
+
+    def test_fan_out_falls_back_without_description(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notification_type.description = ''
+            self.notification_type.save()
+        with self.assertLogs('mainapps.notification.rendering', level='WARNING'):
+            ids = NotificationService.create_notification_for_many([self.user], 'render_test')
+        self.assertEqual(Notification.objects.get(id=ids[0]).body, FALLBACK_BODY)
+
+    def test_data_keeps_recipient_and_related_object_keys(self):
+        notification = NotificationService.create_notification(
+            self.user, 'render_test',
+            context_data={'project_title': 'Bridge', 'amount': '10'},
+            related_object=self.notification_type
+        )
+        self.assertEqual(notification.data['notificationtype_id'], self.notification_type.id)
+        self.assertEqual(notification.data['notificationtype_name'], 'render_test')
+        self.assertEqual(notification.data['user_full_name'], 'Ada Lovelace')
+        self.assertEqual(notification.data['user_email'], 'renderuser@example.com')
+
+    def test_save_rejects_malformed_placeholders(self):
+        self.notification_type.body_template = 'Costs $10'
+        with self.assertRaises(ValidationError):
+            self.notification_type.save()
+
+    def test_save_rejects_undeclared_variables(self):
+        self.notification_type.context_variables = ['project_title']
+        with self.assertRaises(ValidationError) as raised:
+            self.notification_type.save()
+        self.assertIn('body_template', raised.exception.message_dict)
+
+        # Recipient and related object variables need no declaration
+        self.notification_type.context_variables = ['amount']
+        self.notification_type.save()
+
+    def test_api_rejects_undeclared_variables(self):
+        admin = User.objects.create(username='typeadmin', email='typeadmin@example.com', is_staff=True, is_superuser=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.patch(
+            f'/notification_api/notification-types/{self.notification_type.id}/',
+            {'context_variables': ['project_title']},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('body_template', response.data)
+
+
+class ReadWatermarkTest(NotificationTestCase):
+    """Read state derived from the mark-all-read watermark and per-row overrides"""
+
+    URL = '/notification_api/notifications/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='readuser', email='readuser@example.com')
+        cls.other = User.objects.create(username='otherreader', email='otherreader@example.com')
+        cls.notification_type = NotificationType.objects.create(
+            name='read_test', title_template='Title', body_template='Body'
+        )
+        cls.notifications = [cls.create_notification(cls.user) for _ in range(3)]
+
+    @classmethod
+    def create_notification(cls, recipient):
+        return Notification.objects.create(
+            recipient=recipient, notification_type=cls.notification_type, title='Title', body='Body'
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def unread_count(self):
+        return self.client.get(f'{self.URL}recent/').data['unread_count']
+
+    def read_states(self):
+        response = self.client.get(self.URL, {'page_size': 100})
+        return {row['id']: row['is_read'] for row in response.data['results']}
+
+    def mark_all_read(self, **data):
+        return self.client.post(f'{self.URL}mark_all_read/', data, format='json')
+
+    def test_mark_all_read(self):
+        self.assertEqual(self.unread_count(), 3)
+        response = self.mark_all_read()
+        self.assertEqual(response.data['count'], 3)
+
+        self.assertEqual(self.unread_count(), 0)
+        self.assertTrue(all(self.read_states().values()))
+        # No notification row was rewritten
+        self.assertFalse(Notification.objects.filter(recipient=self.user, is_read=True).exists())
+
+    def test_watermark_stops_at_recipient_notifications(self):
+        others = self.create_notification(self.other)
+        self.mark_all_read()
+
+        watermark = NotificationReadWatermark.objects.get(user=self.user, category='')
+        self.assertEqual(watermark.read_up_to_id, self.notifications[-1].id)
+        self.assertLess(watermark.read_up_to_id, others.id)
+
+    def test_notifications_above_watermark_stay_unread(self):
+        self.mark_all_read()
+        newer = self.create_notification(self.user)
+
+        self.assertEqual(self.unread_count(), 1)
+        self.assertFalse(self.read_states()[newer.id])
+
+        newer.mark_as_read()
+        self.assertEqual(self.unread_count(), 0)
+        self.assertTrue(self.read_states()[newer.id])
+
+    def test_marked_unread_below_watermark(self):
+        self.mark_all_read()
+        target = self.notifications[0]
+        self.client.post(f'{self.URL}{target.id}/mark_unread/')
+
+        self.assertEqual(self.unread_count(), 1)
+        self.assertFalse(self.read_states()[target.id])
+
+        self.client.post(f'{self.URL}{target.id}/mark_read/')
+        self.assertEqual(self.unread_count(), 0)
+        self.assertTrue(self.read_states()[target.id])
+
+    def test_mark_all_read_clears_overrides(self):
+        self.mark_all_read()
+        target = self.notifications[0]
+        target.mark_as_unread()
+        self.assertEqual(self.unread_count(), 1)
+
+        self.assertEqual(self.mark_all_read().data['count'], 1)
+        self.assertEqual(self.unread_count(), 0)
+        target.refresh_from_db()
+        self.assertFalse(target.marked_unread)
+
+    def test_up_to_id_leaves_newer_notifications_unread(self):
+        last_seen = self.notifications[1]
+        response = self.mark_all_read(up_to_id=last_seen.id)
+        self.assertEqual(response.data['count'], 2)
+
+        states = self.read_states()
+        self.assertTrue(states[self.notifications[0].id])
+        self.assertTrue(states[last_seen.id])
+        self.assertFalse(states[self.notifications[2].id])
+        self.assertEqual(self.unread_count(), 1)
+
+    def test_stale_up_to_id_keeps_watermark(self):
+        self.mark_all_read()
+        self.assertEqual(self.mark_all_read(up_to_id=self.notifications[0].id).data['count'], 0)
+
+        watermark = NotificationReadWatermark.objects.get(user=self.user, category='')
+        self.assertEqual(watermark.read_up_to_id, self.notifications[-1].id)
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_patch_is_read(self):
+        target = self.notifications[0]
+        response = self.client.patch(f'{self.URL}{target.id}/', {'is_read': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_read'])
+
+        target.refresh_from_db()
+        self.assertTrue(target.is_read)
+        self.assertIsNotNone(target.read_at)
+        self.assertEqual(self.unread_count(), 2)
+
+    def test_patch_is_read_false_below_watermark(self):
+        self.mark_all_read()
+        target = self.notifications[0]
+        response = self.client.patch(f'{self.URL}{target.id}/', {'is_read': False}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['is_read'])
+
+        target.refresh_from_db()
+        self.assertTrue(target.marked_unread)
+        self.assertFalse(self.read_states()[target.id])
+        self.assertEqual(self.unread_count(), 1)
+
+    def test_invalid_up_to_id(self):
+        self.assertEqual(self.mark_all_read(up_to_id='latest').status_code, 400)
+
+    def test_unread_condition_matches_derived_state(self):
+        ReadWatermarks.mark_all_read(self.user)
+        newer = self.create_notification(self.user)
+        self.notifications[1].mark_as_unread()
+
+        unread = Notification.objects.filter(ReadWatermarks.unread_condition(), recipient=self.user)
+        self.assertEqual(set(unread.values_list('id', flat=True)), {self.notifications[1].id, newer.id})
+
+
+class PreferenceResolutionTest(NotificationTestCase):
+    """Channel decisions come from sparse stored preferences over the type defaults"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.notification_type = NotificationType.objects.create(
+            name='preference_test', title_template='Title', body_template='Body', send_email=True
+        )
+        cls.default_user = User.objects.create(username='defaults', email='defaults@example.com')
+        cls.quiet_user = User.objects.create(username='quiet', email='quiet@example.com')
+        cls.digest_user = User.objects.create(username='digester', email='digester@example.com')
+        NotificationPreference.objects.create(
+            user=cls.quiet_user, notification_type=cls.notification_type,
+            receive_in_app=False, receive_email=False, receive_sms=False, receive_push=False
+        )
+        NotificationPreference.objects.create(
+            user=cls.digest_user, notification_type=cls.notification_type,
+            receive_email=True, receive_sms=False, receive_push=False,
+            digest_frequency=DigestFrequency.DAILY
+        )
+
+    def resolve(self, **kwargs):
+        users = [self.default_user, self.quiet_user, self.digest_user]
+        return NotificationPreferenceResolver.resolve(users, self.notification_type, **kwargs)
+
+    def test_stored_preferences_override_type_defaults(self):
+        with self.assertNumQueries(1):
+            decisions = self.resolve()
+
+        self.assertEqual(decisions[self.default_user.id], {
+            'in_app': True, 'email': True, 'sms': False, 'push': False, 'digest': DigestFrequency.IMMEDIATE
+        })
+        self.assertFalse(decisions[self.quiet_user.id]['in_app'])
+        self.assertFalse(decisions[self.quiet_user.id]['email'])
+        self.assertEqual(decisions[self.digest_user.id]['digest'], DigestFrequency.DAILY)
+
+    def test_overrides(self):
+        decisions = self.resolve(overrides={'email': False, 'sms': True})
+        self.assertFalse(any(decision['email'] for decision in decisions.values()))
+        # True only replaces the default, a stored preference still wins
+        self.assertTrue(decisions[self.default_user.id]['sms'])
+        self.assertFalse(decisions[self.quiet_user.id]['sms'])
+
+    def test_mandatory_types_ignore_preferences(self):
+        self.notification_type.can_disable = False
+        with self.assertNumQueries(0):
+            decisions = self.resolve()
+        self.assertTrue(all(decision['in_app'] for decision in decisions.values()))
+
+    def test_unknown_type_denies_every_channel(self):
+        decisions = NotificationPreferenceResolver.resolve([self.default_user], 'no_such_type')
+        self.assertFalse(any(value for key, value in decisions[self.default_user.id].items() if key != 'digest'))
+
+    def test_fan_out_follows_decisions(self):
+        users = [self.default_user, self.quiet_user, self.digest_user]
+        ids = NotificationService.create_notification_for_many(users, 'preference_test')
+
+        notification = Notification.objects.get(id__in=ids)
+        self.assertEqual(notification.recipient, self.default_user)
+        self.assertEqual(notification.email_status, DeliveryStatus.QUEUED)
+        self.assertEqual(notification.sms_status, DeliveryStatus.NOT_REQUIRED)
+        entry = NotificationDigestEntry.objects.get()
+        self.assertEqual(entry.recipient, self.digest_user)
+        self.assertEqual(entry.frequency, DigestFrequency.DAILY)
+
+
+class UnreadCounterTest(NotificationTestCase):
+    """Unread counters move with notification writes, and only once they commit"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='counted', email='counted@example.com')
+        cls.notification_type = NotificationType.objects.create(
+            name='counter_test', title_template='Title', body_template='Body', category='task'
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.redis = mock.MagicMock()
+        self.redis.pipeline.return_value.execute.return_value = [1]
+        self.redis.register_script.return_value.return_value = 0
+        patcher = mock.patch.object(counters, 'redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(counters, 'publish_events')
+        self.publish_events = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def increments(self):
+        """Counter increments sent to Redis, as (user_id, args) pairs"""
+        script = self.redis.register_script.return_value
+        return [
+            (int(call.kwargs['keys'][0].rsplit(':', 1)[1]), call.kwargs['args'])
+            for call in script.call_args_list if call.kwargs.get('client') is not None
+        ]
+
+    def test_created_notifications_count_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            NotificationService.create_notification_for_many([self.user], 'counter_test')
+            self.assertEqual(self.increments(), [])
+        for callback in callbacks:
+            callback()
+
+        self.assertIn((self.user.id, ['total', 1, 'category:task', 1]), self.increments())
+
+    def test_read_and_unread_adjust_by_one(self):
+        notification = Notification.objects.create(
+            recipient=self.user, notification_type=self.notification_type, title='Title', body='Body'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            notification.mark_as_read()
+            # Repeated reads are only uncounted once
+            notification.mark_as_read()
+        self.assertEqual(self.increments(), [(self.user.id, ['total', -1, 'category:task', -1])])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notification.mark_as_unread()
+        self.assertEqual(self.increments()[-1], (self.user.id, ['total', 1, 'category:task', 1]))
+
+    def test_mark_all_read_clears_counters(self):
+        Notification.objects.create(
+            recipient=self.user, notification_type=self.notification_type, title='Title', body='Body'
+        )
+        self.redis.hgetall.return_value = {b'total': b'1', b'category:task': b'1'}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ReadWatermarks.mark_all_read(self.user), 1)
+
+        clear_calls = [
+            call for call in self.redis.register_script.return_value.call_args_list
+            if call.kwargs.get('client') is None
+        ]
+        self.assertEqual(clear_calls[-1].kwargs['args'], [''])
+        self.publish_events.assert_called_with([(self.user.id, 'unread_count', {'total': 0})])
+
+    def test_missing_counter_is_rebuilt_from_database(self):
+        for _ in range(2):
+            Notification.objects.create(
+                recipient=self.user, notification_type=self.notification_type, title='Title', body='Body'
+            )
+        self.redis.hgetall.return_value = {}
+
+        self.assertEqual(counters.UnreadCounters.get(self.user.id), {'total': 2, 'by_category': {'task': 2}})
+
+
+class RegistryInvalidationTest(NotificationTestCase):
+    """Saved notification types are picked up by the registry after commit"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.notification_type = NotificationType.objects.create(
+            name='registry_test', title_template='Old title', body_template='Body'
+        )
+
+    def test_saved_type_reloads_after_commit(self):
+        self.assertEqual(NotificationTypeRegistry.get('registry_test').title_template, 'Old title')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notification_type.title_template = 'New title'
+            self.notification_type.save()
+        self.assertEqual(NotificationTypeRegistry.get('registry_test').title_template, 'New title')
 
-# Create your tests here.
+    def test_registry_is_served_from_memory(self):
+        NotificationTypeRegistry.get('registry_test')
+        with self.assertNumQueries(0):
+            NotificationTypeRegistry.get('registry_test')
@@ -0,0 +1,107 @@
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Notification, NotificationReadWatermark
+from .counters import UnreadCounters
+
+
+class ReadWatermarks:
+    """
+    Mark-all-read through per-user "read up to" watermarks.
+
+    Marking everything read stores the highest notification ID in a single
+    watermark row instead of updating every unread notification. Read state
+    is then derived: a notification is unread when its own is_read flag is
+    off and it is either above the user's watermarks or explicitly marked
+    unread. Use unread_condition() wherever unread notifications are queried.
+    """
+
+    @classmethod
+    def covered_condition(cls):
+        """Condition matching notifications under one of their recipient's watermarks"""
+        return Exists(
+            NotificationReadWatermark.objects.filter(
+                user_id=OuterRef('recipient_id'),
+                read_up_to_id__gte=OuterRef('id'),
+            ).filter(
+                Q(category='') | Q(category=OuterRef('notification_type__category'))
+            )
+        )
+
+    @classmethod
+    def unread_condition(cls):
+        """Condition matching unread notifications, for filter() and aggregates"""
+        return Q(is_read=False) & (Q(marked_unread=True) | ~cls.covered_condition())
+
+    @classmethod
+    def mark_all_read(cls, user, category=None, up_to_id=None):
+        """
+        Mark every current notification of a user as read
+
+        Args:
+            user: User instance
+            category: Optional notification category to limit the change to
+            up_to_id: Optional ID of the newest notification the client has
+                seen; newer notifications stay unread
+
+        Returns:
+            Number of notifications that were unread
+        """
+        notifications = Notification.objects.filter(recipient=user)
+        if category:
+            notifications = notifications.filter(notification_type__category=category)
+        if up_to_id is not None:
+            notifications = notifications.filter(id__lte=up_to_id)
+
+        # The watermark stops at the user's own newest notification, so
+        # notifications created for them later are never covered by it
+        read_up_to_id = notifications.order_by('-id').values_list('id', flat=True).first()
+        if read_up_to_id is None:
+            return 0
+
+        with transaction.atomic():
+            if up_to_id is None:
+                counts = UnreadCounters.get(user.id)
+                count = counts['by_category'].get(category, 0) if category else counts['total']
+            else:
+                # Only part of the unread notifications is covered, count
+                # exactly what becomes read
+                newly_read = {
+                    row['notification_type__category']: row['count']
+                    for row in notifications.filter(cls.unread_condition()).values(
+                        'notification_type__category'
+                    ).annotate(count=Count('id')).order_by()
+                }
+                count = sum(newly_read.values())
+
+            watermark, created = NotificationReadWatermark.objects.select_for_update().get_or_create(
+                user=user,
+                category=category or '',
+                defaults={'read_up_to_id': read_up_to_id}
+            )
+            # A stale cursor never moves the watermark back
+            if not created and watermark.read_up_to_id < read_up_to_id:
+                watermark.read_up_to_id = read_up_to_id
+                watermark.save(update_fields=['read_up_to_id', 'updated_at'])
+            if not category:
+                # Category watermarks below the new one no longer matter
+                NotificationReadWatermark.objects.filter(
+                    user=user, read_up_to_id__lte=watermark.read_up_to_id
+                ).exclude(category='').delete()
+
+            # Notifications explicitly marked unread are not covered by the
+            # watermark, mark those few rows read directly
+            notifications.filter(marked_unread=True, id__lte=read_up_to_id).update(
+                is_read=True, read_at=timezone.now(), marked_unread=False
+            )
+
+            if up_to_id is None:
+                UnreadCounters.clear(user.id, category)
+            elif newly_read:
+                UnreadCounters.adjust({user.id: {
+                    notification_category: -notification_count
+                    for notification_category, notification_count in newly_read.items()
+                }})
+
+        return count
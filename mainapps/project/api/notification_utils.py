@@ -5,7 +5,6 @@ This centralizes all notification creation to ensure consistency and proper pref
 
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from mainapps.notification.models import Notification, NotificationType, NotificationPreference
 from mainapps.notification.services import NotificationService
 
 User = get_user_model()
@@ -17,57 +16,6 @@ PROJECT_EXPENSE_URL = "/dashboard/projects/{project_id}"
 PROJECT_UPDATE_URL = "/dashboard/projects/{project_id}"
 SETTINGS_NOTIFICATIONS_URL = "/settings/notifications"
 
-def should_notify_user(user, notification_type_name, channel='in_app'):
-    """
-    Check if a user should receive a notification based on their preferences.
-    
-    Args:
-        user: The user to check
-        notification_type_name: The name of the notification type
-        channel: The notification channel ('in_app', 'email', 'push')
-        
-    Returns:
-        Boolean indicating if the user should be notified
-    """
-    try:
-        notification_type = NotificationType.objects.get(name=notification_type_name)
-        
-        # If notification type cannot be disabled, always send it
-        if not notification_type.can_disable:
-            return True
-            
-        # Check user preference
-        try:
-            preference = NotificationPreference.objects.get(
-                user=user,
-                notification_type=notification_type
-            )
-            
-            # Check the appropriate channel preference
-            if channel == 'in_app':
-                return preference.receive_in_app
-            elif channel == 'email':
-                return preference.receive_email
-            elif channel == 'push':
-                return preference.receive_push
-            else:
-                return True
-                
-        except NotificationPreference.DoesNotExist:
-            # If no preference exists, use the default from notification type
-            if channel == 'in_app':
-                return True  # In-app notifications are always on by default
-            elif channel == 'email':
-                return notification_type.send_email
-            elif channel == 'push':
-                return notification_type.send_push
-            else:
-                return True
-                
-    except NotificationType.DoesNotExist:
-        # If notification type doesn't exist, don't send notification
-        return False
-
 def notify_project_created(project):
     """Send notification when a new project is created"""
     # Notify admins and executives
@@ -82,25 +30,22 @@ def notify_project_created(project):
         profile__is_DB_executive=True
     )
     
-    for user in admins_and_executives:
-        if should_notify_user(user, 'project_created', 'in_app'):
-            NotificationService.create_notification(
-                recipient=user,
-                notification_type_name='project_created',
-                context_data={
-                    'project_title': project.title,
-                    'project_type': project.get_project_type_display(),
-                    'created_by': project.created_by.get_full_name or project.created_by.username,
-                },
-                action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
-                priority='normal',
-                icon='file-plus',
-                color='#4CAF50',
-                send_email=should_notify_user(user, 'project_created', 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=admins_and_executives,
+        notification_type_name='project_created',
+        context_data={
+            'project_title': project.title,
+            'project_type': project.get_project_type_display(),
+            'created_by': project.created_by.get_full_name or project.created_by.username,
+        },
+        action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
+        priority='normal',
+        icon='file-plus',
+        color='#4CAF50'
+    )
     
     # Also notify the creator for confirmation
-    if project.created_by and should_notify_user(project.created_by, 'project_created', 'in_app'):
+    if project.created_by:
         NotificationService.create_notification(
             recipient=project.created_by,
             notification_type_name='project_created',
@@ -111,8 +56,7 @@ def notify_project_created(project):
             action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
             priority='normal',
             icon='file-plus',
-            color='#4CAF50',
-            send_email=should_notify_user(project.created_by, 'project_created', 'email')
+            color='#4CAF50'
         )
 
 def notify_project_status_changed(project, old_status, new_status, changed_by):
@@ -125,7 +69,7 @@ def notify_project_status_changed(project, old_status, new_status, changed_by):
         recipients.add(project.manager)
     
     # Notify team members
-    for team_member in project.team_members.all():
+    for team_member in project.team_members.select_related('user'):
         recipients.add(team_member.user)
     
     # Notify officials
@@ -193,23 +137,20 @@ def notify_project_status_changed(project, old_status, new_status, changed_by):
     }
     color = color_map.get(new_status, '#2196F3')
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'project_title': project.title,
-                    'old_status': dict(project.STATUS_CHOICES).get(old_status, old_status),
-                    'new_status': dict(project.STATUS_CHOICES).get(new_status, new_status),
-                    'changed_by': changed_by.get_full_name or changed_by.username,
-                },
-                action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
-                priority=priority,
-                icon=icon,
-                color=color,
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'project_title': project.title,
+            'old_status': dict(project.STATUS_CHOICES).get(old_status, old_status),
+            'new_status': dict(project.STATUS_CHOICES).get(new_status, new_status),
+            'changed_by': changed_by.get_full_name or changed_by.username,
+        },
+        action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
+        priority=priority,
+        icon=icon,
+        color=color
+    )
 
 def notify_team_member_added(team_member):
     """Send notification when a user is added to a project team"""
@@ -217,23 +158,21 @@ def notify_team_member_added(team_member):
     user = team_member.user
     
     # Notify the user who was added
-    if should_notify_user(user, 'team_member_added', 'in_app'):
-        NotificationService.create_notification(
-            recipient=user,
-            notification_type_name='team_member_added',
-            context_data={
-                'project_title': project.title,
-                'role': dict(team_member.ROLE_CHOICES).get(team_member.role, team_member.role),
-            },
-            action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
-            priority='normal',
-            icon='users',
-            color='#2196F3',
-            send_email=should_notify_user(user, 'team_member_added', 'email')
-        )
+    NotificationService.create_notification(
+        recipient=user,
+        notification_type_name='team_member_added',
+        context_data={
+            'project_title': project.title,
+            'role': dict(team_member.ROLE_CHOICES).get(team_member.role, team_member.role),
+        },
+        action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
+        priority='normal',
+        icon='users',
+        color='#2196F3'
+    )
     
     # Notify the project manager
-    if project.manager and project.manager != user and should_notify_user(project.manager, 'team_member_added', 'in_app'):
+    if project.manager and project.manager != user:
         NotificationService.create_notification(
             recipient=project.manager,
             notification_type_name='team_member_added',
@@ -245,30 +184,27 @@ def notify_team_member_added(team_member):
             action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
             priority='normal',
             icon='user-plus',
-            color='#2196F3',
-            send_email=should_notify_user(project.manager, 'team_member_added', 'email')
+            color='#2196F3'
         )
 
 def notify_team_member_removed(project, user, role):
     """Send notification when a user is removed from a project team"""
     # Notify the user who was removed
-    if should_notify_user(user, 'team_member_removed', 'in_app'):
-        NotificationService.create_notification(
-            recipient=user,
-            notification_type_name='team_member_removed',
-            context_data={
-                'project_title': project.title,
-                'role': role,
-            },
-            action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
-            priority='normal',
-            icon='user-minus',
-            color='#FF9800',
-            send_email=should_notify_user(user, 'team_member_removed', 'email')
-        )
+    NotificationService.create_notification(
+        recipient=user,
+        notification_type_name='team_member_removed',
+        context_data={
+            'project_title': project.title,
+            'role': role,
+        },
+        action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
+        priority='normal',
+        icon='user-minus',
+        color='#FF9800'
+    )
     
     # Notify the project manager
-    if project.manager and project.manager != user and should_notify_user(project.manager, 'team_member_removed', 'in_app'):
+    if project.manager and project.manager != user:
         NotificationService.create_notification(
             recipient=project.manager,
             notification_type_name='team_member_removed',
@@ -280,8 +216,7 @@ def notify_team_member_removed(project, user, role):
             action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
             priority='normal',
             icon='user-minus',
-            color='#FF9800',
-            send_email=should_notify_user(project.manager, 'team_member_removed', 'email')
+            color='#FF9800'
         )
 
 def notify_milestone_created(milestone):
@@ -289,7 +224,7 @@ def notify_milestone_created(milestone):
     project = milestone.project
     
     # Notify the project manager
-    if project.manager and should_notify_user(project.manager, 'milestone_created', 'in_app'):
+    if project.manager:
         NotificationService.create_notification(
             recipient=project.manager,
             notification_type_name='milestone_created',
@@ -302,68 +237,60 @@ def notify_milestone_created(milestone):
             action_url=PROJECT_MILESTONE_URL.format(project_id=project.id, milestone_id=milestone.id),
             priority='normal',
             icon='flag',
-            color='#2196F3',
-            send_email=should_notify_user(project.manager, 'milestone_created', 'email')
+            color='#2196F3'
         )
     
     # Notify assigned users
-    for user in milestone.assigned_to.all():
-        if should_notify_user(user, 'milestone_assigned', 'in_app'):
-            NotificationService.create_notification(
-                recipient=user,
-                notification_type_name='milestone_assigned',
-                context_data={
-                    'project_title': project.title,
-                    'milestone_title': milestone.title,
-                    'due_date': milestone.due_date.strftime('%Y-%m-%d'),
-                },
-                action_url=PROJECT_MILESTONE_URL.format(project_id=project.id, milestone_id=milestone.id),
-                priority='normal',
-                icon='flag',
-                color='#2196F3',
-                send_email=should_notify_user(user, 'milestone_assigned', 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=milestone.assigned_to.all(),
+        notification_type_name='milestone_assigned',
+        context_data={
+            'project_title': project.title,
+            'milestone_title': milestone.title,
+            'due_date': milestone.due_date.strftime('%Y-%m-%d'),
+        },
+        action_url=PROJECT_MILESTONE_URL.format(project_id=project.id, milestone_id=milestone.id),
+        priority='normal',
+        icon='flag',
+        color='#2196F3'
+    )
 
 def notify_milestone_assigned(milestone, user):
     """Send notification when a user is assigned to a milestone"""
     project = milestone.project
     
     # Notify the assigned user
-    if should_notify_user(user, 'milestone_assigned', 'in_app'):
-        NotificationService.create_notification(
-            recipient=user,
-            notification_type_name='milestone_assigned',
-            context_data={
-                'project_title': project.title,
-                'milestone_title': milestone.title,
-                'due_date': milestone.due_date.strftime('%Y-%m-%d'),
-            },
-            action_url=PROJECT_MILESTONE_URL.format(project_id=project.id, milestone_id=milestone.id),
-            priority='normal',
-            icon='flag',
-            color='#2196F3',
-            send_email=should_notify_user(user, 'milestone_assigned', 'email')
-        )
+    NotificationService.create_notification(
+        recipient=user,
+        notification_type_name='milestone_assigned',
+        context_data={
+            'project_title': project.title,
+            'milestone_title': milestone.title,
+            'due_date': milestone.due_date.strftime('%Y-%m-%d'),
+        },
+        action_url=PROJECT_MILESTONE_URL.format(project_id=project.id, milestone_id=milestone.id),
+        priority='normal',
+        icon='flag',
+        color='#2196F3'
+    )
 
 def notify_milestone_unassigned(milestone, user):
     """Send notification when a user is unassigned from a milestone"""
     project = milestone.project
     
     # Notify the unassigned user
-    if should_notify_user(user, 'milestone_unassigned', 'in_app'):
-        NotificationService.create_notification(
-            recipient=user,
-            notification_type_name='milestone_unassigned',
-            context_data={
-                'project_title': project.title,
-                'milestone_title': milestone.title,
-            },
-            action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
-            priority='normal',
-            icon='flag',
-            color='#FF9800',
-            send_email=should_notify_user(user, 'milestone_unassigned', 'email')
-        )
+    NotificationService.create_notification(
+        recipient=user,
+        notification_type_name='milestone_unassigned',
+        context_data={
+            'project_title': project.title,
+            'milestone_title': milestone.title,
+        },
+        action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
+        priority='normal',
+        icon='flag',
+        color='#FF9800'
+    )
 
 def notify_milestone_status_changed(milestone, old_status, new_status, changed_by):
     """Send notification when a milestone's status changes"""
@@ -410,24 +337,21 @@ def notify_milestone_status_changed(milestone, old_status, new_status, changed_b
     }
     color = color_map.get(new_status, '#2196F3')
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'project_title': project.title,
-                    'milestone_title': milestone.title,
-                    'old_status': dict(milestone.STATUS_CHOICES).get(old_status, old_status),
-                    'new_status': dict(milestone.STATUS_CHOICES).get(new_status, new_status),
-                    'changed_by': changed_by.get_full_name or changed_by.username,
-                },
-                action_url=PROJECT_MILESTONE_URL.format(project_id=project.id, milestone_id=milestone.id),
-                priority=priority,
-                icon=icon,
-                color=color,
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'project_title': project.title,
+            'milestone_title': milestone.title,
+            'old_status': dict(milestone.STATUS_CHOICES).get(old_status, old_status),
+            'new_status': dict(milestone.STATUS_CHOICES).get(new_status, new_status),
+            'changed_by': changed_by.get_full_name or changed_by.username,
+        },
+        action_url=PROJECT_MILESTONE_URL.format(project_id=project.id, milestone_id=milestone.id),
+        priority=priority,
+        icon=icon,
+        color=color
+    )
 
 def notify_milestone_completed(milestone, completed_by):
     """Send notification when a milestone is completed"""
@@ -441,29 +365,26 @@ def notify_milestone_completed(milestone, completed_by):
         recipients.add(project.manager)
     
     # Notify team members
-    for team_member in project.team_members.all():
+    for team_member in project.team_members.select_related('user'):
         recipients.add(team_member.user)
     
     # Send notifications
     notification_type = 'milestone_completed'
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'project_title': project.title,
-                    'milestone_title': milestone.title,
-                    'completed_by': completed_by.get_full_name or completed_by.username,
-                    'completion_date': milestone.completion_date.strftime('%Y-%m-%d') if milestone.completion_date else timezone.now().date().strftime('%Y-%m-%d'),
-                },
-                action_url=PROJECT_MILESTONE_URL.format(project_id=project.id, milestone_id=milestone.id),
-                priority='normal',
-                icon='check-square',
-                color='#4CAF50',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'project_title': project.title,
+            'milestone_title': milestone.title,
+            'completed_by': completed_by.get_full_name or completed_by.username,
+            'completion_date': milestone.completion_date.strftime('%Y-%m-%d') if milestone.completion_date else timezone.now().date().strftime('%Y-%m-%d'),
+        },
+        action_url=PROJECT_MILESTONE_URL.format(project_id=project.id, milestone_id=milestone.id),
+        priority='normal',
+        icon='check-square',
+        color='#4CAF50'
+    )
 
 def notify_milestone_approaching(milestone, days_remaining):
     """Send notification when a milestone due date is approaching"""
@@ -490,23 +411,22 @@ def notify_milestone_approaching(milestone, days_remaining):
     elif days_remaining <= 3:
         priority = 'normal'
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'project_title': project.title,
-                    'milestone_title': milestone.title,
-                    'due_date': milestone.due_date.strftime('%Y-%m-%d'),
-                    'days_remaining': days_remaining,
-                },
-                action_url=PROJECT_MILESTONE_URL.format(project_id=project.id, milestone_id=milestone.id),
-                priority=priority,
-                icon='clock',
-                color='#FF9800',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'project_title': project.title,
+            'milestone_title': milestone.title,
+            'due_date': milestone.due_date.strftime('%Y-%m-%d'),
+            'days_remaining': days_remaining,
+        },
+        action_url=PROJECT_MILESTONE_URL.format(project_id=project.id, milestone_id=milestone.id),
+        priority=priority,
+        icon='clock',
+        color='#FF9800',
+        related_object=milestone,
+        coalesce=True
+    )
 
 def notify_milestone_overdue(milestone):
     """Send notification when a milestone is overdue"""
@@ -526,23 +446,22 @@ def notify_milestone_overdue(milestone):
     # Send notifications
     notification_type = 'milestone_overdue'
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'project_title': project.title,
-                    'milestone_title': milestone.title,
-                    'due_date': milestone.due_date.strftime('%Y-%m-%d'),
-                    'days_overdue': (timezone.now().date() - milestone.due_date).days,
-                },
-                action_url=PROJECT_MILESTONE_URL.format(project_id=project.id, milestone_id=milestone.id),
-                priority='high',
-                icon='alert-circle',
-                color='#F44336',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'project_title': project.title,
+            'milestone_title': milestone.title,
+            'due_date': milestone.due_date.strftime('%Y-%m-%d'),
+            'days_overdue': (timezone.now().date() - milestone.due_date).days,
+        },
+        action_url=PROJECT_MILESTONE_URL.format(project_id=project.id, milestone_id=milestone.id),
+        priority='high',
+        icon='alert-circle',
+        color='#F44336',
+        related_object=milestone,
+        coalesce=True
+    )
 
 def notify_expense_created(expense):
     """Send notification when a new expense is created"""
@@ -560,26 +479,23 @@ def notify_expense_created(expense):
         profile__is_DB_executive=True
     )
     
-    for user in admins_and_executives:
-        if should_notify_user(user, 'expense_created', 'in_app'):
-            NotificationService.create_notification(
-                recipient=user,
-                notification_type_name='expense_created',
-                context_data={
-                    'project_title': project.title,
-                    'expense_title': expense.title,
-                    'amount': str(expense.amount),
-                    'created_by': expense.incurred_by.get_full_name or expense.incurred_by.username,
-                },
-                action_url=PROJECT_EXPENSE_URL.format(project_id=project.id),
-                priority='normal',
-                icon='credit-card',
-                color='#2196F3',
-                send_email=should_notify_user(user, 'expense_created', 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=admins_and_executives,
+        notification_type_name='expense_created',
+        context_data={
+            'project_title': project.title,
+            'expense_title': expense.title,
+            'amount': str(expense.amount),
+            'created_by': expense.incurred_by.get_full_name or expense.incurred_by.username,
+        },
+        action_url=PROJECT_EXPENSE_URL.format(project_id=project.id),
+        priority='normal',
+        icon='credit-card',
+        color='#2196F3'
+    )
     
     # Notify the project manager
-    if project.manager and project.manager != expense.incurred_by and should_notify_user(project.manager, 'expense_created', 'in_app'):
+    if project.manager and project.manager != expense.incurred_by:
         NotificationService.create_notification(
             recipient=project.manager,
             notification_type_name='expense_created',
@@ -592,28 +508,29 @@ def notify_expense_created(expense):
             action_url=PROJECT_EXPENSE_URL.format(project_id=project.id),
             priority='normal',
             icon='credit-card',
-            color='#2196F3',
-            send_email=should_notify_user(project.manager, 'expense_created', 'email')
+            color='#2196F3'
         )
     
     # Notify team members
-    for team_member in project.team_members.all():
-        if team_member.user != expense.incurred_by and team_member.user != project.manager and should_notify_user(team_member.user, 'expense_created', 'in_app'):
-            NotificationService.create_notification(
-                recipient=team_member.user,
-                notification_type_name='expense_created',
-                context_data={
-                    'project_title': project.title,
-                    'expense_title': expense.title,
-                    'amount': str(expense.amount),
-                    'created_by': expense.incurred_by.get_full_name or expense.incurred_by.username,
-                },
-                action_url=PROJECT_EXPENSE_URL.format(project_id=project.id),
-                priority='normal',
-                icon='credit-card',
-                color='#2196F3',
-                send_email=should_notify_user(team_member.user, 'expense_created', 'email')
-            )
+    team_recipients = [
+        team_member.user
+        for team_member in project.team_members.select_related('user')
+        if team_member.user != expense.incurred_by and team_member.user != project.manager
+    ]
+    NotificationService.create_notification_for_many(
+        recipients=team_recipients,
+        notification_type_name='expense_created',
+        context_data={
+            'project_title': project.title,
+            'expense_title': expense.title,
+            'amount': str(expense.amount),
+            'created_by': expense.incurred_by.get_full_name or expense.incurred_by.username,
+        },
+        action_url=PROJECT_EXPENSE_URL.format(project_id=project.id),
+        priority='normal',
+        icon='credit-card',
+        color='#2196F3'
+    )
 
 def notify_expense_status_changed(expense, old_status, new_status, changed_by):
     """Send notification when an expense's status changes"""
@@ -675,25 +592,22 @@ def notify_expense_status_changed(expense, old_status, new_status, changed_by):
     }
     color = color_map.get(new_status, '#2196F3')
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'project_title': project.title,
-                    'expense_title': expense.title,
-                    'amount': str(expense.amount),
-                    'old_status': dict(expense.STATUS_CHOICES).get(old_status, old_status),
-                    'new_status': dict(expense.STATUS_CHOICES).get(new_status, new_status),
-                    'changed_by': changed_by.get_full_name or changed_by.username,
-                },
-                action_url=PROJECT_EXPENSE_URL.format(project_id=project.id),
-                priority=priority,
-                icon=icon,
-                color=color,
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'project_title': project.title,
+            'expense_title': expense.title,
+            'amount': str(expense.amount),
+            'old_status': dict(expense.STATUS_CHOICES).get(old_status, old_status),
+            'new_status': dict(expense.STATUS_CHOICES).get(new_status, new_status),
+            'changed_by': changed_by.get_full_name or changed_by.username,
+        },
+        action_url=PROJECT_EXPENSE_URL.format(project_id=project.id),
+        priority=priority,
+        icon=icon,
+        color=color
+    )
 
 def notify_update_created(update):
     """Send notification when a new project update is created"""
@@ -707,7 +621,7 @@ def notify_update_created(update):
         recipients.add(project.manager)
     
     # Notify team members
-    for team_member in project.team_members.all():
+    for team_member in project.team_members.select_related('user'):
         if team_member.user != update.submitted_by:
             recipients.add(team_member.user)
     
@@ -719,22 +633,19 @@ def notify_update_created(update):
     # Send notifications
     notification_type = 'update_created'
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'project_title': project.title,
-                    'update_date': update.date.strftime('%Y-%m-%d'),
-                    'submitted_by': update.submitted_by.get_full_name or update.submitted_by.username,
-                },
-                action_url=PROJECT_UPDATE_URL.format(project_id=project.id),
-                priority='normal',
-                icon='file-text',
-                color='#2196F3',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'project_title': project.title,
+            'update_date': update.date.strftime('%Y-%m-%d'),
+            'submitted_by': update.submitted_by.get_full_name or update.submitted_by.username,
+        },
+        action_url=PROJECT_UPDATE_URL.format(project_id=project.id),
+        priority='normal',
+        icon='file-text',
+        color='#2196F3'
+    )
 
 def notify_project_approaching_end(project, days_remaining):
     """Send notification when a project's end date is approaching"""
@@ -746,7 +657,7 @@ def notify_project_approaching_end(project, days_remaining):
         recipients.add(project.manager)
     
     # Notify team members
-    for team_member in project.team_members.all():
+    for team_member in project.team_members.select_related('user'):
         recipients.add(team_member.user)
     
     # Notify officials
@@ -763,22 +674,21 @@ def notify_project_approaching_end(project, days_remaining):
     elif days_remaining <= 7:
         priority = 'normal'
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'project_title': project.title,
-                    'end_date': project.target_end_date.strftime('%Y-%m-%d'),
-                    'days_remaining': days_remaining,
-                },
-                action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
-                priority=priority,
-                icon='clock',
-                color='#FF9800',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'project_title': project.title,
+            'end_date': project.target_end_date.strftime('%Y-%m-%d'),
+            'days_remaining': days_remaining,
+        },
+        action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
+        priority=priority,
+        icon='clock',
+        color='#FF9800',
+        related_object=project,
+        coalesce=True
+    )
 
 def notify_project_overbudget(project, current_spent, budget):
     """Send notification when a project exceeds its budget"""
@@ -794,26 +704,25 @@ def notify_project_overbudget(project, current_spent, budget):
         profile__is_DB_executive=True
     )
     
-    for user in admins_and_executives:
-        if should_notify_user(user, 'project_overbudget', 'in_app'):
-            NotificationService.create_notification(
-                recipient=user,
-                notification_type_name='project_overbudget',
-                context_data={
-                    'project_title': project.title,
-                    'budget': str(budget),
-                    'current_spent': str(current_spent),
-                    'overage': str(current_spent - budget),
-                },
-                action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
-                priority='high',
-                icon='alert-triangle',
-                color='#F44336',
-                send_email=should_notify_user(user, 'project_overbudget', 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=admins_and_executives,
+        notification_type_name='project_overbudget',
+        context_data={
+            'project_title': project.title,
+            'budget': str(budget),
+            'current_spent': str(current_spent),
+            'overage': str(current_spent - budget),
+        },
+        action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
+        priority='high',
+        icon='alert-triangle',
+        color='#F44336',
+        related_object=project,
+        coalesce=True
+    )
     
     # Notify the project manager
-    if project.manager and should_notify_user(project.manager, 'project_overbudget', 'in_app'):
+    if project.manager:
         NotificationService.create_notification(
             recipient=project.manager,
             notification_type_name='project_overbudget',
@@ -827,7 +736,8 @@ def notify_project_overbudget(project, current_spent, budget):
             priority='high',
             icon='alert-triangle',
             color='#F44336',
-            send_email=should_notify_user(project.manager, 'project_overbudget', 'email')
+            related_object=project,
+            coalesce=True
         )
 
 def notify_project_budget_updated(project, old_budget, new_budget, updated_by):
@@ -857,23 +767,20 @@ def notify_project_budget_updated(project, old_budget, new_budget, updated_by):
     # Send notifications
     notification_type = 'project_budget_updated'
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'project_title': project.title,
-                    'old_budget': str(old_budget),
-                    'new_budget': str(new_budget),
-                    'updated_by': updated_by.get_full_name or updated_by.username,
-                },
-                action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
-                priority='normal',
-                icon='dollar-sign',
-                color='#2196F3',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'project_title': project.title,
+            'old_budget': str(old_budget),
+            'new_budget': str(new_budget),
+            'updated_by': updated_by.get_full_name or updated_by.username,
+        },
+        action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
+        priority='normal',
+        icon='dollar-sign',
+        color='#2196F3'
+    )
 
 def notify_project_dates_updated(project, field_changed, old_date, new_date, updated_by):
     """Send notification when a project's dates are updated"""
@@ -885,7 +792,7 @@ def notify_project_dates_updated(project, field_changed, old_date, new_date, upd
         recipients.add(project.manager)
     
     # Notify team members
-    for team_member in project.team_members.all():
+    for team_member in project.team_members.select_related('user'):
         recipients.add(team_member.user)
     
     # Notify officials
@@ -895,45 +802,42 @@ def notify_project_dates_updated(project, field_changed, old_date, new_date, upd
     # Send notifications
     notification_type = 'project_dates_updated'
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'project_title': project.title,
-                    'field_changed': field_changed,
-                    'old_date': old_date.strftime('%Y-%m-%d') if old_date else 'Not set',
-                    'new_date': new_date.strftime('%Y-%m-%d') if new_date else 'Not set',
-                    'updated_by': updated_by.get_full_name or updated_by.username,
-                },
-                action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
-                priority='normal',
-                icon='calendar',
-                color='#2196F3',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'project_title': project.title,
+            'field_changed': field_changed,
+            'old_date': old_date.strftime('%Y-%m-%d') if old_date else 'Not set',
+            'new_date': new_date.strftime('%Y-%m-%d') if new_date else 'Not set',
+            'updated_by': updated_by.get_full_name or updated_by.username,
+        },
+        action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
+        priority='normal',
+        icon='calendar',
+        color='#2196F3',
+        related_object=project,
+        coalesce=True
+    )
 
 def notify_official_added(project, user, added_by):
     """Send notification when an official is added to a project"""
     # Notify the official who was added
-    if should_notify_user(user, 'official_added', 'in_app'):
-        NotificationService.create_notification(
-            recipient=user,
-            notification_type_name='official_added',
-            context_data={
-                'project_title': project.title,
-                'added_by': added_by.get_full_name or added_by.username,
-            },
-            action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
-            priority='normal',
-            icon='user-plus',
-            color='#2196F3',
-            send_email=should_notify_user(user, 'official_added', 'email')
-        )
+    NotificationService.create_notification(
+        recipient=user,
+        notification_type_name='official_added',
+        context_data={
+            'project_title': project.title,
+            'added_by': added_by.get_full_name or added_by.username,
+        },
+        action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
+        priority='normal',
+        icon='user-plus',
+        color='#2196F3'
+    )
     
     # Notify the project manager
-    if project.manager and project.manager != added_by and project.manager != user and should_notify_user(project.manager, 'official_added', 'in_app'):
+    if project.manager and project.manager != added_by and project.manager != user:
         NotificationService.create_notification(
             recipient=project.manager,
             notification_type_name='official_added',
@@ -945,30 +849,27 @@ def notify_official_added(project, user, added_by):
             action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
             priority='normal',
             icon='user-plus',
-            color='#2196F3',
-            send_email=should_notify_user(project.manager, 'official_added', 'email')
+            color='#2196F3'
         )
 
 def notify_official_removed(project, user, removed_by):
     """Send notification when an official is removed from a project"""
     # Notify the official who was removed
-    if should_notify_user(user, 'official_removed', 'in_app'):
-        NotificationService.create_notification(
-            recipient=user,
-            notification_type_name='official_removed',
-            context_data={
-                'project_title': project.title,
-                'removed_by': removed_by.get_full_name or removed_by.username,
-            },
-            action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
-            priority='normal',
-            icon='user-minus',
-            color='#FF9800',
-            send_email=should_notify_user(user, 'official_removed', 'email')
-        )
+    NotificationService.create_notification(
+        recipient=user,
+        notification_type_name='official_removed',
+        context_data={
+            'project_title': project.title,
+            'removed_by': removed_by.get_full_name or removed_by.username,
+        },
+        action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
+        priority='normal',
+        icon='user-minus',
+        color='#FF9800'
+    )
     
     # Notify the project manager
-    if project.manager and project.manager != removed_by and project.manager != user and should_notify_user(project.manager, 'official_removed', 'in_app'):
+    if project.manager and project.manager != removed_by and project.manager != user:
         NotificationService.create_notification(
             recipient=project.manager,
             notification_type_name='official_removed',
@@ -980,8 +881,7 @@ def notify_official_removed(project, user, removed_by):
             action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
             priority='normal',
             icon='user-minus',
-            color='#FF9800',
-            send_email=should_notify_user(project.manager, 'official_removed', 'email')
+            color='#FF9800'
         )
 
 def notify_media_uploaded(media_obj, media_type, related_obj_type, related_obj):
@@ -1031,24 +931,21 @@ def notify_media_uploaded(media_obj, media_type, related_obj_type, related_obj):
     }
     icon = icon_map.get(media_obj.media_type, 'file')
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'project_title': project.title,
-                    'media_type': dict(media_obj.MEDIA_TYPE_CHOICES).get(media_obj.media_type, media_obj.media_type),
-                    'media_title': media_obj.title or 'Untitled',
-                    'related_to': f"{related_obj_type.capitalize()}: {related_obj.title}",
-                    'uploaded_by': media_obj.uploaded_by.get_full_name or media_obj.uploaded_by.username,
-                },
-                action_url=action_url,
-                priority='normal',
-                icon=icon,
-                color='#2196F3',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'project_title': project.title,
+            'media_type': dict(media_obj.MEDIA_TYPE_CHOICES).get(media_obj.media_type, media_obj.media_type),
+            'media_title': media_obj.title or 'Untitled',
+            'related_to': f"{related_obj_type.capitalize()}: {related_obj.title}",
+            'uploaded_by': media_obj.uploaded_by.get_full_name or media_obj.uploaded_by.username,
+        },
+        action_url=action_url,
+        priority='normal',
+        icon=icon,
+        color='#2196F3'
+    )
 
 def notify_comment_added(comment):
     """Send notification when a comment is added to a project or update"""
@@ -1077,23 +974,20 @@ def notify_comment_added(comment):
     if update:
         action_url = PROJECT_UPDATE_URL.format(project_id=project.id)
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'project_title': project.title,
-                    'comment_by': comment.user.get_full_name or comment.user.username,
-                    'comment_on': 'update' if update else 'project',
-                    'is_reply': comment.parent is not None,
-                },
-                action_url=action_url,
-                priority='normal',
-                icon='message-square',
-                color='#2196F3',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'project_title': project.title,
+            'comment_by': comment.user.get_full_name or comment.user.username,
+            'comment_on': 'update' if update else 'project',
+            'is_reply': comment.parent is not None,
+        },
+        action_url=action_url,
+        priority='normal',
+        icon='message-square',
+        color='#2196F3'
+    )
 
 def notify_team_member_role_changed(team_member, old_role, new_role, changed_by):
     """Send notification when a team member's role is changed"""
@@ -1101,25 +995,23 @@ def notify_team_member_role_changed(team_member, old_role, new_role, changed_by)
     user = team_member.user
     
     # Notify the user whose role was changed
-    if should_notify_user(user, 'team_member_role_changed', 'in_app'):
-        NotificationService.create_notification(
-            recipient=user,
-            notification_type_name='team_member_role_changed',
-            context_data={
-                'project_title': project.title,
-                'old_role': dict(team_member.ROLE_CHOICES).get(old_role, old_role),
-                'new_role': dict(team_member.ROLE_CHOICES).get(new_role, new_role),
-                'changed_by': changed_by.get_full_name or changed_by.username,
-            },
-            action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
-            priority='normal',
-            icon='users',
-            color='#2196F3',
-            send_email=should_notify_user(user, 'team_member_role_changed', 'email')
-        )
+    NotificationService.create_notification(
+        recipient=user,
+        notification_type_name='team_member_role_changed',
+        context_data={
+            'project_title': project.title,
+            'old_role': dict(team_member.ROLE_CHOICES).get(old_role, old_role),
+            'new_role': dict(team_member.ROLE_CHOICES).get(new_role, new_role),
+            'changed_by': changed_by.get_full_name or changed_by.username,
+        },
+        action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
+        priority='normal',
+        icon='users',
+        color='#2196F3'
+    )
     
     # Notify the project manager
-    if project.manager and project.manager != user and project.manager != changed_by and should_notify_user(project.manager, 'team_member_role_changed', 'in_app'):
+    if project.manager and project.manager != user and project.manager != changed_by:
         NotificationService.create_notification(
             recipient=project.manager,
             notification_type_name='team_member_role_changed',
@@ -1133,6 +1025,5 @@ def notify_team_member_role_changed(team_member, old_role, new_role, changed_by)
             action_url=PROJECT_DETAIL_URL.format(project_id=project.id),
             priority='normal',
             icon='users',
-            color='#2196F3',
-            send_email=should_notify_user(project.manager, 'team_member_role_changed', 'email')
+            color='#2196F3'
         )
@@ -2,8 +2,16 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 
 from mainapps.inventory.models import Asset
-from ..models import DailyProjectUpdate, MilestoneMedia, Project, ProjectAsset, ProjectCategory, ProjectExpense, ProjectMedia, ProjectMilestone, ProjectTeamMember, ProjectUpdateMedia
+from mainapps.project_task.models import Task, TaskStatus
+from ..models import DailyProjectUpdate, MilestoneMedia, Project, ProjectAsset, ProjectCategory, ProjectExpense, ProjectMedia, ProjectMilestone, ProjectTeamMember, ProjectUpdateMedia, ProjectUserRole
+from django.db import models
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+
+from ..milestone_graph import MilestoneGraph
+from ..roles import ROLE_PRIORITY
+from ..stats import ProjectStatsService
 User = get_user_model()
 
 
@@ -39,14 +47,14 @@ class ProjectSerializer(serializers.ModelSerializer):
     manager = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
     officials = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), many=True, required=False)
     category = serializers.PrimaryKeyRelatedField(queryset=ProjectCategory.objects.all(), allow_null=True)
-    funds_allocated = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
-    funds_spent = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    funds_allocated = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True, source='current_stats.funds_allocated')
+    funds_spent = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True, source='current_stats.funds_spent')
     budget_utilization = serializers.SerializerMethodField()
     days_remaining = serializers.SerializerMethodField()
     is_overbudget = serializers.SerializerMethodField()
-    milestones_count = serializers.SerializerMethodField()
-    milestones_completed_count = serializers.SerializerMethodField()
-    featured_image=serializers.SerializerMethodField()
+    milestones_count = serializers.IntegerField(read_only=True, source='current_stats.milestones_count')
+    milestones_completed_count = serializers.IntegerField(read_only=True, source='current_stats.milestones_completed_count')
+    featured_image = serializers.CharField(read_only=True, source='current_stats.featured_image_url')
     
     class Meta:
         model = Project
@@ -61,33 +69,17 @@ class ProjectSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at']
     
-    def get_featured_image(self, obj):
-        media =ProjectMedia.objects.filter(project=obj,is_featured=True, media_type='image').first()
-        if media:
-            return media.file.url
-        media =ProjectMedia.objects.filter(project=obj, media_type='image').first()
-        if media:
-            return media.file.url
-        
-        return None
-
     def get_team_members(self, obj):
         """Get team members for the project"""
         team_members = ProjectTeamMember.objects.filter(project=obj)
         users= User.objects.filter(id__in=[member.user.id for member in team_members])
         # Serialize the user details
         return ProjectUserSerializer(users, many=True).data
-    def get_milestones_completed_count(self, obj):
-        """Get the count of completed milestones for the project"""
-        return ProjectMilestone.objects.filter(project=obj, status='completed').count()
-    def get_milestones_count(self, obj):
-        """Get the count of milestones for the project"""
-        return ProjectMilestone.objects.filter(project=obj).count()
     def get_budget_utilization(self, obj):
         """Calculate percentage of budget spent"""
         if obj.budget == 0:
             return 0
-        return round((obj.funds_spent / obj.budget) * 100, 2)
+        return round((obj.current_stats.funds_spent / obj.budget) * 100, 2)
     
     def get_days_remaining(self, obj):
         """Calculate days remaining until target end date"""
@@ -104,16 +96,29 @@ class ProjectSerializer(serializers.ModelSerializer):
     
     def get_is_overbudget(self, obj):
         """Check if project is over budget"""
-        return obj.funds_spent > obj.budget
+        return obj.current_stats.funds_spent > obj.budget
+
+class ProjectStatsListSerializer(serializers.ListSerializer):
+    """Builds the missing stats rows of a page in one batch before serializing it"""
+    def to_representation(self, data):
+        projects = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        ProjectStatsService.ensure(projects)
+        return super().to_representation(projects)
+
 
 class ProjectListSerializer(serializers.ModelSerializer):
-    """Simplified serializer for list views"""
+    """
+    Simplified serializer for list views
+
+    Serves a page in a constant number of queries when the queryset
+    select_related()s 'stats', 'manager' and 'category'.
+    """
     manager_name = serializers.SerializerMethodField()
     category_name = serializers.SerializerMethodField()
-    milestones_count = serializers.SerializerMethodField()
-    milestones_completed_count = serializers.SerializerMethodField()
-    featured_image=serializers.SerializerMethodField()
-    team_member_count = serializers.SerializerMethodField()
+    milestones_count = serializers.IntegerField(read_only=True, source='current_stats.milestones_count')
+    milestones_completed_count = serializers.IntegerField(read_only=True, source='current_stats.milestones_completed_count')
+    featured_image = serializers.CharField(read_only=True, source='current_stats.featured_image_url')
+    team_member_count = serializers.IntegerField(read_only=True, source='current_stats.team_member_count')
     
     class Meta:
         model = Project
@@ -125,26 +130,10 @@ class ProjectListSerializer(serializers.ModelSerializer):
             ,'featured_image','team_member_count'
 
         ]
-    def get_team_member_count(self, obj):
-        """Get the count of team members for the project"""
-        return ProjectTeamMember.objects.filter(project=obj).count()
-    def get_featured_image(self, obj):
-        media =ProjectMedia.objects.filter(project=obj,is_featured=True, media_type='image').first()
-        if media:
-            return media.file.url
-        media =ProjectMedia.objects.filter(project=obj, media_type='image').first()
-        if media:
-            return media.file.url
-        
-        return None
-
-    def get_milestones_completed_count(self, obj):
-        """Get the count of completed milestones for the project"""
-        return ProjectMilestone.objects.filter(project=obj, status='completed').count()
-    def get_milestones_count(self, obj):
-        """Get the count of milestones for the project"""
-        return ProjectMilestone.objects.filter(project=obj).count()
+        list_serializer_class = ProjectStatsListSerializer
     def get_manager_name(self, obj):
+        if not obj.manager:
+            return None
         if obj.manager.first_name and obj.manager.last_name:
             return f"{obj.manager.first_name} {obj.manager.last_name}"
         return obj.manager.username
@@ -153,8 +142,13 @@ class ProjectListSerializer(serializers.ModelSerializer):
         return obj.category.name if obj.category else None
 
 
+class ProjectStatusUpdateSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Project.STATUS_CHOICES)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
 class ProjectBudgetUpdateSerializer(serializers.Serializer):
     budget = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    full_budget_disbursed = serializers.BooleanField(required=False)
     funds_allocated = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
     funds_spent = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
     notes = serializers.CharField(required=False, allow_blank=True)
@@ -249,26 +243,53 @@ class ProjectMilestoneSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at', 'created_by']
     
+    @classmethod
+    def prepare_queryset(cls, queryset):
+        """
+        Annotate task progress and load the related rows this serializer
+        reads, so a page of milestones costs a fixed number of queries
+        """
+        tasks = Task.objects.filter(milestone=OuterRef('pk')).order_by().values('milestone')
+        return queryset.select_related(
+            'project', 'created_by__profile'
+        ).prefetch_related(
+            Prefetch('assigned_to', queryset=User.objects.select_related('profile')),
+            'dependencies'
+        ).annotate(
+            tasks_total=Coalesce(Subquery(tasks.annotate(count=Count('id')).values('count')), 0),
+            tasks_completed=Coalesce(
+                Subquery(tasks.filter(status=TaskStatus.COMPLETED).annotate(count=Count('id')).values('count')), 0
+            )
+        )
+    
     def get_days_remaining(self, obj):
         return obj.days_remaining()
     
+    def _task_counts(self, obj):
+        """Total and completed task counts, from the prepare_queryset() annotations when present"""
+        if not hasattr(obj, 'tasks_total'):
+            counts = obj.tasks.aggregate(
+                total=Count('id'),
+                completed=Count('id', filter=Q(status=TaskStatus.COMPLETED))
+            )
+            obj.tasks_total, obj.tasks_completed = counts['total'], counts['completed']
+        return obj.tasks_total, obj.tasks_completed
+    
     def get_completion_percentage(self, obj):
         """Calculate the completion percentage of the project"""
         if obj.status == 'completed':
             return 100
         else:
-            completed_tasks=obj.tasks.filter(status='completed').count()
-            total_tasks=obj.tasks.count()
-            print(completed_tasks, total_tasks)
+            total_tasks, completed_tasks = self._task_counts(obj)
             if total_tasks == 0:
                 return 0
             return round((completed_tasks / total_tasks) * 100, 2)
     def get_tasks_count(self, obj):
         """Get the count of tasks for the project"""
-        return obj.tasks.count()
+        return self._task_counts(obj)[0]
     def get_completed_tasks_count(self, obj):
         """Get the count of completed tasks for the project"""
-        return obj.tasks.filter(status='completed').count()
+        return self._task_counts(obj)[1]
     
     def get_is_overdue(self, obj):
         return obj.is_overdue()
@@ -359,12 +380,25 @@ class ProjectMilestoneCreateUpdateSerializer(serializers.ModelSerializer):
         if data.get('status') == 'completed':
             data['completion_percentage'] = 100
         
-        # Check for circular dependencies
-        if self.instance and 'dependency_ids' in data:
-            if self.instance.id in data['dependency_ids']:
+        # Dependencies must stay within the project and must not form a cycle
+        if data.get('dependency_ids'):
+            project = data.get('project') or (self.instance.project if self.instance else None)
+            dependency_ids = set(data['dependency_ids'])
+            if project and ProjectMilestone.objects.filter(id__in=dependency_ids).exclude(project=project).exists():
                 raise serializers.ValidationError(
-                    {"dependency_ids": "A milestone cannot depend on itself."}
+                    {"dependency_ids": "Dependencies must be milestones of the same project."}
                 )
+            if self.instance:
+                graph = MilestoneGraph.load(project)
+                cycle = graph.find_cycle({self.instance.id: dependency_ids})
+                if cycle:
+                    titles = [
+                        graph.milestones[milestone_id]['title'] if milestone_id in graph.milestones else str(milestone_id)
+                        for milestone_id in cycle
+                    ]
+                    raise serializers.ValidationError(
+                        {"dependency_ids": f"Circular dependency: {' -> '.join(titles)}."}
+                    )
         
         return data
 
@@ -734,6 +768,7 @@ class DailyProjectUpdateCreateUpdateSerializer(serializers.ModelSerializer):
 
 class UserProjectRoleSerializer(serializers.ModelSerializer):
     user_role = serializers.SerializerMethodField()
+    funds_spent = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True, source='current_stats.funds_spent')
     is_overbudget = serializers.SerializerMethodField()
     days_remaining = serializers.SerializerMethodField()
     completion_percentage = serializers.SerializerMethodField()
@@ -745,6 +780,7 @@ class UserProjectRoleSerializer(serializers.ModelSerializer):
             'actual_end_date', 'created_at', 'updated_at', 'is_overbudget',
             'days_remaining', 'completion_percentage', 'user_role'
         ]
+        list_serializer_class = ProjectStatsListSerializer
     def get_days_remaining(self, obj):
         """Calculate days remaining until target end date"""
         from django.utils import timezone
@@ -760,56 +796,29 @@ class UserProjectRoleSerializer(serializers.ModelSerializer):
     
     def get_is_overbudget(self, obj):
         """Check if project is over budget"""
-        return obj.funds_spent > obj.budget
+        return obj.current_stats.funds_spent > obj.budget
 
     def get_completion_percentage(self, obj):
         """Calculate the completion percentage of the project"""
         if obj.status == 'completed':
             return 100
         else:
-            completed_tasks=obj.tasks.filter(status='completed').count()
-            total_tasks=obj.tasks.count()
-            print(completed_tasks, total_tasks)
+            completed_tasks = obj.current_stats.tasks_completed_count
+            total_tasks = obj.current_stats.tasks_count
             if total_tasks == 0:
                 return 0
             return round((completed_tasks / total_tasks) * 100, 2)
-    def get_is_overbudget(self, obj):
-        """Check if project is over budget"""
-        return obj.funds_spent > obj.budget
     def get_user_role(self, obj):
         """
         Determine the user's role in this project.
         Possible roles: 'manager', 'official', 'creator', 'team_member'
         If user has multiple roles, returns the highest privilege role.
         """
+        if hasattr(obj, 'user_role'):
+            return obj.user_role
+
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return None
-            
-        user = request.user
-        roles = []
-        
-        # Check if user is the manager
-        if obj.manager == user:
-            roles.append('manager')
-            
-        # Check if user is an official
-        if obj.officials.filter(id=user.id).exists():
-            roles.append('official')
-            
-        # Check if user is the creator
-        if obj.created_by == user:
-            roles.append('creator')
-            
-        # Check if user is a team member - FIXED
-        team_member = obj.team_members.filter(user=user).first()
-        if team_member:
-            roles.append('team_member')
-            # We could also return their specific role from ProjectTeamMember if needed
-            # roles.append(f'team_member_{team_member.role}')
-        
-        # Return the highest privilege role (manager > official > creator > team_member)
-        role_priority = {'manager': 0, 'official': 1, 'creator': 2, 'team_member': 3}
-        roles.sort(key=lambda x: role_priority.get(x, 999))
-        
-        return roles[0] if roles else None
+        roles = ProjectUserRole.objects.filter(project=obj, user=request.user).values_list('role', flat=True)
+        return min(roles, key=ROLE_PRIORITY.get, default=None)
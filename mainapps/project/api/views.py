@@ -23,13 +23,13 @@ from .notification_utils import (
     notify_milestone_overdue, notify_comment_added
 )
 from ..models import Project, ProjectCategory, DailyProjectUpdate, ProjectUpdateMedia
+from ..downloads import MediaDownloads
+from ..milestone_graph import MilestoneGraph
+from ..roles import ROLE_PRIORITY, ProjectRoleIndex
+from ..stats import ProjectStatistics, ProjectStatsService
 from .serializers import *
-from django.db.models import F, Sum, Count, Avg, Case, When, DecimalField, Value, Q
-from decimal import Decimal
-from django.http import HttpResponse, FileResponse
-import boto3
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError
-from django.conf import settings
+from django.db.models import F, Sum, Count, Avg, Q
+from django.http import FileResponse
 
 
 User = get_user_model()
@@ -111,26 +111,10 @@ class ProjectViewSet(viewsets.ModelViewSet):
         """
         Customize queryset based on query parameters and annotate with calculated fields
         """
-        # Annotate queryset with calculated fields
-        queryset = Project.objects.annotate(
-            calculated_funds_spent=Sum(
-                Case(
-                    When(expenses__status='reimbursed', then='expenses__amount'),
-                    default=Value(Decimal('0.00')),
-                    output_field=DecimalField()
-                )
-            ),
-            calculated_funds_allocated=Case(
-                When(full_budget_disbursed=True, then=F('budget')),
-                default=Sum(
-                    Case(
-                        When(expenses__status='reimbursed', then='expenses__amount'),
-                        default=Value(Decimal('0.00')),
-                        output_field=DecimalField()
-                    )
-                ),
-                output_field=DecimalField()
-            )
+        # Annotate queryset with live funds for filtering and statistics, the
+        # serializers read the derived numbers from the joined stats row
+        queryset = Project.objects.select_related('stats', 'manager', 'category').annotate(
+            **ProjectStatsService.funds_annotations()
         )
         
         # Filter by manager
@@ -221,6 +205,15 @@ class ProjectViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(projects, many=True)
         return Response(serializer.data)
     
+    def _refresh_stats(self, project):
+        """
+        Rebuild a just-saved project's stats so the response reflects the write
+
+        The project was loaded with select_related('stats'), and the
+        signal-driven refresh only runs after the transaction commits.
+        """
+        project.stats = ProjectStatsService.refresh([project.id])[project.id]
+    
     @action(detail=True, methods=['patch'])
     def update_status(self, request, pk=None):
         """Update project status"""
@@ -242,6 +235,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 project.notes = (project.notes or '') + f"\n\nStatus changed to {new_status} on {timezone.now().date()}: {notes}"
             
             project.save()
+            self._refresh_stats(project)
             
             # Send notification for status change
             notify_project_status_changed(project, old_status, new_status, request.user)
@@ -274,13 +268,14 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 project.notes = (project.notes or '') + f"\n\nBudget updated on {timezone.now().date()}: {notes}"
             
             project.save()
+            self._refresh_stats(project)
             
             # Send notification for budget update
             if 'budget' in data and old_budget != project.budget:
                 notify_project_budget_updated(project, old_budget, project.budget, request.user)
             
             # Check if project is over budget
-            funds_spent = project.funds_spent
+            funds_spent = project.stats.funds_spent
             if funds_spent > project.budget:
                 notify_project_overbudget(project, funds_spent, project.budget)
             
@@ -327,6 +322,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 project.notes = (project.notes or '') + f"\n\nDates updated on {timezone.now().date()}: {notes}"
             
             project.save()
+            self._refresh_stats(project)
             
             # Send notifications for date changes
             for field, old_date, new_date in date_changes:
@@ -395,72 +391,16 @@ class ProjectViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=True, methods=['get'])
+    def milestone_schedule(self, request, pk=None):
+        """Get the milestone dependency order, critical path and earliest and latest dates"""
+        project = self.get_object()
+        return Response(MilestoneGraph.cached_schedule(project))
+    
     @action(detail=False)
     def statistics(self, request):
-        """Get project statistics"""
-        base_queryset = self.get_queryset()
-        
-        # Get full status counts (including all statuses)
-        status_counts = dict(
-            base_queryset.values('status')
-            .annotate(count=Count('id'))
-            .values_list('status', 'count')
-        )
-        
-        # Create filtered queryset excluding submitted/cancelled projects
-        filtered_queryset = base_queryset.exclude(
-            status__in=['submitted', 'cancelled','rejected']
-        )
-        
-        # Financial calculations using filtered queryset
-        budget_stats = filtered_queryset.aggregate(
-            total_budget=Sum('budget'),
-            total_allocated=Sum('calculated_funds_allocated'),
-            total_spent=Sum('calculated_funds_spent'),
-            avg_budget=Avg('budget')
-        )
-        
-        # Timeline statistics using filtered queryset
-        today = timezone.now().date()
-        active_projects = filtered_queryset.filter(status='active').count()
-        delayed_projects = filtered_queryset.filter(
-            target_end_date__lt=today,
-            status__in=['planning', 'active', 'on_hold']
-        ).count()
-        completed_on_time = filtered_queryset.filter(
-            status='completed',
-            actual_end_date__lte=F('target_end_date')
-        ).count()
-        completed_late = filtered_queryset.filter(
-            status='completed',
-            actual_end_date__gt=F('target_end_date')
-        ).count()
-        
-        # Type and category counts using filtered queryset
-        type_counts = dict(
-            filtered_queryset.values('project_type')
-            .annotate(count=Count('id'))
-            .values_list('project_type', 'count')
-        )
-        
-        category_counts = dict(
-            filtered_queryset.values('category__name')
-            .annotate(count=Count('id'))
-            .values_list('category__name', 'count')
-        )
-        
-        return Response({
-            'status_counts': status_counts,
-            'type_counts': type_counts,
-            'budget_stats': budget_stats,
-            'timeline_stats': {
-                'active_projects': active_projects,
-                'delayed_projects': delayed_projects,
-                'completed_on_time': completed_on_time,
-                'completed_late': completed_late,
-            },
-            'category_counts': category_counts
-        })
+        """Get project statistics, cached per filter combination"""
+        return Response(ProjectStatistics.get(self.get_queryset(), request.query_params.lists()))
 
 
 class ProjectTeamMemberViewSet(viewsets.ModelViewSet):
@@ -703,7 +643,7 @@ class ProjectMilestoneViewSet(viewsets.ModelViewSet):
                 ~Q(status='completed')
             )
             
-        return queryset
+        return ProjectMilestoneSerializer.prepare_queryset(queryset)
     
     def get_serializer_class(self):
         """
@@ -929,7 +869,7 @@ class ProjectMilestoneViewSet(viewsets.ModelViewSet):
             )
             
         project = get_object_or_404(Project, id=project_id)
-        milestones = ProjectMilestone.objects.filter(project=project)
+        milestones = ProjectMilestoneSerializer.prepare_queryset(ProjectMilestone.objects.filter(project=project))
         serializer = self.get_serializer(milestones, many=True)
         return Response(serializer.data)
     
@@ -945,7 +885,7 @@ class ProjectMilestoneViewSet(viewsets.ModelViewSet):
         else:
             user = get_object_or_404(User, id=user_id)
             
-        milestones = ProjectMilestone.objects.filter(assigned_to=user)
+        milestones = ProjectMilestoneSerializer.prepare_queryset(ProjectMilestone.objects.filter(assigned_to=user))
         serializer = self.get_serializer(milestones, many=True)
         return Response(serializer.data)
     
@@ -973,6 +913,7 @@ class ProjectMilestoneViewSet(viewsets.ModelViewSet):
         if user_id:
             milestones = milestones.filter(assigned_to__id=user_id)
             
+        milestones = ProjectMilestoneSerializer.prepare_queryset(milestones)
         serializer = self.get_serializer(milestones, many=True)
         return Response(serializer.data)
     
@@ -998,6 +939,7 @@ class ProjectMilestoneViewSet(viewsets.ModelViewSet):
         if user_id:
             milestones = milestones.filter(assigned_to__id=user_id)
             
+        milestones = ProjectMilestoneSerializer.prepare_queryset(milestones)
         serializer = self.get_serializer(milestones, many=True)
         return Response(serializer.data)
     
@@ -1062,21 +1004,9 @@ class ProjectMilestoneViewSet(viewsets.ModelViewSet):
         """
         user = request.user
         
-        # Get all projects where the user has any relationship
-        user_projects = Project.objects.filter(
-            Q(manager=user) |  # User is manager
-            Q(officials=user) |  # User is an official
-            Q(created_by=user) |  # User created the project
-            Q(team_members__user=user)  # User is a team member
-        ).distinct()
-        
-        # Get all milestones for these projects
-        milestones = ProjectMilestone.objects.filter(
-            project__in=user_projects
-        ).select_related(
-            'project', 'created_by'
-        ).prefetch_related(
-            'assigned_to', 'dependencies'
+        # Get all milestones of the projects the user has any relationship with
+        milestones = ProjectMilestoneSerializer.prepare_queryset(
+            ProjectMilestone.objects.filter(project__in=ProjectRoleIndex.projects_for(user))
         )
         
         # Apply additional filters if provided
@@ -1857,67 +1787,11 @@ class ProjectUpdateMediaViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
-        """Securely download a file from S3"""
-        media_object = self.get_object()
-        
-        if not media_object.file:
-            return Response(
-                {"detail": "No file associated with this media"},
-                status=status.HTTP_404_NOT_FOUND
-            )
-            
-        # Get the file key from the file field
-        file_key = str(media_object.file)
-        
-        # Initialize S3 client
-        s3 = boto3.client(
-            "s3",
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        )
-        
-        try:
-            # Get the file from S3
-            s3_response = s3.get_object(
-                Bucket=settings.AWS_STORAGE_BUCKET_NAME, 
-                Key=file_key
-            )
-            
-            # Set the appropriate headers for file download
-            response = HttpResponse(
-                s3_response["Body"].read(), 
-                content_type=s3_response["ContentType"]
-            )
-            
-            # Use the original filename if available, otherwise extract from the key
-            filename = media_object.title or file_key.split("/")[-1]
-            
-            # Ensure filename has the correct extension
-            if "." not in filename:
-                extension = file_key.split(".")[-1] if "." in file_key else ""
-                if extension:
-                    filename = f"{filename}.{extension}"
-            
-            response["Content-Disposition"] = f'attachment; filename="{filename}"'
-            response["Content-Length"] = s3_response["ContentLength"]
-            
-            return response
-            
-        except s3.exceptions.NoSuchKey:
-            return Response(
-                {"detail": "File not found on storage server"},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        except (NoCredentialsError, PartialCredentialsError):
-            return Response(
-                {"detail": "Server configuration error. Please contact support."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        except Exception as e:
-            return Response(
-                {"detail": f"Error downloading file: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        """
+        Download a file from S3, streamed in chunks with Range support, or
+        as a short-lived presigned URL with ?mode=url
+        """
+        return MediaDownloads.respond(request, self.get_object())
     
 @api_view(['GET'])
 def project_model_info(request):
@@ -1967,27 +1841,15 @@ class UserRelatedProjectsViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         user = self.request.user
         
-        # Get all projects where the user has any relationship
-        queryset = Project.objects.filter(
-            Q(manager=user) |  # User is manager
-            Q(officials=user) |  # User is an official
-            Q(created_by=user) |  # User created the project
-            Q(team_members__user=user)  # User is a team member
-        ).distinct()
-        
-        # Additional custom filtering
+        # Projects where the user has any relationship, or only the one
+        # requested, from the role index with the user's highest role
         role_filter = self.request.query_params.get('role')
-        if role_filter:
-            if role_filter == 'manager':
-                queryset = queryset.filter(manager=user)
-            elif role_filter == 'official':
-                queryset = queryset.filter(officials=user)
-            elif role_filter == 'creator':
-                queryset = queryset.filter(created_by=user)
-            elif role_filter == 'team_member':
-                queryset = queryset.filter(team_members__user=user)
+        if role_filter not in ROLE_PRIORITY:
+            role_filter = None
         
-        return queryset
+        return ProjectRoleIndex.projects_for(user, role_filter).select_related('stats').annotate(
+            user_role=ProjectRoleIndex.role_annotation(user)
+        )
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -2054,67 +1916,11 @@ class BaseMediaViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
-        """Securely download a file from S3"""
-        media_object = self.get_object()
-        
-        if not media_object.file:
-            return Response(
-                {"detail": "No file associated with this media"},
-                status=status.HTTP_404_NOT_FOUND
-            )
-            
-        # Get the file key from the file field
-        file_key = str(media_object.file)
-        
-        # Initialize S3 client
-        s3 = boto3.client(
-            "s3",
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        )
-        
-        try:
-            # Get the file from S3
-            s3_response = s3.get_object(
-                Bucket=settings.AWS_STORAGE_BUCKET_NAME, 
-                Key=file_key
-            )
-            
-            # Set the appropriate headers for file download
-            response = HttpResponse(
-                s3_response["Body"].read(), 
-                content_type=s3_response["ContentType"]
-            )
-            
-            # Use the original filename if available, otherwise extract from the key
-            filename = media_object.title or file_key.split("/")[-1]
-            
-            # Ensure filename has the correct extension
-            if "." not in filename:
-                extension = file_key.split(".")[-1] if "." in file_key else ""
-                if extension:
-                    filename = f"{filename}.{extension}"
-            
-            response["Content-Disposition"] = f'attachment; filename="{filename}"'
-            response["Content-Length"] = s3_response["ContentLength"]
-            
-            return response
-            
-        except s3.exceptions.NoSuchKey:
-            return Response(
-                {"detail": "File not found on storage server"},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        except (NoCredentialsError, PartialCredentialsError):
-            return Response(
-                {"detail": "Server configuration error. Please contact support."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        except Exception as e:
-            return Response(
-                {"detail": f"Error downloading file: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        """
+        Download a file from S3, streamed in chunks with Range support, or
+        as a short-lived presigned URL with ?mode=url
+        """
+        return MediaDownloads.respond(request, self.get_object())
     
 
 class ProjectMediaViewSet(BaseMediaViewSet):
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from ...roles import ProjectRoleIndex, REBUILD_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Resync the user-to-project role index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=REBUILD_BATCH_SIZE,
+            help='Projects synced per batch'
+        )
+
+    def handle(self, *args, **options):
+        changed = ProjectRoleIndex.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Corrected {changed} project role rows."))
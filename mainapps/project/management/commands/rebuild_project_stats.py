@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from ...stats import ProjectStatsService, REBUILD_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized stats of every project'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=REBUILD_BATCH_SIZE,
+            help='Projects recomputed per batch'
+        )
+
+    def handle(self, *args, **options):
+        count = ProjectStatsService.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {count} projects."))
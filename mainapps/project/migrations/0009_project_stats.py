@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:50
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0008_alter_projectupdatemedia_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectStats',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='project.project')),
+                ('funds_spent', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('funds_allocated', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('milestones_count', models.PositiveIntegerField(default=0)),
+                ('milestones_completed_count', models.PositiveIntegerField(default=0)),
+                ('tasks_count', models.PositiveIntegerField(default=0)),
+                ('tasks_completed_count', models.PositiveIntegerField(default=0)),
+                ('team_member_count', models.PositiveIntegerField(default=0)),
+                ('featured_image', models.CharField(blank=True, max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Project stats',
+            },
+        ),
+    ]
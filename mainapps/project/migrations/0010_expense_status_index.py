@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0009_project_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectexpense',
+            index=models.Index(fields=['project', 'status'], name='project_expense_status_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_project_user_roles(apps, schema_editor):
+    """Index the existing managers, creators, officials and team members"""
+    Project = apps.get_model('project', 'Project')
+    ProjectTeamMember = apps.get_model('project', 'ProjectTeamMember')
+    ProjectUserRole = apps.get_model('project', 'ProjectUserRole')
+
+    roles = []
+    for project_id, manager_id, created_by_id in Project.objects.values_list('id', 'manager_id', 'created_by_id').iterator():
+        if manager_id:
+            roles.append(ProjectUserRole(user_id=manager_id, project_id=project_id, role='manager'))
+        if created_by_id:
+            roles.append(ProjectUserRole(user_id=created_by_id, project_id=project_id, role='creator'))
+    for project_id, user_id in Project.officials.through.objects.values_list('project_id', 'user_id').iterator():
+        roles.append(ProjectUserRole(user_id=user_id, project_id=project_id, role='official'))
+    for project_id, user_id in ProjectTeamMember.objects.values_list('project_id', 'user_id').iterator():
+        roles.append(ProjectUserRole(user_id=user_id, project_id=project_id, role='team_member'))
+    ProjectUserRole.objects.bulk_create(roles, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0010_expense_status_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectUserRole',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('manager', 'Manager'), ('official', 'Official'), ('creator', 'Creator'), ('team_member', 'Team Member')], max_length=20)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_roles', to='project.project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_user_roles', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'role'], name='project_user_role_idx')],
+                'unique_together': {('user', 'project', 'role')},
+            },
+        ),
+        migrations.RunPython(backfill_project_user_roles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,256 @@
+import heapq
+import logging
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import ProjectMilestone
+
+logger = logging.getLogger(__name__)
+
+# Cache key of a project's computed milestone schedule
+SCHEDULE_CACHE_KEY = 'project:{project_id}:milestone_schedule'
+
+# Upper bound on how long a schedule is served, covering writes that bypass
+# the invalidation signals
+SCHEDULE_CACHE_TIMEOUT = 60 * 60 * 24
+
+MilestoneDependency = ProjectMilestone.dependencies.through
+
+
+class MilestoneGraph:
+    """
+    In-memory dependency graph of a project's milestones.
+
+    The milestones and their dependency edges are loaded with one query each,
+    after which cycle checks, topological ordering and critical path
+    scheduling run without touching the database. Milestones only carry due
+    dates, so each one is scheduled with the planned span between its latest
+    prerequisite's due date (or the project start) and its own due date as
+    its duration.
+    """
+
+    def __init__(self, project_id, start_date, milestones, edges):
+        self.project_id = project_id
+        self.start_date = start_date
+        self.milestones = {milestone['id']: milestone for milestone in milestones}
+        # Prerequisites of each milestone, and the milestones waiting on it
+        self.depends_on = {milestone_id: set() for milestone_id in self.milestones}
+        self.dependents = {milestone_id: set() for milestone_id in self.milestones}
+        for milestone_id, dependency_id in edges:
+            if milestone_id in self.milestones and dependency_id in self.milestones:
+                self.depends_on[milestone_id].add(dependency_id)
+                self.dependents[dependency_id].add(milestone_id)
+
+    @classmethod
+    def load(cls, project):
+        """Load the dependency graph of a project"""
+        milestones = ProjectMilestone.objects.filter(project_id=project.id).order_by().values(
+            'id', 'title', 'status', 'due_date'
+        )
+        edges = MilestoneDependency.objects.filter(
+            from_projectmilestone__project_id=project.id
+        ).values_list('from_projectmilestone_id', 'to_projectmilestone_id')
+        return cls(project.id, project.start_date, list(milestones), list(edges))
+
+    def find_cycle(self, overrides=None):
+        """
+        Find a dependency cycle
+
+        Args:
+            overrides: Optional dict mapping milestone IDs to dependency IDs
+                that replace their stored dependencies, to check a change
+                before saving it
+
+        Returns:
+            Milestone IDs around the cycle, starting and ending with the same
+            milestone, or None
+        """
+        depends_on = dict(self.depends_on)
+        for milestone_id, dependency_ids in (overrides or {}).items():
+            depends_on[milestone_id] = set(dependency_ids)
+
+        visiting = set()
+        done = set()
+        for root in sorted(depends_on):
+            if root in done:
+                continue
+            path = [root]
+            visiting.add(root)
+            stack = [iter(sorted(depends_on.get(root, ())))]
+            while stack:
+                for dependency_id in stack[-1]:
+                    if dependency_id in visiting:
+                        return path[path.index(dependency_id):] + [dependency_id]
+                    if dependency_id not in done:
+                        path.append(dependency_id)
+                        visiting.add(dependency_id)
+                        stack.append(iter(sorted(depends_on.get(dependency_id, ()))))
+                        break
+                else:
+                    stack.pop()
+                    milestone_id = path.pop()
+                    visiting.discard(milestone_id)
+                    done.add(milestone_id)
+        return None
+
+    def topological_order(self):
+        """
+        Milestone IDs ordered after their dependencies, earliest due first
+        among milestones that are ready at the same time
+
+        Raises:
+            ValueError: if the dependencies contain a cycle
+        """
+        waiting_on = {milestone_id: len(deps) for milestone_id, deps in self.depends_on.items()}
+        ready = [
+            (self.milestones[milestone_id]['due_date'], milestone_id)
+            for milestone_id, count in waiting_on.items() if count == 0
+        ]
+        heapq.heapify(ready)
+
+        order = []
+        while ready:
+            _, milestone_id = heapq.heappop(ready)
+            order.append(milestone_id)
+            for dependent_id in self.dependents[milestone_id]:
+                waiting_on[dependent_id] -= 1
+                if waiting_on[dependent_id] == 0:
+                    heapq.heappush(ready, (self.milestones[dependent_id]['due_date'], dependent_id))
+
+        if len(order) < len(self.milestones):
+            raise ValueError("Milestone dependencies contain a cycle")
+        return order
+
+    def schedule(self):
+        """
+        Compute the critical path schedule of the project
+
+        Returns:
+            Dict with the topological order, the earliest and latest start
+            and finish of every milestone, its slack, the critical path and
+            the projected finish. When the dependencies contain a cycle only
+            the cycle and the plain milestones are returned.
+        """
+        cycle = self.find_cycle()
+        if cycle:
+            return {
+                'project': self.project_id,
+                'has_cycle': True,
+                'cycle': cycle,
+                'order': [],
+                'critical_path': [],
+                'project_start': self.start_date,
+                'projected_finish': None,
+                'milestones': [
+                    self._milestone_data(milestone_id)
+                    for milestone_id in sorted(self.milestones, key=lambda m: (self.milestones[m]['due_date'], m))
+                ],
+            }
+
+        order = self.topological_order()
+        start = self.start_date
+        duration = {}
+        earliest_start = {}
+        earliest_finish = {}
+        for milestone_id in order:
+            deps = self.depends_on[milestone_id]
+            planned_start = max([self.milestones[dep]['due_date'] for dep in deps] + [start])
+            duration[milestone_id] = max((self.milestones[milestone_id]['due_date'] - planned_start).days, 0)
+            earliest_start[milestone_id] = max([earliest_finish[dep] for dep in deps], default=start)
+            earliest_finish[milestone_id] = earliest_start[milestone_id] + timedelta(days=duration[milestone_id])
+
+        finish = max(earliest_finish.values(), default=start)
+        latest_start = {}
+        latest_finish = {}
+        for milestone_id in reversed(order):
+            latest_finish[milestone_id] = min(
+                [latest_start[dependent_id] for dependent_id in self.dependents[milestone_id]], default=finish
+            )
+            latest_start[milestone_id] = latest_finish[milestone_id] - timedelta(days=duration[milestone_id])
+
+        critical = {milestone_id for milestone_id in order if latest_start[milestone_id] == earliest_start[milestone_id]}
+
+        # Walk back from the last critical milestone through the critical
+        # prerequisite that set each milestone's earliest start
+        position = {milestone_id: index for index, milestone_id in enumerate(order)}
+        critical_path = []
+        current = next(
+            (m for m in reversed(order) if m in critical and earliest_finish[m] == finish), None
+        )
+        while current is not None:
+            critical_path.append(current)
+            current = max(
+                (dep for dep in self.depends_on[current]
+                 if dep in critical and earliest_finish[dep] == earliest_start[current]),
+                key=position.get,
+                default=None
+            )
+        critical_path.reverse()
+
+        return {
+            'project': self.project_id,
+            'has_cycle': False,
+            'cycle': [],
+            'order': order,
+            'critical_path': critical_path,
+            'project_start': start,
+            'projected_finish': finish,
+            'milestones': [
+                self._milestone_data(
+                    milestone_id,
+                    duration_days=duration[milestone_id],
+                    earliest_start=earliest_start[milestone_id],
+                    earliest_finish=earliest_finish[milestone_id],
+                    latest_start=latest_start[milestone_id],
+                    latest_finish=latest_finish[milestone_id],
+                    slack_days=(latest_start[milestone_id] - earliest_start[milestone_id]).days,
+                    is_critical=milestone_id in critical,
+                    behind_plan=earliest_finish[milestone_id] > self.milestones[milestone_id]['due_date'],
+                )
+                for milestone_id in order
+            ],
+        }
+
+    def _milestone_data(self, milestone_id, **schedule):
+        milestone = self.milestones[milestone_id]
+        return {
+            'id': milestone_id,
+            'title': milestone['title'],
+            'status': milestone['status'],
+            'due_date': milestone['due_date'],
+            'dependencies': sorted(self.depends_on[milestone_id]),
+            **schedule,
+        }
+
+    @classmethod
+    def cached_schedule(cls, project):
+        """Schedule of a project, computed once until its milestones change"""
+        key = SCHEDULE_CACHE_KEY.format(project_id=project.id)
+        try:
+            schedule = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Error reading cached milestone schedule: {e}")
+            return cls.load(project).schedule()
+
+        if schedule is None:
+            schedule = cls.load(project).schedule()
+            try:
+                cache.set(key, schedule, timeout=SCHEDULE_CACHE_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Error caching milestone schedule: {e}")
+        return schedule
+
+    @classmethod
+    def invalidate(cls, project_id):
+        """Drop the cached schedule of a project once the current transaction commits"""
+        if project_id:
+            transaction.on_commit(lambda: cls._delete(project_id))
+
+    @classmethod
+    def _delete(cls, project_id):
+        try:
+            cache.delete(SCHEDULE_CACHE_KEY.format(project_id=project_id))
+        except Exception as e:
+            logger.error(f"Error dropping cached milestone schedule: {e}")
@@ -100,6 +100,18 @@ class Project(models.Model):
         )['total'] or Decimal('0.00')
         
         return reimbursed_sum
+    
+    @property
+    def current_stats(self):
+        """
+        Denormalized rollups of the project, built on first access if missing
+        """
+        try:
+            return self.stats
+        except ProjectStats.DoesNotExist:
+            from .stats import ProjectStatsService
+            self.stats = ProjectStatsService.refresh([self.id])[self.id]
+            return self.stats
 
 class ProjectTeamMember(models.Model):
     """Team members assigned to projects"""
@@ -376,6 +388,12 @@ class ProjectExpense(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_expenses')
     
+    class Meta:
+        indexes = [
+            # Per-project funds subqueries filter on both
+            models.Index(fields=['project', 'status'], name='project_expense_status_idx'),
+        ]
+
     def __str__(self):
         return f"{self.project.title} - {self.title} (${self.amount})"
 
@@ -392,4 +410,67 @@ class ProjectComment(MPTTModel):
     class MPTTMeta:
         order_insertion_by = ['created_at']
     def __str__(self):
-        return f"Comment by {self.user.username} on {self.project.title}"
\ No newline at end of file
+        return f"Comment by {self.user.username} on {self.project.title}"
+
+
+class ProjectStats(models.Model):
+    """
+    Read model holding the derived numbers of a project
+
+    Kept up to date by mainapps.project.stats when expenses, milestones,
+    tasks, team members or media change, so project lists read one joined
+    row per project instead of aggregating per row.
+    """
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    funds_spent = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    funds_allocated = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    milestones_count = models.PositiveIntegerField(default=0)
+    milestones_completed_count = models.PositiveIntegerField(default=0)
+    tasks_count = models.PositiveIntegerField(default=0)
+    tasks_completed_count = models.PositiveIntegerField(default=0)
+    team_member_count = models.PositiveIntegerField(default=0)
+    # Storage name of the featured image, the URL is built when serializing
+    featured_image = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Project stats"
+    
+    def __str__(self):
+        return f"Stats for {self.project_id}"
+    
+    @property
+    def featured_image_url(self):
+        if not self.featured_image:
+            return None
+        return ProjectMedia._meta.get_field('file').storage.url(self.featured_image)
+
+
+class ProjectUserRole(models.Model):
+    """
+    Index of the ways each user is related to each project
+
+    One row per (user, project, role), maintained by mainapps.project.roles
+    from the project manager, creator, officials and team members, so a
+    user's projects are a single indexed lookup instead of four joins.
+    """
+    # Highest privilege first
+    ROLE_CHOICES = [
+        ('manager', 'Manager'),
+        ('official', 'Official'),
+        ('creator', 'Creator'),
+        ('team_member', 'Team Member'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='project_user_roles')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='user_roles')
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+
+    class Meta:
+        unique_together = ('user', 'project', 'role')
+        indexes = [
+            models.Index(fields=['user', 'role'], name='project_user_role_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.project_id} ({self.role})"
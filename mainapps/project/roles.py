@@ -0,0 +1,111 @@
+from django.db.models import Case, IntegerField, OuterRef, Subquery, Value, When
+
+from .models import Project, ProjectTeamMember, ProjectUserRole
+
+# Projects synced per batch by the rebuild
+REBUILD_BATCH_SIZE = 500
+
+ROLE_PRIORITY = {role: priority for priority, (role, _) in enumerate(ProjectUserRole.ROLE_CHOICES)}
+
+
+class ProjectRoleIndex:
+    """
+    Maintains the ProjectUserRole index.
+
+    Changes to a project's manager, creator, officials or team members call
+    sync() for that project, which diffs the index rows against the source
+    relations. Writes that bypass model signals (queryset.update(), raw SQL)
+    are corrected by the rebuild_project_roles command.
+    """
+
+    @classmethod
+    def expected_roles(cls, project_ids):
+        """Set of (user ID, project ID, role) derived from the source relations"""
+        roles = set()
+        for project_id, manager_id, created_by_id in Project.objects.filter(
+            id__in=project_ids
+        ).values_list('id', 'manager_id', 'created_by_id'):
+            if manager_id:
+                roles.add((manager_id, project_id, 'manager'))
+            if created_by_id:
+                roles.add((created_by_id, project_id, 'creator'))
+        for project_id, user_id in Project.officials.through.objects.filter(
+            project_id__in=project_ids
+        ).values_list('project_id', 'user_id'):
+            roles.add((user_id, project_id, 'official'))
+        for project_id, user_id in ProjectTeamMember.objects.filter(
+            project_id__in=project_ids
+        ).values_list('project_id', 'user_id'):
+            roles.add((user_id, project_id, 'team_member'))
+        return roles
+
+    @classmethod
+    def sync(cls, project_ids):
+        """
+        Bring the index rows of some projects in line with their relations
+
+        Returns:
+            Number of rows added and removed
+        """
+        project_ids = [project_id for project_id in project_ids if project_id]
+        if not project_ids:
+            return 0
+
+        expected = cls.expected_roles(project_ids)
+        existing = {
+            (user_id, project_id, role): row_id
+            for row_id, user_id, project_id, role in ProjectUserRole.objects.filter(
+                project_id__in=project_ids
+            ).values_list('id', 'user_id', 'project_id', 'role')
+        }
+
+        stale = [row_id for key, row_id in existing.items() if key not in expected]
+        if stale:
+            ProjectUserRole.objects.filter(id__in=stale).delete()
+        missing = [
+            ProjectUserRole(user_id=user_id, project_id=project_id, role=role)
+            for user_id, project_id, role in expected if (user_id, project_id, role) not in existing
+        ]
+        if missing:
+            ProjectUserRole.objects.bulk_create(missing, ignore_conflicts=True)
+        return len(stale) + len(missing)
+
+    @classmethod
+    def projects_for(cls, user, role=None):
+        """Projects a user is related to, optionally through one role only"""
+        roles = ProjectUserRole.objects.filter(user=user)
+        if role:
+            roles = roles.filter(role=role)
+        return Project.objects.filter(id__in=roles.values('project_id'))
+
+    @classmethod
+    def role_annotation(cls, user):
+        """Highest privilege role of a user in each project, for queryset.annotate()"""
+        return Subquery(
+            ProjectUserRole.objects.filter(project=OuterRef('pk'), user=user).annotate(
+                priority=Case(
+                    *[When(role=role, then=Value(priority)) for role, priority in ROLE_PRIORITY.items()],
+                    output_field=IntegerField()
+                )
+            ).order_by('priority').values('role')[:1]
+        )
+
+    @classmethod
+    def rebuild(cls, batch_size=REBUILD_BATCH_SIZE):
+        """
+        Sync the index rows of every project
+
+        Returns:
+            Number of rows added and removed
+        """
+        changed = 0
+        last_id = 0
+        while True:
+            project_ids = list(
+                Project.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not project_ids:
+                break
+            changed += cls.sync(project_ids)
+            last_id = project_ids[-1]
+        return changed
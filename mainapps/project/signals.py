@@ -0,0 +1,98 @@
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from mainapps.project_task.models import Task
+from .models import (
+    Project, ProjectCategory, ProjectExpense, ProjectMedia, ProjectMilestone, ProjectTeamMember, ProjectUserRole
+)
+from .milestone_graph import MilestoneGraph
+from .roles import ProjectRoleIndex
+from .stats import ProjectStatistics, ProjectStatsService
+
+
+@receiver(post_save, sender=Project)
+def refresh_project_stats(sender, instance, **kwargs):
+    """Create the stats of new projects and follow budget changes"""
+    ProjectStatsService.schedule_refresh(instance.id)
+
+
+@receiver(post_save, sender=ProjectExpense)
+@receiver(post_delete, sender=ProjectExpense)
+@receiver(post_save, sender=ProjectMilestone)
+@receiver(post_delete, sender=ProjectMilestone)
+@receiver(post_save, sender=ProjectTeamMember)
+@receiver(post_delete, sender=ProjectTeamMember)
+@receiver(post_save, sender=ProjectMedia)
+@receiver(post_delete, sender=ProjectMedia)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def refresh_parent_project_stats(sender, instance, **kwargs):
+    """Refresh the stats of the project a changed row rolls up into"""
+    ProjectStatsService.schedule_refresh(instance.project_id)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=ProjectExpense)
+@receiver(post_delete, sender=ProjectExpense)
+@receiver(post_save, sender=ProjectCategory)
+@receiver(post_delete, sender=ProjectCategory)
+def invalidate_project_statistics(sender, **kwargs):
+    """Expire the cached dashboard statistics"""
+    ProjectStatistics.invalidate()
+
+
+@receiver(m2m_changed, sender=Project.officials.through)
+def invalidate_project_statistics_on_officials(sender, action, **kwargs):
+    """Official filters change results when officials are added or removed"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        ProjectStatistics.invalidate()
+
+
+@receiver(post_save, sender=Project)
+def sync_project_roles(sender, instance, **kwargs):
+    """Follow manager and creator changes in the role index"""
+    ProjectRoleIndex.sync([instance.id])
+
+
+@receiver(post_save, sender=ProjectTeamMember)
+@receiver(post_delete, sender=ProjectTeamMember)
+def sync_team_member_roles(sender, instance, **kwargs):
+    """Follow team membership changes in the role index"""
+    ProjectRoleIndex.sync([instance.project_id])
+
+
+@receiver(m2m_changed, sender=Project.officials.through)
+def sync_official_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    """Follow official changes, made from either side of the relation, in the role index"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        ProjectRoleIndex.sync([instance.pk])
+    elif pk_set is not None:
+        ProjectRoleIndex.sync(pk_set)
+    else:
+        # Cleared from the user side, the index still lists the projects
+        ProjectRoleIndex.sync(
+            ProjectUserRole.objects.filter(user=instance, role='official').values_list('project_id', flat=True)
+        )
+
+
+@receiver(post_save, sender=Project)
+def invalidate_project_milestone_schedule(sender, instance, **kwargs):
+    """Start date changes move the whole milestone schedule"""
+    MilestoneGraph.invalidate(instance.id)
+
+
+@receiver(post_save, sender=ProjectMilestone)
+@receiver(post_delete, sender=ProjectMilestone)
+def invalidate_milestone_schedule(sender, instance, **kwargs):
+    """Drop the cached schedule of the project a changed milestone belongs to"""
+    MilestoneGraph.invalidate(instance.project_id)
+
+
+@receiver(m2m_changed, sender=ProjectMilestone.dependencies.through)
+def invalidate_milestone_schedule_on_dependencies(sender, instance, action, **kwargs):
+    """Drop the cached schedule when dependency edges change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        MilestoneGraph.invalidate(instance.project_id)
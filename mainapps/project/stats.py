@@ -0,0 +1,350 @@
+import hashlib
+import logging
+import threading
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from mainapps.project_task.models import Task, TaskStatus
+from .models import (
+    Project, ProjectExpense, ProjectMedia, ProjectMilestone, ProjectStats, ProjectTeamMember
+)
+
+logger = logging.getLogger(__name__)
+
+# Projects refreshed per batch by the rebuild
+REBUILD_BATCH_SIZE = 500
+
+# Cache key holding the version shared by all cached project statistics
+STATISTICS_VERSION_KEY = 'project:statistics:version'
+
+# Projects left out of the financial, timeline, type and category figures
+STATISTICS_EXCLUDED_STATUSES = ['submitted', 'cancelled', 'rejected']
+
+# Open projects count as delayed once past their target end date
+DELAYABLE_STATUSES = ['planning', 'active', 'on_hold']
+
+STATS_FIELDS = [
+    'funds_spent', 'funds_allocated', 'milestones_count', 'milestones_completed_count',
+    'tasks_count', 'tasks_completed_count', 'team_member_count', 'featured_image', 'updated_at',
+]
+
+
+class ProjectStatsService:
+    """
+    Maintains the ProjectStats read model.
+
+    Changes to the rows a project rolls up call schedule_refresh(). The
+    affected projects are collected and recomputed once, after the
+    transaction commits, with one grouped query per source table. Writes that
+    bypass model signals (queryset.update(), raw SQL) are corrected by the
+    rebuild_project_stats command.
+    """
+
+    _pending = threading.local()
+
+    @classmethod
+    def schedule_refresh(cls, project_id):
+        """Refresh a project's stats once the current transaction commits"""
+        if not project_id:
+            return
+        pending = getattr(cls._pending, 'project_ids', None)
+        if pending is None:
+            pending = cls._pending.project_ids = set()
+        pending.add(project_id)
+        transaction.on_commit(cls._flush)
+
+    @classmethod
+    def _flush(cls):
+        # Every change registers a callback, the first one to run refreshes
+        # all pending projects and the rest find nothing to do
+        project_ids = getattr(cls._pending, 'project_ids', None)
+        if not project_ids:
+            return
+        cls._pending.project_ids = set()
+        try:
+            cls.refresh(project_ids)
+        except Exception as e:
+            logger.exception(f"Error refreshing project stats: {e}")
+
+    @classmethod
+    def refresh(cls, project_ids):
+        """
+        Recompute and store the stats of some projects
+
+        Returns:
+            Dict mapping project ID to its ProjectStats
+        """
+        projects = {
+            project['id']: project
+            for project in Project.objects.filter(id__in=project_ids).values(
+                'id', 'budget', 'full_budget_disbursed'
+            )
+        }
+        if not projects:
+            return {}
+        project_ids = list(projects)
+
+        spent = dict(
+            ProjectExpense.objects.filter(
+                project_id__in=project_ids, status='reimbursed'
+            ).values_list('project_id').annotate(total=Sum('amount'))
+        )
+        milestones = {
+            row['project_id']: row
+            for row in ProjectMilestone.objects.filter(project_id__in=project_ids).values(
+                'project_id'
+            ).annotate(
+                total=Count('id'),
+                completed=Count('id', filter=Q(status='completed'))
+            )
+        }
+        tasks = {
+            row['project_id']: row
+            for row in Task.objects.filter(project_id__in=project_ids).values(
+                'project_id'
+            ).annotate(
+                total=Count('id'),
+                completed=Count('id', filter=Q(status=TaskStatus.COMPLETED))
+            )
+        }
+        team_sizes = dict(
+            ProjectTeamMember.objects.filter(
+                project_id__in=project_ids
+            ).values_list('project_id').annotate(total=Count('id'))
+        )
+        # Featured images first, then the newest image
+        featured = {}
+        for project_id, file in ProjectMedia.objects.filter(
+            project_id__in=project_ids, media_type='image'
+        ).exclude(file='').order_by('project_id', '-is_featured', '-uploaded_at').values_list(
+            'project_id', 'file'
+        ):
+            featured.setdefault(project_id, file)
+
+        stats = []
+        for project_id, project in projects.items():
+            funds_spent = spent.get(project_id) or Decimal('0.00')
+            stats.append(ProjectStats(
+                project_id=project_id,
+                funds_spent=funds_spent,
+                funds_allocated=project['budget'] if project['full_budget_disbursed'] else funds_spent,
+                milestones_count=milestones.get(project_id, {}).get('total', 0),
+                milestones_completed_count=milestones.get(project_id, {}).get('completed', 0),
+                tasks_count=tasks.get(project_id, {}).get('total', 0),
+                tasks_completed_count=tasks.get(project_id, {}).get('completed', 0),
+                team_member_count=team_sizes.get(project_id, 0),
+                featured_image=featured.get(project_id) or '',
+            ))
+
+        ProjectStats.objects.bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=['project'],
+            update_fields=STATS_FIELDS,
+        )
+        return {stat.project_id: stat for stat in stats}
+
+    @classmethod
+    def ensure(cls, projects):
+        """
+        Attach stats to projects loaded with select_related('stats')
+
+        Projects without a stats row yet get theirs built in one batch, so a
+        page of projects costs the same number of queries either way.
+        """
+        cached = Project.stats.related
+        missing = [project for project in projects if cached.get_cached_value(project, default=None) is None]
+        if not missing:
+            return
+        stats = cls.refresh([project.id for project in missing])
+        for project in missing:
+            if project.id in stats:
+                project.stats = stats[project.id]
+
+    @classmethod
+    def funds_annotations(cls):
+        """
+        Live funds spent and allocated, for queryset.annotate(**...)
+
+        Each project's reimbursed expenses are summed in a correlated
+        subquery, so joins added by other filters (officials, team members)
+        cannot multiply the expense rows and the project query needs no
+        GROUP BY. Aggregating the annotations, as the statistics endpoint
+        does, stays linear in the number of expenses.
+        """
+        spent = Coalesce(
+            Subquery(
+                ProjectExpense.objects.filter(
+                    project=OuterRef('pk'), status='reimbursed'
+                ).order_by().values('project').annotate(total=Sum('amount')).values('total'),
+                output_field=DecimalField()
+            ),
+            Value(Decimal('0.00')),
+            output_field=DecimalField()
+        )
+        return {
+            'calculated_funds_spent': spent,
+            'calculated_funds_allocated': Case(
+                When(full_budget_disbursed=True, then=F('budget')),
+                default=spent,
+                output_field=DecimalField()
+            ),
+        }
+
+    @classmethod
+    def rebuild(cls, batch_size=REBUILD_BATCH_SIZE):
+        """
+        Recompute the stats of every project
+
+        Returns:
+            Number of projects rebuilt
+        """
+        count = 0
+        last_id = 0
+        while True:
+            project_ids = list(
+                Project.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not project_ids:
+                break
+            count += len(cls.refresh(project_ids))
+            last_id = project_ids[-1]
+        return count
+
+
+class ProjectStatistics:
+    """
+    Portfolio statistics for the project dashboards.
+
+    Every figure comes from one grouped query over the annotated project
+    queryset: one row per status, type and category holding the sums and
+    conditional counts of that group, folded together in Python. Results are
+    cached per filter combination under a key carrying a shared version,
+    bumped whenever projects, expenses or categories change, so repeated
+    dashboard loads are a single cache hit.
+    """
+
+    @classmethod
+    def get(cls, queryset, filters):
+        """
+        Statistics of a project queryset, from the cache when possible
+
+        Args:
+            queryset: Project queryset annotated with funds_annotations()
+            filters: Query parameter (name, values) pairs the queryset was
+                filtered with, identifying the cached result
+        """
+        try:
+            key = cls._cache_key(cls._current_version(), filters)
+            statistics = cache.get(key)
+        except Exception as e:
+            # Cache unavailable, compute every time
+            logger.warning(f"Error reading cached project statistics: {e}")
+            return cls.compute(queryset)
+
+        if statistics is None:
+            statistics = cls.compute(queryset)
+            try:
+                cache.set(key, statistics, timeout=settings.PROJECT_STATISTICS_CACHE_SECONDS)
+            except Exception as e:
+                logger.warning(f"Error caching project statistics: {e}")
+        return statistics
+
+    @classmethod
+    def compute(cls, queryset):
+        """Compute the statistics of a project queryset in one query"""
+        today = timezone.now().date()
+        rows = queryset.order_by().values('status', 'project_type', 'category__name').annotate(
+            count=Count('id'),
+            budget_total=Sum('budget'),
+            budget_count=Count('budget'),
+            allocated_total=Sum('calculated_funds_allocated'),
+            spent_total=Sum('calculated_funds_spent'),
+            past_end_date=Count('id', filter=Q(target_end_date__lt=today)),
+            ended_on_time=Count('id', filter=Q(actual_end_date__lte=F('target_end_date'))),
+            ended_late=Count('id', filter=Q(actual_end_date__gt=F('target_end_date'))),
+        )
+
+        status_counts = {}
+        type_counts = {}
+        category_counts = {}
+        budget_stats = {'total_budget': None, 'total_allocated': None, 'total_spent': None}
+        budget_count = 0
+        timeline_stats = {
+            'active_projects': 0,
+            'delayed_projects': 0,
+            'completed_on_time': 0,
+            'completed_late': 0,
+        }
+        for row in rows:
+            status = row['status']
+            status_counts[status] = status_counts.get(status, 0) + row['count']
+            if status in STATISTICS_EXCLUDED_STATUSES:
+                continue
+
+            type_counts[row['project_type']] = type_counts.get(row['project_type'], 0) + row['count']
+            category_counts[row['category__name']] = category_counts.get(row['category__name'], 0) + row['count']
+
+            for total, field in [
+                ('total_budget', 'budget_total'),
+                ('total_allocated', 'allocated_total'),
+                ('total_spent', 'spent_total'),
+            ]:
+                if row[field] is not None:
+                    budget_stats[total] = (budget_stats[total] or 0) + row[field]
+            budget_count += row['budget_count']
+
+            if status == 'active':
+                timeline_stats['active_projects'] += row['count']
+            if status in DELAYABLE_STATUSES:
+                timeline_stats['delayed_projects'] += row['past_end_date']
+            if status == 'completed':
+                timeline_stats['completed_on_time'] += row['ended_on_time']
+                timeline_stats['completed_late'] += row['ended_late']
+
+        budget_stats['avg_budget'] = budget_stats['total_budget'] / budget_count if budget_count else None
+
+        return {
+            'status_counts': status_counts,
+            'type_counts': type_counts,
+            'budget_stats': budget_stats,
+            'timeline_stats': timeline_stats,
+            'category_counts': category_counts
+        }
+
+    @classmethod
+    def invalidate(cls):
+        """Expire every cached result once the current transaction commits"""
+        transaction.on_commit(cls._bump_version)
+
+    @classmethod
+    def _bump_version(cls):
+        try:
+            cache.incr(STATISTICS_VERSION_KEY)
+        except ValueError:
+            # Key does not exist yet
+            cache.set(STATISTICS_VERSION_KEY, 1, timeout=None)
+        except Exception as e:
+            # Cached statistics stay stale until they expire
+            logger.error(f"Error bumping project statistics version: {e}")
+
+    @classmethod
+    def _current_version(cls):
+        version = cache.get(STATISTICS_VERSION_KEY)
+        if version is None:
+            cache.add(STATISTICS_VERSION_KEY, 1, timeout=None)
+            version = cache.get(STATISTICS_VERSION_KEY, 1)
+        return version
+
+    @classmethod
+    def _cache_key(cls, version, filters):
+        # Delayed projects depend on the date, so results roll over daily
+        digest = hashlib.md5(urlencode(sorted(filters), doseq=True).encode()).hexdigest()
+        return f'project:statistics:{version}:{timezone.now().date().isoformat()}:{digest}'
@@ -1,3 +1,637 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+from rest_framework.test import APIClient, force_authenticate
+
+from mainapps.project import downloads
+from mainapps.project.api.views import ProjectMediaViewSet
+from mainapps.project.milestone_graph import MilestoneGraph
+from mainapps.project.roles import ProjectRoleIndex
+from mainapps.project.stats import ProjectStatsService
+from mainapps.project_task.models import Task
+from mainapps.project.models import (
+    Project, ProjectCategory, ProjectExpense, ProjectMedia, ProjectMilestone,
+    ProjectStats, ProjectTeamMember, ProjectUserRole
+)
+
+User = get_user_model()
+
+
+class ProjectListQueryBudgetTest(TestCase):
+    """The project list must cost the same number of queries however many projects it returns"""
+
+    # The project rows come with their stats, manager and category in one query
+    QUERY_BUDGET = 1
+    # Building missing stats: project values, five grouped rollups and the upsert
+    STATS_REFRESH_QUERIES = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='listuser', email='listuser@example.com')
+        cls.category = ProjectCategory.objects.create(name='Infrastructure')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_projects(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_projects(count)
+
+    def _create_projects(self, count):
+        today = date.today()
+        for i in range(count):
+            manager = User.objects.create(
+                username=f'manager{Project.objects.count()}',
+                email=f'manager{Project.objects.count()}@example.com',
+                first_name='Project',
+                last_name='Manager'
+            )
+            project = Project.objects.create(
+                title=f'Project {i}',
+                description='Description',
+                project_type=Project.PROJECT_TYPE_CHOICES[0][0],
+                category=self.category,
+                manager=manager,
+                start_date=today,
+                target_end_date=today,
+                budget=Decimal('1000.00')
+            )
+            ProjectExpense.objects.create(
+                project=project, title='Expense', description='Expense', amount=Decimal('10.00'),
+                date_incurred=today, incurred_by=manager, category='materials', status='reimbursed'
+            )
+            ProjectMilestone.objects.create(project=project, title='Done', description='Done', due_date=today, status='completed')
+            ProjectMilestone.objects.create(project=project, title='Open', description='Open', due_date=today)
+            Task.objects.create(title='Task', project=project)
+            ProjectTeamMember.objects.create(
+                project=project, user=manager, role=ProjectTeamMember.ROLE_CHOICES[0][0], join_date=today
+            )
+            ProjectMedia.objects.create(project=project, media_type='image', file='media/cover.png', title='Cover', is_featured=True)
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/project_api/projects/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()
+
+    def test_list_queries_do_not_grow_with_projects(self):
+        self.create_projects(2)
+        small_count, _ = self.count_list_queries()
+
+        self.create_projects(10)
+        large_count, data = self.count_list_queries()
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(large_count, self.QUERY_BUDGET)
+        results = data['results'] if isinstance(data, dict) else data
+        self.assertEqual(len(results), 12)
+
+        project = results[0]
+        self.assertEqual(project['milestones_count'], 2)
+        self.assertEqual(project['milestones_completed_count'], 1)
+        self.assertEqual(project['team_member_count'], 1)
+        self.assertEqual(project['manager_name'], 'Project Manager')
+        self.assertEqual(project['category_name'], 'Infrastructure')
+        self.assertTrue(project['featured_image'].endswith('media/cover.png'))
+
+    def test_missing_stats_are_built_in_one_batch(self):
+        self.create_projects(5)
+        ProjectStats.objects.all().delete()
+
+        query_count, data = self.count_list_queries()
+
+        self.assertEqual(query_count, self.QUERY_BUDGET + self.STATS_REFRESH_QUERIES)
+        self.assertEqual(ProjectStats.objects.count(), 5)
+        results = data['results'] if isinstance(data, dict) else data
+        self.assertTrue(all(project['milestones_count'] == 2 for project in results))
+
+
+class ProjectFundsAnnotationTest(TestCase):
+    """Funds annotations must not be multiplied by joins added by filters"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='fundsuser', email='fundsuser@example.com')
+        today = date.today()
+        cls.project = Project.objects.create(
+            title='Funded', description='Description', project_type=Project.PROJECT_TYPE_CHOICES[0][0],
+            manager=cls.user, start_date=today, target_end_date=today, budget=Decimal('100.00'),
+            status='active'
+        )
+        for i in range(3):
+            cls.project.officials.add(User.objects.create(username=f'official{i}', email=f'official{i}@example.com'))
+        cls.project.officials.add(cls.user)
+        for amount, status in [('30.00', 'reimbursed'), ('45.00', 'reimbursed'), ('500.00', 'pending')]:
+            ProjectExpense.objects.create(
+                project=cls.project, title='Expense', description='Expense', amount=Decimal(amount),
+                date_incurred=today, incurred_by=cls.user, category='materials', status=status
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_funds_unaffected_by_multi_valued_joins(self):
+        projects = Project.objects.filter(
+            officials__username__startswith='official'
+        ).annotate(**ProjectStatsService.funds_annotations())
+        self.assertEqual(len(projects), 3)
+        for project in projects:
+            self.assertEqual(project.calculated_funds_spent, Decimal('75.00'))
+            self.assertEqual(project.calculated_funds_allocated, Decimal('75.00'))
+
+    def test_statistics_sum_each_expense_once(self):
+        response = self.client.get('/project_api/projects/statistics/', {'official_id': self.user.id})
+        self.assertEqual(response.status_code, 200)
+        budget_stats = response.json()['budget_stats']
+        self.assertEqual(Decimal(str(budget_stats['total_spent'])), Decimal('75.00'))
+        self.assertEqual(Decimal(str(budget_stats['total_allocated'])), Decimal('75.00'))
+
+    def test_overbudget_filter_uses_reimbursed_expenses(self):
+        response = self.client.get('/project_api/projects/', {'overbudget': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+        ProjectExpense.objects.filter(project=self.project, status='pending').update(status='reimbursed')
+        response = self.client.get('/project_api/projects/', {'overbudget': 'true', 'official_id': self.user.id})
+        self.assertEqual([project['id'] for project in response.json()], [self.project.id])
+
+
+class ProjectUpdateResponseTest(TestCase):
+    """Project update actions answer with stats that include the write"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='updater', email='updater@example.com')
+        today = date.today()
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.project = Project.objects.create(
+                title='Updated', description='Description', project_type=Project.PROJECT_TYPE_CHOICES[0][0],
+                manager=cls.user, start_date=today, target_end_date=today + timedelta(days=60),
+                budget=Decimal('100.00'), status='active'
+            )
+            ProjectExpense.objects.create(
+                project=cls.project, title='Expense', description='Expense', amount=Decimal('30.00'),
+                date_incurred=today, incurred_by=cls.user, category='materials', status='reimbursed'
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_update_budget_returns_fresh_stats(self):
+        self.assertEqual(self.project.stats.funds_allocated, Decimal('30.00'))
+        response = self.client.patch(
+            f'/project_api/projects/{self.project.id}/update_budget/',
+            {'full_budget_disbursed': True},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.data['funds_allocated']), Decimal('100.00'))
+        self.assertEqual(Decimal(response.data['funds_spent']), Decimal('30.00'))
+
+    def test_update_status_and_dates_return_fresh_stats(self):
+        ProjectStats.objects.filter(project=self.project).update(funds_spent=Decimal('0.00'))
+        response = self.client.patch(
+            f'/project_api/projects/{self.project.id}/update_status/', {'status': 'approved'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.data['funds_spent']), Decimal('30.00'))
+
+        ProjectStats.objects.filter(project=self.project).update(funds_spent=Decimal('0.00'))
+        response = self.client.patch(
+            f'/project_api/projects/{self.project.id}/update_dates/',
+            {'target_end_date': str(date.today() + timedelta(days=90))},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.data['funds_spent']), Decimal('30.00'))
+
+
+class ProjectStatisticsTest(TestCase):
+    """Dashboard statistics come from one query and are served from the cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='statsuser', email='statsuser@example.com')
+        cls.category = ProjectCategory.objects.create(name='Water')
+        today = date.today()
+        last_month = today - timedelta(days=30)
+        for status, end_date, actual_end_date in [
+            ('active', last_month, None),
+            ('active', today + timedelta(days=30), None),
+            ('completed', today, last_month),
+            ('completed', last_month, today),
+            ('cancelled', last_month, None),
+        ]:
+            project = Project.objects.create(
+                title=status, description='Description', project_type=Project.PROJECT_TYPE_CHOICES[0][0],
+                category=cls.category, manager=cls.user, start_date=last_month, target_end_date=end_date,
+                actual_end_date=actual_end_date, budget=Decimal('100.00'), status=status
+            )
+            ProjectExpense.objects.create(
+                project=project, title='Expense', description='Expense', amount=Decimal('10.00'),
+                date_incurred=today, incurred_by=cls.user, category='materials', status='reimbursed'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_statistics(self, **params):
+        response = self.client.get('/project_api/projects/statistics/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_statistics_values(self):
+        with self.assertNumQueries(1):
+            statistics = self.get_statistics()
+
+        project_type = Project.PROJECT_TYPE_CHOICES[0][0]
+        self.assertEqual(statistics['status_counts'], {'active': 2, 'completed': 2, 'cancelled': 1})
+        self.assertEqual(statistics['type_counts'], {project_type: 4})
+        self.assertEqual(statistics['category_counts'], {'Water': 4})
+        self.assertEqual(statistics['timeline_stats'], {
+            'active_projects': 2,
+            'delayed_projects': 1,
+            'completed_on_time': 1,
+            'completed_late': 1,
+        })
+        budget_stats = statistics['budget_stats']
+        self.assertEqual(Decimal(str(budget_stats['total_budget'])), Decimal('400.00'))
+        self.assertEqual(Decimal(str(budget_stats['total_spent'])), Decimal('40.00'))
+        self.assertEqual(Decimal(str(budget_stats['avg_budget'])), Decimal('100.00'))
+
+    def test_statistics_cached_per_filter_combination(self):
+        statistics = self.get_statistics()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_statistics(), statistics)
+
+        with self.assertNumQueries(1):
+            delayed = self.get_statistics(delayed='true')
+        self.assertEqual(delayed['status_counts'], {'active': 1})
+
+    def test_expense_changes_expire_cached_statistics(self):
+        self.get_statistics()
+        with self.captureOnCommitCallbacks(execute=True):
+            ProjectExpense.objects.create(
+                project=Project.objects.filter(status='active').first(),
+                title='Expense', description='Expense', amount=Decimal('5.00'), date_incurred=date.today(),
+                incurred_by=self.user, category='materials', status='reimbursed'
+            )
+
+        statistics = self.get_statistics()
+        self.assertEqual(Decimal(str(statistics['budget_stats']['total_spent'])), Decimal('45.00'))
+
+
+class UserRelatedProjectsTest(TestCase):
+    """"My projects" reads the maintained role index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.creator, cls.official, cls.member = [
+            User.objects.create(username=name, email=f'{name}@example.com')
+            for name in ['roles_manager', 'roles_creator', 'roles_official', 'roles_member']
+        ]
+        today = date.today()
+        cls.projects = []
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                project = Project.objects.create(
+                    title=f'Roles {i}', description='Description', project_type=Project.PROJECT_TYPE_CHOICES[0][0],
+                    manager=cls.manager, created_by=cls.creator, start_date=today, target_end_date=today,
+                    budget=Decimal('100.00')
+                )
+                project.officials.add(cls.official, cls.manager)
+                ProjectTeamMember.objects.create(
+                    project=project, user=cls.member, role=ProjectTeamMember.ROLE_CHOICES[2][0], join_date=today
+                )
+                cls.projects.append(project)
+
+    def get_projects(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/project_api/user-projects/', params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data['results'] if isinstance(data, dict) else data
+
+    def test_highest_role_of_each_user(self):
+        for user, role in [
+            (self.manager, 'manager'),
+            (self.creator, 'creator'),
+            (self.official, 'official'),
+            (self.member, 'team_member'),
+        ]:
+            projects = self.get_projects(user)
+            self.assertEqual(len(projects), 3)
+            self.assertEqual({project['user_role'] for project in projects}, {role})
+
+    def test_role_filter(self):
+        self.assertEqual(len(self.get_projects(self.manager, role='official')), 3)
+        self.assertEqual(self.get_projects(self.member, role='manager'), [])
+
+    def test_index_follows_relation_changes(self):
+        project = self.projects[0]
+        project.officials.remove(self.official)
+        self.official.monitored_projects.clear()
+        ProjectTeamMember.objects.filter(project=project).delete()
+        project.manager = self.member
+        project.save()
+
+        self.assertEqual(self.get_projects(self.official), [])
+        self.assertEqual(len(self.get_projects(self.member)), 3)
+        self.assertEqual(
+            {p['id']: p['user_role'] for p in self.get_projects(self.member)}[project.id], 'manager'
+        )
+        self.assertEqual(ProjectRoleIndex.rebuild(), 0)
+
+    def test_rebuild_restores_missing_rows(self):
+        ProjectUserRole.objects.all().delete()
+        self.assertEqual(self.get_projects(self.member), [])
+        ProjectRoleIndex.rebuild()
+        self.assertEqual(len(self.get_projects(self.member)), 3)
+
+    def test_list_is_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get_projects(self.manager)
+        self.assertEqual(len(queries), 1)
+
+
+class MilestoneGraphTest(SimpleTestCase):
+    """Scheduling runs on the in-memory graph"""
+
+    def build(self, due_days, edges):
+        start = date(2026, 1, 1)
+        milestones = [
+            {'id': milestone_id, 'title': f'M{milestone_id}', 'status': 'pending', 'due_date': start + timedelta(days=days)}
+            for milestone_id, days in due_days.items()
+        ]
+        return MilestoneGraph(1, start, milestones, edges)
+
+    def test_critical_path_and_slack(self):
+        # 1 -> 2 -> 4 takes 30 days, 1 -> 3 -> 4 only 20
+        graph = self.build({1: 10, 2: 25, 3: 15, 4: 30}, [(2, 1), (3, 1), (4, 2), (4, 3)])
+        schedule = graph.schedule()
+
+        self.assertFalse(schedule['has_cycle'])
+        self.assertEqual(schedule['order'], [1, 3, 2, 4])
+        self.assertEqual(schedule['critical_path'], [1, 2, 4])
+        self.assertEqual(schedule['projected_finish'], date(2026, 1, 31))
+        milestones = {milestone['id']: milestone for milestone in schedule['milestones']}
+        self.assertEqual(milestones[3]['slack_days'], 10)
+        self.assertEqual(milestones[3]['latest_start'], date(2026, 1, 21))
+        self.assertTrue(milestones[2]['is_critical'])
+        self.assertFalse(any(milestone['behind_plan'] for milestone in milestones.values()))
+
+    def test_dependency_due_after_dependent_is_behind_plan(self):
+        graph = self.build({1: 20, 2: 10}, [(2, 1)])
+        milestones = {milestone['id']: milestone for milestone in graph.schedule()['milestones']}
+        self.assertTrue(milestones[2]['behind_plan'])
+        self.assertEqual(milestones[2]['earliest_finish'], date(2026, 1, 21))
+
+    def test_cycles(self):
+        graph = self.build({1: 10, 2: 20, 3: 30}, [(2, 1), (3, 2)])
+        self.assertIsNone(graph.find_cycle())
+        self.assertEqual(graph.find_cycle({1: [3]}), [1, 3, 2, 1])
+        self.assertEqual(graph.find_cycle({1: [1]}), [1, 1])
+
+        graph = self.build({1: 10, 2: 20}, [(2, 1), (1, 2)])
+        schedule = graph.schedule()
+        self.assertTrue(schedule['has_cycle'])
+        self.assertEqual(schedule['order'], [])
+        with self.assertRaises(ValueError):
+            graph.topological_order()
+
+
+class MilestoneScheduleEndpointTest(TestCase):
+    """The schedule endpoint is cached until milestones or edges change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='scheduleuser', email='scheduleuser@example.com')
+        today = date.today()
+        cls.project = Project.objects.create(
+            title='Schedule', description='Description', project_type=Project.PROJECT_TYPE_CHOICES[0][0],
+            manager=cls.user, start_date=today, target_end_date=today + timedelta(days=60),
+            budget=Decimal('100.00')
+        )
+        cls.first, cls.second = [
+            ProjectMilestone.objects.create(
+                project=cls.project, title=title, description=title, due_date=today + timedelta(days=days)
+            )
+            for title, days in [('First', 10), ('Second', 20)]
+        ]
+        cls.second.dependencies.add(cls.first)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_schedule(self):
+        response = self.client.get(f'/project_api/projects/{self.project.id}/milestone_schedule/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_schedule_cached_until_edges_change(self):
+        self.assertEqual(self.get_schedule()['order'], [self.first.id, self.second.id])
+        with self.assertNumQueries(1):
+            self.get_schedule()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.dependencies.clear()
+            self.first.dependencies.add(self.second)
+        self.assertEqual(self.get_schedule()['order'], [self.second.id, self.first.id])
+
+    def test_cyclic_dependency_rejected(self):
+        response = self.client.patch(
+            f'/project_api/milestones/{self.first.id}/', {'dependency_ids': [self.second.id]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Circular dependency', str(response.json()['dependency_ids']))
+        self.assertFalse(self.first.dependencies.exists())
+
+
+class MilestoneListQueryBudgetTest(TestCase):
+    """Milestone lists cost the same number of queries however many milestones they return"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='milestoneuser', email='milestoneuser@example.com')
+        today = date.today()
+        cls.project = Project.objects.create(
+            title='Milestones', description='Description', project_type=Project.PROJECT_TYPE_CHOICES[0][0],
+            manager=cls.user, start_date=today, target_end_date=today + timedelta(days=60),
+            budget=Decimal('100.00')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_milestones(self, count):
+        today = date.today()
+        previous = None
+        for i in range(count):
+            milestone = ProjectMilestone.objects.create(
+                project=self.project, title=f'Milestone {i}', description='Description',
+                due_date=today + timedelta(days=i + 1), created_by=self.user
+            )
+            milestone.assigned_to.add(self.user)
+            if previous:
+                milestone.dependencies.add(previous)
+            Task.objects.create(title='Open', project=self.project, milestone=milestone)
+            Task.objects.create(title='Done', project=self.project, milestone=milestone, status='completed')
+            previous = milestone
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()
+
+    def test_list_endpoints_queries_do_not_grow(self):
+        urls = [
+            f'/project_api/milestones/?project_id={self.project.id}',
+            f'/project_api/milestones/by_project/?project_id={self.project.id}',
+            '/project_api/milestones/by_user/',
+            '/project_api/milestones/upcoming/',
+            '/project_api/milestones/user-milestones/',
+        ]
+        self.create_milestones(2)
+        small = [self.count_queries(url)[0] for url in urls]
+        self.create_milestones(8)
+        for url, small_count in zip(urls, small):
+            large_count, data = self.count_queries(url)
+            self.assertEqual(large_count, small_count, url)
+            results = data['results'] if isinstance(data, dict) else data
+            self.assertEqual(len(results), 10, url)
+
+        milestone = results[0]
+        self.assertEqual(milestone['tasks_count'], 2)
+        self.assertEqual(milestone['completed_tasks_count'], 1)
+        self.assertEqual(milestone['completion_percentage'], 50.0)
+
+
+@override_settings(
+    AWS_STORAGE_BUCKET_NAME='media-bucket', AWS_S3_REGION_NAME='us-east-1',
+    AWS_ACCESS_KEY_ID='testing', AWS_SECRET_ACCESS_KEY='testing'
+)
+class MediaDownloadTest(TestCase):
+    """Media downloads stream from S3 or hand out presigned URLs"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='downloaduser', email='downloaduser@example.com')
+        today = date.today()
+        project = Project.objects.create(
+            title='Downloads', description='Description', project_type=Project.PROJECT_TYPE_CHOICES[0][0],
+            manager=cls.user, start_date=today, target_end_date=today, budget=Decimal('100.00')
+        )
+        cls.media = ProjectMedia.objects.create(
+            project=project, media_type='video', file='project_media/site.mp4', title='Site walkthrough'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Build the shared client from the test settings
+        downloads._client = None
+        self.addCleanup(setattr, downloads, '_client', None)
+        self.stubber = Stubber(downloads.s3_client())
+        self.stubber.activate()
+        self.addCleanup(self.stubber.deactivate)
+
+    def download(self, **kwargs):
+        return self.client.get(f'/project_api/project-media/{self.media.id}/download/', **kwargs)
+
+    def test_stream_passes_range_to_s3(self):
+        content = b'0123456789'
+        self.stubber.add_response(
+            'get_object',
+            {
+                'Body': StreamingBody(BytesIO(content[2:6]), 4),
+                'ContentLength': 4,
+                'ContentRange': 'bytes 2-5/10',
+                'ContentType': 'video/mp4',
+            },
+            {'Bucket': 'media-bucket', 'Key': 'project_media/site.mp4', 'Range': 'bytes=2-5'}
+        )
+        response = self.download(HTTP_RANGE='bytes=2-5')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="Site walkthrough.mp4"')
+        self.stubber.assert_no_pending_responses()
+
+    def test_stream_is_async_under_asgi(self):
+        content = b'x' * (downloads.STREAM_CHUNK_SIZE * 2 + 10)
+        self.stubber.add_response(
+            'get_object',
+            {'Body': StreamingBody(BytesIO(content), len(content)), 'ContentLength': len(content)},
+            {'Bucket': 'media-bucket', 'Key': 'project_media/site.mp4'}
+        )
+        request = AsyncRequestFactory().get(f'/project_api/project-media/{self.media.id}/download/')
+        force_authenticate(request, user=self.user)
+        response = ProjectMediaViewSet.as_view({'get': 'download'})(request, pk=self.media.id)
+
+        self.assertEqual(response.status_code, 200)
+        # An async iterator is streamed chunk by chunk by the ASGI handler
+        # instead of being collected into a list first
+        self.assertTrue(response.is_async)
+
+        async def collect():
+            return [chunk async for chunk in response.streaming_content]
+        chunks = async_to_sync(collect)()
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(b''.join(chunks), content)
+
+    def test_stream_is_sync_under_wsgi(self):
+        self.stubber.add_response(
+            'get_object',
+            {'Body': StreamingBody(BytesIO(b'data'), 4), 'ContentLength': 4},
+            {'Bucket': 'media-bucket', 'Key': 'project_media/site.mp4'}
+        )
+        response = self.download()
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response.streaming_content), b'data')
+
+    def test_missing_object(self):
+        self.stubber.add_client_error('get_object', service_error_code='NoSuchKey', http_status_code=404)
+        self.assertEqual(self.download().status_code, 404)
+
+    def test_presigned_url(self):
+        response = self.client.get(f'/project_api/project-media/{self.media.id}/download/', {'mode': 'url'})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertIn('project_media/site.mp4', data['url'])
+        self.assertIn('response-content-disposition=attachment', data['url'])
+        self.assertEqual(data['filename'], 'Site walkthrough.mp4')
@@ -5,7 +5,6 @@ This centralizes all task notification creation to ensure consistency and proper
 
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from mainapps.notification.models import Notification, NotificationType, NotificationPreference
 from mainapps.notification.services import NotificationService
 from mainapps.project_task.models import Task, TaskStatus, TaskPriority
 
@@ -17,57 +16,6 @@ PROJECT_TASKS_URL = "/dashboard/projects/{project_id}/tasks"
 MILESTONE_TASKS_URL = "/dashboard/projects/{project_id}/milestones/{milestone_id}/tasks"
 SETTINGS_NOTIFICATIONS_URL = "/settings/notifications"
 
-def should_notify_user(user, notification_type_name, channel='in_app'):
-    """
-    Check if a user should receive a notification based on their preferences.
-    
-    Args:
-        user: The user to check
-        notification_type_name: The name of the notification type
-        channel: The notification channel ('in_app', 'email', 'push')
-        
-    Returns:
-        Boolean indicating if the user should be notified
-    """
-    try:
-        notification_type = NotificationType.objects.get(name=notification_type_name)
-        
-        # If notification type cannot be disabled, always send it
-        if not notification_type.can_disable:
-            return True
-            
-        # Check user preference
-        try:
-            preference = NotificationPreference.objects.get(
-                user=user,
-                notification_type=notification_type
-            )
-            
-            # Check the appropriate channel preference
-            if channel == 'in_app':
-                return preference.receive_in_app
-            elif channel == 'email':
-                return preference.receive_email
-            elif channel == 'push':
-                return preference.receive_push
-            else:
-                return True
-                
-        except NotificationPreference.DoesNotExist:
-            # If no preference exists, use the default from notification type
-            if channel == 'in_app':
-                return True  # In-app notifications are always on by default
-            elif channel == 'email':
-                return notification_type.send_email
-            elif channel == 'push':
-                return notification_type.send_push
-            else:
-                return True
-                
-    except NotificationType.DoesNotExist:
-        # If notification type doesn't exist, don't send notification
-        return False
-
 def notify_task_created(task):
     """Send notification when a new task is created"""
     # Determine who should be notified
@@ -133,26 +81,23 @@ def notify_task_created(task):
     else:
         action_url = TASK_DETAIL_URL.format(task_id=task.id)
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'task_title': task.title,
-                    'task_type': dict(task.TaskType.choices).get(task.task_type, task.task_type),
-                    'project_title': task.project.title if task.project else None,
-                    'milestone_title': task.milestone.title if task.milestone else None,
-                    'created_by': task.created_by.get_full_name() or task.created_by.username if task.created_by else 'System',
-                    'is_subtask': task.parent is not None,
-                    'parent_task': task.parent.title if task.parent else None,
-                },
-                action_url=action_url,
-                priority=notification_priority,
-                icon=icon,
-                color=color,
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'task_title': task.title,
+            'task_type': dict(task.TaskType.choices).get(task.task_type, task.task_type),
+            'project_title': task.project.title if task.project else None,
+            'milestone_title': task.milestone.title if task.milestone else None,
+            'created_by': task.created_by.get_full_name() or task.created_by.username if task.created_by else 'System',
+            'is_subtask': task.parent is not None,
+            'parent_task': task.parent.title if task.parent else None,
+        },
+        action_url=action_url,
+        priority=notification_priority,
+        icon=icon,
+        color=color
+    )
 
 def notify_task_assigned(task, user, assigned_by=None):
     """Send notification when a user is assigned to a task"""
@@ -182,24 +127,22 @@ def notify_task_assigned(task, user, assigned_by=None):
     else:
         action_url = TASK_DETAIL_URL.format(task_id=task.id)
     
-    if should_notify_user(user, notification_type, 'in_app'):
-        NotificationService.create_notification(
-            recipient=user,
-            notification_type_name=notification_type,
-            context_data={
-                'task_title': task.title,
-                'task_priority': dict(task.TaskPriority.choices).get(task.priority, task.priority),
-                'project_title': task.project.title if task.project else None,
-                'milestone_title': task.milestone.title if task.milestone else None,
-                'due_date': task.due_date.strftime('%Y-%m-%d %H:%M') if task.due_date else None,
-                'assigned_by': assigned_by.get_full_name() or assigned_by.username if assigned_by else 'System',
-            },
-            action_url=action_url,
-            priority=notification_priority,
-            icon='user-plus',
-            color='#2196F3',
-            send_email=should_notify_user(user, notification_type, 'email')
-        )
+    NotificationService.create_notification(
+        recipient=user,
+        notification_type_name=notification_type,
+        context_data={
+            'task_title': task.title,
+            'task_priority': dict(task.TaskPriority.choices).get(task.priority, task.priority),
+            'project_title': task.project.title if task.project else None,
+            'milestone_title': task.milestone.title if task.milestone else None,
+            'due_date': task.due_date.strftime('%Y-%m-%d %H:%M') if task.due_date else None,
+            'assigned_by': assigned_by.get_full_name() or assigned_by.username if assigned_by else 'System',
+        },
+        action_url=action_url,
+        priority=notification_priority,
+        icon='user-plus',
+        color='#2196F3'
+    )
 
 def notify_task_unassigned(task, user, unassigned_by=None):
     """Send notification when a user is unassigned from a task"""
@@ -220,22 +163,20 @@ def notify_task_unassigned(task, user, unassigned_by=None):
     else:
         action_url = TASK_DETAIL_URL.format(task_id=task.id)
     
-    if should_notify_user(user, notification_type, 'in_app'):
-        NotificationService.create_notification(
-            recipient=user,
-            notification_type_name=notification_type,
-            context_data={
-                'task_title': task.title,
-                'project_title': task.project.title if task.project else None,
-                'milestone_title': task.milestone.title if task.milestone else None,
-                'unassigned_by': unassigned_by.get_full_name() or unassigned_by.username if unassigned_by else 'System',
-            },
-            action_url=action_url,
-            priority='normal',
-            icon='user-minus',
-            color='#FF9800',
-            send_email=should_notify_user(user, notification_type, 'email')
-        )
+    NotificationService.create_notification(
+        recipient=user,
+        notification_type_name=notification_type,
+        context_data={
+            'task_title': task.title,
+            'project_title': task.project.title if task.project else None,
+            'milestone_title': task.milestone.title if task.milestone else None,
+            'unassigned_by': unassigned_by.get_full_name() or unassigned_by.username if unassigned_by else 'System',
+        },
+        action_url=action_url,
+        priority='normal',
+        icon='user-minus',
+        color='#FF9800'
+    )
 
 def notify_task_status_changed(task, old_status, new_status, changed_by=None):
     """Send notification when a task's status changes"""
@@ -306,25 +247,22 @@ def notify_task_status_changed(task, old_status, new_status, changed_by=None):
     else:
         action_url = TASK_DETAIL_URL.format(task_id=task.id)
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'task_title': task.title,
-                    'old_status': dict(task.TaskStatus.choices).get(old_status, old_status),
-                    'new_status': dict(task.TaskStatus.choices).get(new_status, new_status),
-                    'project_title': task.project.title if task.project else None,
-                    'milestone_title': task.milestone.title if task.milestone else None,
-                    'changed_by': changed_by.get_full_name() or changed_by.username if changed_by else 'System',
-                },
-                action_url=action_url,
-                priority=priority,
-                icon=icon,
-                color=color,
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'task_title': task.title,
+            'old_status': dict(task.TaskStatus.choices).get(old_status, old_status),
+            'new_status': dict(task.TaskStatus.choices).get(new_status, new_status),
+            'project_title': task.project.title if task.project else None,
+            'milestone_title': task.milestone.title if task.milestone else None,
+            'changed_by': changed_by.get_full_name() or changed_by.username if changed_by else 'System',
+        },
+        action_url=action_url,
+        priority=priority,
+        icon=icon,
+        color=color
+    )
 
 def notify_task_completed(task, completed_by=None):
     """Send notification when a task is completed"""
@@ -365,26 +303,23 @@ def notify_task_completed(task, completed_by=None):
     else:
         action_url = TASK_DETAIL_URL.format(task_id=task.id)
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'task_title': task.title,
-                    'project_title': task.project.title if task.project else None,
-                    'milestone_title': task.milestone.title if task.milestone else None,
-                    'completed_by': completed_by.get_full_name() or completed_by.username if completed_by else 'System',
-                    'completion_date': task.completion_date.strftime('%Y-%m-%d %H:%M') if task.completion_date else timezone.now().strftime('%Y-%m-%d %H:%M'),
-                    'is_subtask': task.parent is not None,
-                    'parent_task': task.parent.title if task.parent else None,
-                },
-                action_url=action_url,
-                priority='normal',
-                icon='check-circle',
-                color='#4CAF50',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'task_title': task.title,
+            'project_title': task.project.title if task.project else None,
+            'milestone_title': task.milestone.title if task.milestone else None,
+            'completed_by': completed_by.get_full_name() or completed_by.username if completed_by else 'System',
+            'completion_date': task.completion_date.strftime('%Y-%m-%d %H:%M') if task.completion_date else timezone.now().strftime('%Y-%m-%d %H:%M'),
+            'is_subtask': task.parent is not None,
+            'parent_task': task.parent.title if task.parent else None,
+        },
+        action_url=action_url,
+        priority='normal',
+        icon='check-circle',
+        color='#4CAF50'
+    )
 
 def notify_task_approaching_due(task, days_remaining):
     """Send notification when a task's due date is approaching"""
@@ -416,24 +351,23 @@ def notify_task_approaching_due(task, days_remaining):
     else:
         action_url = TASK_DETAIL_URL.format(task_id=task.id)
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'task_title': task.title,
-                    'project_title': task.project.title if task.project else None,
-                    'milestone_title': task.milestone.title if task.milestone else None,
-                    'due_date': task.due_date.strftime('%Y-%m-%d %H:%M') if task.due_date else None,
-                    'days_remaining': days_remaining,
-                },
-                action_url=action_url,
-                priority=priority,
-                icon='clock',
-                color='#FF9800',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'task_title': task.title,
+            'project_title': task.project.title if task.project else None,
+            'milestone_title': task.milestone.title if task.milestone else None,
+            'due_date': task.due_date.strftime('%Y-%m-%d %H:%M') if task.due_date else None,
+            'days_remaining': days_remaining,
+        },
+        action_url=action_url,
+        priority=priority,
+        icon='clock',
+        color='#FF9800',
+        related_object=task,
+        coalesce=True
+    )
 
 def notify_task_overdue(task):
     """Send notification when a task is overdue"""
@@ -462,24 +396,23 @@ def notify_task_overdue(task):
     else:
         action_url = TASK_DETAIL_URL.format(task_id=task.id)
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'task_title': task.title,
-                    'project_title': task.project.title if task.project else None,
-                    'milestone_title': task.milestone.title if task.milestone else None,
-                    'due_date': task.due_date.strftime('%Y-%m-%d %H:%M') if task.due_date else None,
-                    'days_overdue': (timezone.now().date() - task.due_date.date()).days if task.due_date else 0,
-                },
-                action_url=action_url,
-                priority='high',
-                icon='alert-circle',
-                color='#F44336',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'task_title': task.title,
+            'project_title': task.project.title if task.project else None,
+            'milestone_title': task.milestone.title if task.milestone else None,
+            'due_date': task.due_date.strftime('%Y-%m-%d %H:%M') if task.due_date else None,
+            'days_overdue': (timezone.now().date() - task.due_date.date()).days if task.due_date else 0,
+        },
+        action_url=action_url,
+        priority='high',
+        icon='alert-circle',
+        color='#F44336',
+        related_object=task,
+        coalesce=True
+    )
 
 def notify_task_comment_added(comment):
     """Send notification when a comment is added to a task"""
@@ -506,24 +439,21 @@ def notify_task_comment_added(comment):
     # Determine action URL
     action_url = TASK_DETAIL_URL.format(task_id=task.id)
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'task_title': task.title,
-                    'project_title': task.project.title if task.project else None,
-                    'milestone_title': task.milestone.title if task.milestone else None,
-                    'comment_by': comment.user.get_full_name() or comment.user.username,
-                    'comment_preview': comment.content[:100] + ('...' if len(comment.content) > 100 else ''),
-                },
-                action_url=action_url,
-                priority='normal',
-                icon='message-square',
-                color='#2196F3',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'task_title': task.title,
+            'project_title': task.project.title if task.project else None,
+            'milestone_title': task.milestone.title if task.milestone else None,
+            'comment_by': comment.user.get_full_name() or comment.user.username,
+            'comment_preview': comment.content[:100] + ('...' if len(comment.content) > 100 else ''),
+        },
+        action_url=action_url,
+        priority='normal',
+        icon='message-square',
+        color='#2196F3'
+    )
 
 def notify_task_attachment_added(attachment):
     """Send notification when an attachment is added to a task"""
@@ -550,24 +480,21 @@ def notify_task_attachment_added(attachment):
     # Determine action URL
     action_url = TASK_DETAIL_URL.format(task_id=task.id)
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'task_title': task.title,
-                    'project_title': task.project.title if task.project else None,
-                    'milestone_title': task.milestone.title if task.milestone else None,
-                    'attachment_name': attachment.filename,
-                    'uploaded_by': attachment.uploaded_by.get_full_name() or attachment.uploaded_by.username,
-                },
-                action_url=action_url,
-                priority='normal',
-                icon='paperclip',
-                color='#2196F3',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'task_title': task.title,
+            'project_title': task.project.title if task.project else None,
+            'milestone_title': task.milestone.title if task.milestone else None,
+            'attachment_name': attachment.filename,
+            'uploaded_by': attachment.uploaded_by.get_full_name() or attachment.uploaded_by.username,
+        },
+        action_url=action_url,
+        priority='normal',
+        icon='paperclip',
+        color='#2196F3'
+    )
 
 def notify_task_time_logged(time_log):
     """Send notification when time is logged on a task"""
@@ -590,52 +517,46 @@ def notify_task_time_logged(time_log):
     # Determine action URL
     action_url = TASK_DETAIL_URL.format(task_id=task.id)
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'task_title': task.title,
-                    'project_title': task.project.title if task.project else None,
-                    'milestone_title': task.milestone.title if task.milestone else None,
-                    'minutes': time_log.minutes,
-                    'hours_minutes': f"{time_log.minutes // 60}h {time_log.minutes % 60}m",
-                    'logged_by': time_log.user.get_full_name() or time_log.user.username,
-                    'description': time_log.description,
-                },
-                action_url=action_url,
-                priority='normal',
-                icon='clock',
-                color='#2196F3',
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'task_title': task.title,
+            'project_title': task.project.title if task.project else None,
+            'milestone_title': task.milestone.title if task.milestone else None,
+            'minutes': time_log.minutes,
+            'hours_minutes': f"{time_log.minutes // 60}h {time_log.minutes % 60}m",
+            'logged_by': time_log.user.get_full_name() or time_log.user.username,
+            'description': time_log.description,
+        },
+        action_url=action_url,
+        priority='normal',
+        icon='clock',
+        color='#2196F3'
+    )
 
 def notify_task_dependency_completed(dependency, dependent_task):
     """Send notification when a task dependency is completed"""
     # Notify users assigned to the dependent task
-    for user in dependent_task.assigned_to.all():
-        notification_type = 'task_dependency_completed'
-        
-        # Determine action URL
-        action_url = TASK_DETAIL_URL.format(task_id=dependent_task.id)
-        
-        if should_notify_user(user, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=user,
-                notification_type_name=notification_type,
-                context_data={
-                    'task_title': dependent_task.title,
-                    'dependency_title': dependency.title,
-                    'project_title': dependent_task.project.title if dependent_task.project else None,
-                    'milestone_title': dependent_task.milestone.title if dependent_task.milestone else None,
-                },
-                action_url=action_url,
-                priority='normal',
-                icon='unlock',
-                color='#4CAF50',
-                send_email=should_notify_user(user, notification_type, 'email')
-            )
+    notification_type = 'task_dependency_completed'
+    
+    # Determine action URL
+    action_url = TASK_DETAIL_URL.format(task_id=dependent_task.id)
+    
+    NotificationService.create_notification_for_many(
+        recipients=dependent_task.assigned_to.all(),
+        notification_type_name=notification_type,
+        context_data={
+            'task_title': dependent_task.title,
+            'dependency_title': dependency.title,
+            'project_title': dependent_task.project.title if dependent_task.project else None,
+            'milestone_title': dependent_task.milestone.title if dependent_task.milestone else None,
+        },
+        action_url=action_url,
+        priority='normal',
+        icon='unlock',
+        color='#4CAF50'
+    )
 
 def notify_task_priority_changed(task, old_priority, new_priority, changed_by=None):
     """Send notification when a task's priority changes"""
@@ -682,55 +603,50 @@ def notify_task_priority_changed(task, old_priority, new_priority, changed_by=No
     else:
         action_url = TASK_DETAIL_URL.format(task_id=task.id)
     
-    for recipient in recipients:
-        if should_notify_user(recipient, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=recipient,
-                notification_type_name=notification_type,
-                context_data={
-                    'task_title': task.title,
-                    'old_priority': dict(task.TaskPriority.choices).get(old_priority, old_priority),
-                    'new_priority': dict(task.TaskPriority.choices).get(new_priority, new_priority),
-                    'project_title': task.project.title if task.project else None,
-                    'milestone_title': task.milestone.title if task.milestone else None,
-                    'changed_by': changed_by.get_full_name() or changed_by.username if changed_by else 'System',
-                },
-                action_url=action_url,
-                priority=notification_priority,
-                icon='flag',
-                color=color,
-                send_email=should_notify_user(recipient, notification_type, 'email')
-            )
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'task_title': task.title,
+            'old_priority': dict(task.TaskPriority.choices).get(old_priority, old_priority),
+            'new_priority': dict(task.TaskPriority.choices).get(new_priority, new_priority),
+            'project_title': task.project.title if task.project else None,
+            'milestone_title': task.milestone.title if task.milestone else None,
+            'changed_by': changed_by.get_full_name() or changed_by.username if changed_by else 'System',
+        },
+        action_url=action_url,
+        priority=notification_priority,
+        icon='flag',
+        color=color
+    )
 
 def notify_subtask_created(subtask):
     """Send notification when a subtask is created"""
     parent_task = subtask.parent
     
-    # Notify users assigned to the parent task
-    for user in parent_task.assigned_to.all():
-        # Don't notify the creator of the subtask
-        if subtask.created_by and user == subtask.created_by:
-            continue
-            
-        notification_type = 'subtask_created'
-        
-        # Determine action URL
-        action_url = TASK_DETAIL_URL.format(task_id=parent_task.id)
-        
-        if should_notify_user(user, notification_type, 'in_app'):
-            NotificationService.create_notification(
-                recipient=user,
-                notification_type_name=notification_type,
-                context_data={
-                    'parent_task_title': parent_task.title,
-                    'subtask_title': subtask.title,
-                    'project_title': parent_task.project.title if parent_task.project else None,
-                    'milestone_title': parent_task.milestone.title if parent_task.milestone else None,
-                    'created_by': subtask.created_by.get_full_name() or subtask.created_by.username if subtask.created_by else 'System',
-                },
-                action_url=action_url,
-                priority='normal',
-                icon='git-branch',
-                color='#2196F3',
-                send_email=should_notify_user(user, notification_type, 'email')
-            )
+    # Notify users assigned to the parent task, except the creator of the subtask
+    recipients = [
+        user for user in parent_task.assigned_to.all()
+        if not (subtask.created_by and user == subtask.created_by)
+    ]
+    
+    notification_type = 'subtask_created'
+    
+    # Determine action URL
+    action_url = TASK_DETAIL_URL.format(task_id=parent_task.id)
+    
+    NotificationService.create_notification_for_many(
+        recipients=recipients,
+        notification_type_name=notification_type,
+        context_data={
+            'parent_task_title': parent_task.title,
+            'subtask_title': subtask.title,
+            'project_title': parent_task.project.title if parent_task.project else None,
+            'milestone_title': parent_task.milestone.title if parent_task.milestone else None,
+            'created_by': subtask.created_by.get_full_name() or subtask.created_by.username if subtask.created_by else 'System',
+        },
+        action_url=action_url,
+        priority='normal',
+        icon='git-branch',
+        color='#2196F3'
+    )